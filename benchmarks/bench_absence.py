@@ -0,0 +1,70 @@
+"""Absence report for a whole year across thousands of workers.
+
+Seeds a year of attendance in which every worker misses some workdays,
+then times get_absence_report (one anti-join query for everyone) cold and
+warm, and checks one worker against get_absent_dates.
+
+Usage: python benchmarks/bench_absence.py [workers] [days]
+"""
+import datetime
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database import Database
+
+
+def seed(db, workers, days):
+    first = datetime.date(2024, 3, 20)
+    conn = db.connect()
+    conn.executemany("INSERT INTO workers (personal_number, full_name, created_at) VALUES (?, ?, ?)",
+                     [(str(1000 + i), f"کارمند {i}", "2020-01-01") for i in range(workers)])
+    rng = random.Random(5)
+    data = []
+    for offset in range(days):
+        day = first + datetime.timedelta(days=offset)
+        if day.weekday() == 4:  # Friday
+            continue
+        entry = datetime.datetime.combine(day, datetime.time(8))
+        for worker in range(1, workers + 1):
+            if rng.random() < 0.05:
+                continue
+            data.append((worker, entry, entry + datetime.timedelta(hours=8), str(day), '1403/01/01', 8.0))
+    conn.executemany("""
+        INSERT INTO attendance (worker_id, entry_time, exit_time, date, jalali_date, total_hours)
+        VALUES (?, ?, ?, ?, ?, ?)
+    """, data)
+    conn.commit()
+    conn.close()
+    return str(first), str(first + datetime.timedelta(days=days - 1))
+
+
+def main():
+    workers = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    days = int(sys.argv[2]) if len(sys.argv) > 2 else 365
+    with tempfile.TemporaryDirectory() as tmp:
+        db = Database(os.path.join(tmp, "bench.db"))
+        db.init_db()
+        start, end = seed(db, workers, days)
+        db.set_holiday("1403/01/01", "نوروز")
+        db.set_holiday("1403/01/13", "سیزده‌به‌در")
+
+        for label in ("cold (fills calendar)", "warm"):
+            started = time.perf_counter()
+            report = db.get_absence_report(start, end)
+            print(f"{label:<22}{time.perf_counter() - started:8.3f} s  {len(report)} workers")
+        total = sum(r['absent_days'] for r in report)
+        print(f"{report[0]['workdays']} workdays, {total} absences in total")
+        worker = report[0]
+        started = time.perf_counter()
+        dates = db.get_absent_dates(worker['worker_id'], start, end)
+        print(f"one worker's dates  {time.perf_counter() - started:8.3f} s  "
+              f"({len(dates)} == {worker['absent_days']})")
+
+
+if __name__ == "__main__":
+    main()
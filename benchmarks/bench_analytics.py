@@ -0,0 +1,94 @@
+"""Multi-year hours summary: SQLite versus the Parquet analytics mirror.
+
+Seeds several years of attendance for many workers, then times
+get_hours_summary (per worker and month, and per worker and year) on
+SQLite, on the mirror through DuckDB, and on the mirror through pandas.
+Also times an incremental refresh after a day of punches.
+
+Usage: python benchmarks/bench_analytics.py [workers] [years]
+"""
+import datetime
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from persiantools.jdatetime import JalaliDate
+from database import Database
+from utils import analytics_utils
+
+
+def seed(db, workers, years):
+    conn = db.connect()
+    conn.executemany("INSERT INTO workers (personal_number, full_name) VALUES (?, ?)",
+                     [(str(1000 + i), f"کارمند {i}") for i in range(workers)])
+    start = datetime.date.today() - datetime.timedelta(days=365 * years)
+    for offset in range(365 * years):
+        day = start + datetime.timedelta(days=offset)
+        if day.weekday() == 4:
+            continue
+        jalali = JalaliDate(day).strftime('%Y/%m/%d')
+        entry = datetime.datetime.combine(day, datetime.time(8))
+        conn.executemany("""
+            INSERT INTO attendance (worker_id, entry_time, exit_time, date, jalali_date, total_hours)
+            VALUES (?, ?, ?, ?, ?, ?)
+        """, [(w, entry, entry + datetime.timedelta(hours=8, minutes=w % 30), str(day), jalali,
+               8 + (w % 30) / 60) for w in range(1, workers + 1)])
+    conn.commit()
+    conn.close()
+
+
+def timed(label, func, repeat=3):
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - started)
+    print(f"{label:<34}{best * 1000:10.1f} ms  ({len(result)} rows)")
+    return result
+
+
+def main():
+    workers = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    years = int(sys.argv[2]) if len(sys.argv) > 2 else 3
+    if not analytics_utils.is_available():
+        print("pyarrow is not installed")
+        return
+    with tempfile.TemporaryDirectory() as tmp:
+        db = Database(os.path.join(tmp, "attendance.db"))
+        db.init_db()
+        seed(db, workers, years)
+        conn = db.connect()
+        rows = conn.execute("SELECT COUNT(*) FROM attendance").fetchone()[0]
+        conn.close()
+        print(f"{rows} attendance rows, {workers} workers, {years} years")
+
+        for period in ("month", "year"):
+            timed(f"sqlite   {period}", lambda: db.get_hours_summary(period=period))
+
+        mirror = analytics_utils.AnalyticsMirror(db)
+        started = time.perf_counter()
+        mirror.rebuild()
+        print(f"{'mirror rebuild':<34}{(time.perf_counter() - started) * 1000:10.1f} ms")
+
+        duckdb = analytics_utils.duckdb
+        if duckdb is not None:
+            for period in ("month", "year"):
+                timed(f"duckdb   {period}", lambda: db.get_hours_summary(period=period))
+        analytics_utils.duckdb = None
+        for period in ("month", "year"):
+            timed(f"pandas   {period}", lambda: db.get_hours_summary(period=period))
+        analytics_utils.duckdb = duckdb
+
+        for worker_id in range(1, workers + 1):
+            db.record_entry(worker_id)
+        started = time.perf_counter()
+        applied = mirror.refresh()
+        print(f"{'incremental refresh':<34}{(time.perf_counter() - started) * 1000:10.1f} ms"
+              f"  ({applied} changes)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+"""Lazy attendance table model: opening, sorting and scrolling a large range.
+
+Seeds the requested number of sessions and times, through
+AttendanceTableModel, the row count plus the first visible page for every
+sort column in both directions, a jump to the middle of the range (OFFSET)
+and scrolling on from there (keyset), along with the pages kept in memory,
+then a change-feed tick applied to the cached filters against counting again.
+
+Usage: python benchmarks/bench_attendance_table.py [sessions] [workers]
+"""
+import datetime
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database import Database
+from ui.attendance_model import AttendanceTableModel, SORT_COLUMNS
+
+
+def seed(db, sessions, workers):
+    conn = db.connect()
+    conn.executemany("INSERT INTO workers (personal_number, full_name) VALUES (?, ?)",
+                     [(str(1000 + i), f"کارمند {i:04d}") for i in range(workers)])
+    first = datetime.datetime(2023, 3, 21, 8)
+    batch = []
+    for i in range(sessions):
+        entry = first + datetime.timedelta(days=i // workers, minutes=i % 97)
+        hours = 4 + (i * 7919) % 500 / 100
+        batch.append((i % workers + 1, entry, entry + datetime.timedelta(hours=hours),
+                      entry.strftime('%Y-%m-%d'), '1402/01/01', hours))
+        if len(batch) == 100000:
+            conn.executemany("""
+                INSERT INTO attendance (worker_id, entry_time, exit_time, date, jalali_date, total_hours)
+                VALUES (?, ?, ?, ?, ?, ?)
+            """, batch)
+            batch = []
+    conn.executemany("""
+        INSERT INTO attendance (worker_id, entry_time, exit_time, date, jalali_date, total_hours)
+        VALUES (?, ?, ?, ?, ?, ?)
+    """, batch)
+    conn.commit()
+    conn.close()
+    return str(first.date()), str((first + datetime.timedelta(days=sessions // workers)).date())
+
+
+def show(model, rows=30):
+    """What a view does when it paints its first screen"""
+    return [model.data(model.index(row, 1)) for row in range(min(rows, model.rowCount()))]
+
+
+def main():
+    sessions = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+    workers = int(sys.argv[2]) if len(sys.argv) > 2 else 2000
+    with tempfile.TemporaryDirectory() as tmp:
+        db = Database(os.path.join(tmp, "bench.db"))
+        db.init_db()
+        start, end = seed(db, sessions, workers)
+        model = AttendanceTableModel()
+
+        def make_query():
+            return db.attendance_query().between(start, end)
+
+        started = time.perf_counter()
+        model.set_query(make_query)
+        show(model)
+        print(f"{model.rowCount()} rows, open + first page {(time.perf_counter() - started) * 1000:8.1f} ms")
+
+        for column, name in enumerate(SORT_COLUMNS):
+            for descending in (False, True):
+                started = time.perf_counter()
+                model.set_query(make_query, column, descending)
+                show(model)
+                print(f"sort {name:<16}{'desc' if descending else 'asc ':<5}"
+                      f"{(time.perf_counter() - started) * 1000:8.1f} ms")
+
+        model.set_query(make_query, 5, True)
+        middle = model.rowCount() // 2
+        started = time.perf_counter()
+        model.record(middle)
+        print(f"jump to row {middle} (offset)    {(time.perf_counter() - started) * 1000:8.1f} ms")
+        started = time.perf_counter()
+        for row in range(middle, middle + 100 * model.PAGE_SIZE, model.PAGE_SIZE):
+            model.record(row)
+        print(f"scroll 100 pages (keyset)  {(time.perf_counter() - started) * 10:8.1f} ms/page, "
+              f"{len(model._state.pages)} pages kept")
+
+        # A kiosk punch picked up by the change feed, with two filters cached
+        for worker_id in (1, None):
+            def filtered(worker_id=worker_id):
+                return make_query().worker(worker_id) if worker_id else make_query()
+            model.set_query(filtered, key=worker_id)
+            show(model)
+        watermark = db.get_change_watermark()
+        db.record_entry(1)
+        changes = db.get_changes_since(watermark)
+        started = time.perf_counter()
+        model.apply_changes(changes)
+        show(model)
+        print(f"sync tick, changed rows     {(time.perf_counter() - started) * 1000:8.1f} ms")
+        started = time.perf_counter()
+        model.refresh()
+        show(model)
+        print(f"sync tick, count again      {(time.perf_counter() - started) * 1000:8.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
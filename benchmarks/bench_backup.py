@@ -0,0 +1,88 @@
+"""Punch latency while an online backup is running.
+
+Builds a database of the requested size, measures record_entry/record_exit
+latency with no backup, then again while BackupManager copies the file.
+
+Usage: python benchmarks/bench_backup.py [size_mb]   (e.g. 4096 for 4 GiB)
+"""
+import os
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database import Database
+from utils.backup_utils import BackupManager
+
+
+def seed(db, size_mb):
+    db.add_worker("1000", "کارمند نمونه")
+    conn = db.connect()
+    conn.execute("CREATE TABLE IF NOT EXISTS filler (data BLOB)")
+    chunk = os.urandom(64 * 1024)
+    for _ in range(size_mb * 16):
+        conn.execute("INSERT INTO filler (data) VALUES (?)", (chunk,))
+    conn.commit()
+    conn.close()
+    return db.get_worker_by_personal_number("1000")['id']
+
+
+def punch_latencies(db, worker_id, stop):
+    timings = []
+    while not stop.is_set():
+        for punch in (db.record_entry, db.record_exit):
+            started = time.perf_counter()
+            punch(worker_id)
+            timings.append(time.perf_counter() - started)
+        time.sleep(0.01)
+    return timings
+
+
+def summary(timings):
+    timings = sorted(timings)
+    pick = lambda q: timings[min(int(len(timings) * q), len(timings) - 1)] * 1000
+    return f"n={len(timings)} p50={pick(0.5):.2f} ms p99={pick(0.99):.2f} ms max={timings[-1] * 1000:.2f} ms"
+
+
+def main():
+    size_mb = int(sys.argv[1]) if len(sys.argv) > 1 else 256
+    with tempfile.TemporaryDirectory() as tmp:
+        db = Database(os.path.join(tmp, "attendance.db"))
+        db.init_db()
+        worker_id = seed(db, size_mb)
+
+        stop = threading.Event()
+        timer = threading.Timer(3.0, stop.set)
+        timer.start()
+        idle = punch_latencies(db, worker_id, stop)
+
+        manager = BackupManager(db.db_path, os.path.join(tmp, "backups"))
+        results = {}
+        backup = threading.Thread(target=lambda: results.update(result=manager.create_backup()))
+        stop.clear()
+        backup.start()
+        during = []
+        while backup.is_alive():
+            during.extend(punch_latencies(db, worker_id, _Once()))
+
+        print(f"database size:  {os.path.getsize(db.db_path) / 1024 / 1024:.0f} MiB")
+        print(f"backup:         {results['result']}")
+        print(f"idle punches:   {summary(idle)}")
+        print(f"during backup:  {summary(during)}")
+
+
+class _Once:
+    """Stop flag that lets punch_latencies run a single entry/exit pair"""
+
+    def __init__(self):
+        self.calls = 0
+
+    def is_set(self):
+        self.calls += 1
+        return self.calls > 1
+
+
+if __name__ == "__main__":
+    main()
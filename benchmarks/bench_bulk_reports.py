@@ -0,0 +1,73 @@
+"""Monthly per-worker PDF bundle: sequential versus the process pool.
+
+Seeds one Jalali month of attendance for the requested number of workers,
+renders every report in-process one after another (the old way), then
+through BulkReportJob with 1..cpu_count processes.
+
+Usage: python benchmarks/bench_bulk_reports.py [workers]
+"""
+import datetime
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from persiantools.jdatetime import JalaliDate
+
+from database import Database
+from utils.bulk_report_utils import BulkReportJob
+from utils.columnar_utils import ATTENDANCE_COLUMNS
+from utils.export_utils import ExportManager
+
+YEAR, MONTH = 1403, 5
+
+
+def seed(db, workers):
+    conn = db.connect()
+    conn.executemany("INSERT INTO workers (personal_number, full_name) VALUES (?, ?)",
+                     [(str(1000 + i), f"کارمند {i}") for i in range(workers)])
+    data = []
+    for day in range(1, 32):
+        date = JalaliDate(YEAR, MONTH, day)
+        entry = datetime.datetime.combine(date.to_gregorian(), datetime.time(8))
+        for worker_id in range(1, workers + 1):
+            exit_ = entry + datetime.timedelta(hours=8, minutes=worker_id % 40)
+            data.append((worker_id, entry, exit_, str(date.to_gregorian()), date.strftime('%Y/%m/%d'),
+                         (exit_ - entry).total_seconds() / 3600))
+    conn.executemany("""
+        INSERT INTO attendance (worker_id, entry_time, exit_time, date, jalali_date, total_hours)
+        VALUES (?, ?, ?, ?, ?, ?)
+    """, data)
+    conn.commit()
+    conn.close()
+
+
+def main():
+    workers = int(sys.argv[1]) if len(sys.argv) > 1 else 100
+    with tempfile.TemporaryDirectory() as tmp:
+        db = Database(os.path.join(tmp, "attendance.db"))
+        db.init_db()
+        seed(db, workers)
+        print(f"{workers} workers, {os.cpu_count()} cores")
+
+        job = BulkReportJob(db, YEAR, MONTH)
+        started = time.perf_counter()
+        manager = ExportManager()
+        for path, _, title, rows in job.build_tasks(tmp):
+            manager.export_to_pdf(rows, ATTENDANCE_COLUMNS, path, title)
+        sequential = time.perf_counter() - started
+        print(f"{'sequential':<14}{sequential:8.1f} s")
+
+        processes = 1
+        while processes <= os.cpu_count():
+            job = BulkReportJob(db, YEAR, MONTH, max_workers=processes)
+            result = job.run(os.path.join(tmp, f"bundle_{processes}.zip"))
+            print(f"{f'{processes} processes':<14}{result.duration:8.1f} s"
+                  f"  ({sequential / result.duration:.1f}x)")
+            processes *= 2
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+"""Department dashboard from the rollup tables versus aggregating members' sessions.
+
+Builds a department tree, seeds attendance through the triggers that
+maintain department_daily / department_monthly (timing the insert
+overhead against the same inserts without the rollup trigger), then times
+a year's dashboard read from the rollups against the same totals
+computed from the attendance rows, and checks that the two agree.
+Lateness is left out of the comparison (it needs shifts).
+
+Usage: python benchmarks/bench_departments.py [workers] [days]
+"""
+import datetime
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database import Database
+from persiantools.jdatetime import JalaliDate
+
+def make_db(path, workers):
+    db = Database(path)
+    db.init_db()
+    conn = db.connect()
+    conn.executemany("INSERT INTO workers (personal_number, full_name) VALUES (?, ?)",
+                     [(str(1000 + i), f"کارمند {i}") for i in range(workers)])
+    conn.commit()
+    conn.close()
+    # Five divisions of four units each; workers spread over the units
+    units = []
+    for division in range(5):
+        db.add_department(f"معاونت {division}")
+        parent = max(d['id'] for d in db.get_departments())
+        for unit in range(4):
+            db.add_department(f"واحد {division}-{unit}", parent)
+            units.append(max(d['id'] for d in db.get_departments()))
+    conn = db.connect()
+    conn.executemany("UPDATE workers SET department_id = ? WHERE id = ?",
+                     [(units[i % len(units)], i + 1) for i in range(workers)])
+    conn.commit()
+    conn.close()
+    return db
+
+
+def sessions(workers, days):
+    first = datetime.datetime(2024, 3, 20, 8)
+    for offset in range(days):
+        day = first + datetime.timedelta(days=offset)
+        jalali = JalaliDate(day.date()).strftime('%Y/%m/%d')
+        for worker in range(1, workers + 1):
+            entry = day + datetime.timedelta(minutes=worker % 40)
+            hours = 6 + worker % 5
+            yield (worker, entry, entry + datetime.timedelta(hours=hours),
+                   day.strftime('%Y-%m-%d'), jalali, hours)
+
+
+def insert(db, rows):
+    conn = db.connect()
+    started = time.perf_counter()
+    conn.executemany("""
+        INSERT INTO attendance (worker_id, entry_time, exit_time, date, jalali_date, total_hours)
+        VALUES (?, ?, ?, ?, ?, ?)
+    """, rows)
+    conn.commit()
+    conn.close()
+    return time.perf_counter() - started
+
+
+def from_sessions(db, year):
+    """The dashboard's session totals computed from attendance rows"""
+    conn = db.connect()
+    rows = conn.execute("""
+        SELECT d.id, COUNT(DISTINCT a.worker_id || '-' || a.date) AS worker_days,
+               COUNT(a.id) AS sessions, COALESCE(SUM(a.total_hours), 0) AS hours
+        FROM departments d
+        JOIN departments c ON c.path GLOB d.path || '*'
+        LEFT JOIN workers w ON w.department_id = c.id
+        LEFT JOIN attendance a ON a.worker_id = w.id AND a.jalali_date BETWEEN ? AND ?
+        GROUP BY d.id
+        ORDER BY d.path
+    """, (f"{year}/01/01", f"{year}/12/31")).fetchall()
+    conn.close()
+    return [(r['id'], r['worker_days'], r['sessions'], round(r['hours'], 6)) for r in rows]
+
+
+def main():
+    workers = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    days = int(sys.argv[2]) if len(sys.argv) > 2 else 250
+    rows = list(sessions(workers, days))
+    with tempfile.TemporaryDirectory() as tmp:
+        plain = make_db(os.path.join(tmp, "plain.db"), workers)
+        conn = plain.connect()
+        conn.execute("DROP TRIGGER department_rollup_insert")
+        conn.commit()
+        conn.close()
+        baseline = insert(plain, rows)
+
+        db = make_db(os.path.join(tmp, "rollups.db"), workers)
+        with_rollups = insert(db, rows)
+        print(f"{len(rows)} sessions inserted: {baseline:.2f} s without rollups, "
+              f"{with_rollups:.2f} s with ({(with_rollups / baseline - 1) * 100:+.0f}%)")
+
+        year = 1403
+        # The first call also evaluates the shift summary of the year's days
+        started = time.perf_counter()
+        db.get_department_dashboard(year)
+        print(f"shift summary refresh + dashboard {time.perf_counter() - started:.2f} s")
+        started = time.perf_counter()
+        dashboard = db.get_department_dashboard(year)
+        rollup_time = time.perf_counter() - started
+        started = time.perf_counter()
+        expected = from_sessions(db, year)
+        scan_time = time.perf_counter() - started
+        got = [(r['id'], r['worker_days'], r['sessions'], round(r['hours'], 6)) for r in dashboard]
+        print(f"year dashboard, {len(dashboard)} departments: rollups {rollup_time * 1000:.1f} ms, "
+              f"member sessions {scan_time * 1000:.1f} ms")
+        print("totals match" if got == expected else "TOTALS DIFFER")
+        return 0 if got == expected else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,81 @@
+"""File size and speed of columnar exports versus the CSV export.
+
+CSV goes through the admin panel path (rows fetched, formatted as Persian
+display strings, written with csv). Parquet and Feather stream typed
+columns from the database. Read-back time is what a BI pull pays.
+
+Usage: python benchmarks/bench_export.py [rows]
+"""
+import datetime
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pandas as pd
+import pyarrow.feather as feather
+import pyarrow.parquet as pq
+
+from database import Database
+from utils.columnar_utils import ATTENDANCE_COLUMNS, format_attendance_rows
+from utils.export_utils import ExportManager
+
+
+def seed(db, rows, workers=200):
+    conn = db.connect()
+    conn.executemany("INSERT INTO workers (personal_number, full_name) VALUES (?, ?)",
+                     [(str(1000 + i), f"کارمند {i}") for i in range(workers)])
+    start = datetime.datetime.now() - datetime.timedelta(days=rows // workers + 1)
+    data = []
+    for i in range(rows):
+        entry = start + datetime.timedelta(days=i // workers, hours=8, minutes=i % 45)
+        exit_ = entry + datetime.timedelta(hours=8, minutes=i % 50)
+        data.append((i % workers + 1, entry, exit_, entry.strftime('%Y-%m-%d'), '1403/01/01',
+                     (exit_ - entry).total_seconds() / 3600))
+    conn.executemany("""
+        INSERT INTO attendance (worker_id, entry_time, exit_time, date, jalali_date, total_hours)
+        VALUES (?, ?, ?, ?, ?, ?)
+    """, data)
+    conn.commit()
+    conn.close()
+
+
+def timed(func):
+    started = time.perf_counter()
+    func()
+    return time.perf_counter() - started
+
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+    manager = ExportManager()
+    with tempfile.TemporaryDirectory() as tmp:
+        db = Database(os.path.join(tmp, "attendance.db"))
+        db.init_db()
+        seed(db, rows)
+        paths = {fmt: os.path.join(tmp, f"export.{fmt}") for fmt in ("csv", "parquet", "feather")}
+
+        writers = {
+            "csv": lambda: manager.export_to_csv(
+                format_attendance_rows(db.get_all_attendance()), ATTENDANCE_COLUMNS, paths["csv"]),
+            "parquet": lambda: manager.export_to_parquet(db, paths["parquet"]),
+            "feather": lambda: manager.export_to_feather(db, paths["feather"]),
+        }
+        readers = {
+            "csv": lambda: pd.read_csv(paths["csv"]),
+            "parquet": lambda: pq.read_table(paths["parquet"]).to_pandas(),
+            "feather": lambda: feather.read_table(paths["feather"]).to_pandas(),
+        }
+        print(f"{rows} attendance rows")
+        print(f"{'format':<10}{'write':>10}{'read':>10}{'size':>12}")
+        for fmt in ("csv", "parquet", "feather"):
+            write = timed(writers[fmt])
+            read = timed(readers[fmt])
+            size = os.path.getsize(paths[fmt]) / 1024 / 1024
+            print(f"{fmt:<10}{write * 1000:8.0f}ms{read * 1000:8.0f}ms{size:9.1f} MiB")
+
+
+if __name__ == "__main__":
+    main()
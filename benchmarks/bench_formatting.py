@@ -0,0 +1,81 @@
+"""Compare per-cell attendance formatting with the columnar (NumPy) path.
+
+Usage: python benchmarks/bench_formatting.py [rows]
+"""
+import datetime
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.persian_utils import to_persian_number
+from utils.columnar_utils import format_attendance_rows
+
+
+def make_records(count):
+    records = []
+    start = datetime.datetime(2024, 3, 20, 8, 0, 0)
+    for i in range(count):
+        entry = start + datetime.timedelta(days=i // 50, minutes=random.randint(0, 90))
+        closed = random.random() > 0.05
+        exit_ = entry + datetime.timedelta(hours=random.uniform(4, 10)) if closed else None
+        records.append({
+            'id': i,
+            'jalali_date': '1403/01/%02d' % (1 + i % 28),
+            'full_name': 'کارمند %d' % (i % 50),
+            'personal_number': str(1000 + i % 50),
+            'entry_time': str(entry),
+            'exit_time': str(exit_) if exit_ else None,
+            'total_hours': (exit_ - entry).total_seconds() / 3600 if exit_ else 0,
+        })
+    return records
+
+
+def per_cell(records):
+    """The formatting loop display_attendance_records used to run"""
+    rows = []
+    for record in records:
+        entry_time_str = ""
+        if record['entry_time']:
+            entry_time_str = datetime.datetime.fromisoformat(record['entry_time']).strftime('%H:%M:%S')
+        exit_time_str = ""
+        if record['exit_time']:
+            exit_time_str = datetime.datetime.fromisoformat(record['exit_time']).strftime('%H:%M:%S')
+        total_hours_str = "-"
+        if record['total_hours'] and record['total_hours'] > 0:
+            total_hours_str = f"{record['total_hours']:.2f} ساعت"
+        rows.append([
+            to_persian_number(record['jalali_date']), record['full_name'],
+            record['personal_number'], to_persian_number(entry_time_str),
+            to_persian_number(exit_time_str), to_persian_number(total_hours_str),
+            "تکمیل شده" if record['exit_time'] else "در حال کار",
+        ])
+    return rows
+
+
+def best_of(func, records, repeat=5):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func(records)
+        timings.append(time.perf_counter() - started)
+    return min(timings)
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    records = make_records(count)
+    assert per_cell(records[:500]) == format_attendance_rows(records[:500])
+
+    cell_time = best_of(per_cell, records)
+    column_time = best_of(format_attendance_rows, records)
+    print(f"rows:      {count}")
+    print(f"per-cell:  {cell_time * 1000:.1f} ms")
+    print(f"columnar:  {column_time * 1000:.1f} ms")
+    print(f"speedup:   {cell_time / column_time:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
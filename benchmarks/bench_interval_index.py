@@ -0,0 +1,98 @@
+"""Point-in-time and range overlap queries through the attendance R*Tree.
+
+Seeds the requested number of sessions (two per worker and day, some
+crossing midnight) and times get_sessions_between for random instants
+and 90-minute windows, next to the same question answered by a date scan.
+
+Usage: python benchmarks/bench_interval_index.py [sessions] [workers]
+"""
+import datetime
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database import Database
+
+
+def seed(db, sessions, workers):
+    conn = db.connect()
+    conn.executemany("INSERT INTO workers (personal_number, full_name) VALUES (?, ?)",
+                     [(str(1000 + i), f"کارمند {i}") for i in range(workers)])
+    rng = random.Random(3)
+    first = datetime.datetime(2020, 3, 20)
+    batch = []
+    for i in range(sessions // 2):
+        day = first + datetime.timedelta(days=i // workers)
+        worker = i % workers + 1
+        # Every tenth worker is on the night shift
+        hour = 22 if worker % 10 == 0 else 7
+        entry = day + datetime.timedelta(hours=hour, minutes=rng.randint(0, 90))
+        middle = entry + datetime.timedelta(hours=4)
+        exit_ = middle + datetime.timedelta(hours=4, minutes=rng.randint(0, 60))
+        for start, end in ((entry, middle), (middle + datetime.timedelta(minutes=30), exit_)):
+            batch.append((worker, start, end, day.strftime('%Y-%m-%d'), '1403/01/01'))
+        if len(batch) >= 100000:
+            conn.executemany("""
+                INSERT INTO attendance (worker_id, entry_time, exit_time, date, jalali_date)
+                VALUES (?, ?, ?, ?, ?)
+            """, batch)
+            batch = []
+    conn.executemany("""
+        INSERT INTO attendance (worker_id, entry_time, exit_time, date, jalali_date)
+        VALUES (?, ?, ?, ?, ?)
+    """, batch)
+    conn.commit()
+    conn.close()
+    return first, first + datetime.timedelta(days=sessions // 2 // workers)
+
+
+def date_scan(db, start, end):
+    """The same question without the interval index"""
+    conn = db.connect()
+    rows = conn.execute("""
+        SELECT a.*, w.full_name FROM attendance a JOIN workers w ON a.worker_id = w.id
+        WHERE a.date BETWEEN ? AND ?
+          AND julianday(a.entry_time) <= julianday(?)
+          AND (a.exit_time IS NULL OR julianday(a.exit_time) >= julianday(?))
+    """, ((start - datetime.timedelta(days=1)).strftime('%Y-%m-%d'), end.strftime('%Y-%m-%d'),
+          end.isoformat(sep=' '), start.isoformat(sep=' '))).fetchall()
+    conn.close()
+    return rows
+
+
+def timed(label, func, probes):
+    times, found = [], 0
+    for start, end in probes:
+        started = time.perf_counter()
+        found += len(func(start, end))
+        times.append((time.perf_counter() - started) * 1000)
+    print(f"{label:<22} median {statistics.median(times):7.2f} ms  "
+          f"max {max(times):7.2f} ms  ({found / len(probes):.0f} sessions each)")
+
+
+def main():
+    sessions = int(sys.argv[1]) if len(sys.argv) > 1 else 2000000
+    workers = int(sys.argv[2]) if len(sys.argv) > 2 else 2000
+    with tempfile.TemporaryDirectory() as tmp:
+        db = Database(os.path.join(tmp, "bench.db"))
+        db.init_db()
+        started = time.perf_counter()
+        first, last = seed(db, sessions, workers)
+        print(f"{sessions} sessions seeded in {time.perf_counter() - started:.1f} s")
+
+        rng = random.Random(11)
+        span = int((last - first).total_seconds())
+        instants = [first + datetime.timedelta(seconds=rng.randrange(span)) for _ in range(200)]
+        windows = [(t, t + datetime.timedelta(minutes=90)) for t in instants]
+        timed("rtree instant", lambda s, e: db.get_sessions_between(s), [(t, t) for t in instants])
+        timed("rtree 90 min window", db.get_sessions_between, windows)
+        timed("date scan 90 min", lambda s, e: date_scan(db, s, e), windows)
+
+
+if __name__ == "__main__":
+    main()
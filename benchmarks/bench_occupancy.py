@@ -0,0 +1,71 @@
+"""Hourly occupancy heatmap over a year of sessions.
+
+Seeds a year of day-shift sessions (two per worker and working day), then
+times reading the session bounds and the vectorized sweep separately.
+
+Usage: python benchmarks/bench_occupancy.py [workers] [days]
+"""
+import datetime
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database import Database
+from utils.occupancy_utils import hourly_occupancy, weekday_profile
+
+
+def seed(db, workers, days):
+    conn = db.connect()
+    conn.executemany("INSERT INTO workers (personal_number, full_name) VALUES (?, ?)",
+                     [(str(1000 + i), f"کارمند {i}") for i in range(workers)])
+    rng = random.Random(7)
+    first = datetime.datetime(2024, 3, 20)
+    data = []
+    for day in range(days):
+        base = first + datetime.timedelta(days=day)
+        if base.weekday() == 4:  # Friday
+            continue
+        for worker in range(1, workers + 1):
+            entry = base + datetime.timedelta(hours=6, minutes=rng.randint(0, 240))
+            lunch = entry + datetime.timedelta(hours=4)
+            exit_ = lunch + datetime.timedelta(minutes=30 + rng.randint(120, 300))
+            for start, end in ((entry, lunch), (lunch + datetime.timedelta(minutes=30), exit_)):
+                data.append((worker, start.isoformat(), end.isoformat(),
+                             base.strftime('%Y-%m-%d'), '1403/01/01'))
+    conn.executemany("""
+        INSERT INTO attendance (worker_id, entry_time, exit_time, date, jalali_date)
+        VALUES (?, ?, ?, ?, ?)
+    """, data)
+    conn.commit()
+    conn.close()
+    return first.strftime('%Y-%m-%d'), (first + datetime.timedelta(days=days - 1)).strftime('%Y-%m-%d')
+
+
+def main():
+    workers = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    days = int(sys.argv[2]) if len(sys.argv) > 2 else 365
+    with tempfile.TemporaryDirectory() as tmp:
+        db = Database(os.path.join(tmp, "bench.db"))
+        db.init_db()
+        start, end = seed(db, workers, days)
+
+        started = time.perf_counter()
+        sessions = db.get_session_times(start, end)
+        read = time.perf_counter() - started
+        started = time.perf_counter()
+        days_, matrix = hourly_occupancy(sessions, start, end)
+        sweep = time.perf_counter() - started
+        profile = weekday_profile(days_, matrix)
+        print(f"{len(sessions)} sessions, {matrix.size} buckets, peak {matrix.max()}")
+        print(f"read   {read:8.3f} s")
+        print(f"sweep  {sweep:8.3f} s")
+        print(f"total  {read + sweep:8.3f} s")
+        print("weekday peaks:", profile.max(axis=1).tolist())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""Overhead of QueryProfiler on the calls the kiosks and admin panel make most.
+
+Times punches (entry + exit), a page of the worker history and a page of
+the attendance table, first plain and then with the profiler installed
+(every call timed, every statement traced, nothing slow enough to log)
+in alternating rounds, and prints the profiler's report for the last one.
+Times are CPU time, which the profiler adds to and disk syncs do not.
+
+Usage: python benchmarks/bench_profiler.py [workers]
+"""
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database import Database
+from utils.profiling_utils import QueryProfiler
+
+ROUNDS = 5
+
+
+def seed(db, workers):
+    conn = db.connect()
+    conn.executemany("INSERT INTO workers (personal_number, full_name) VALUES (?, ?)",
+                     [(str(1000 + i), f"کارمند {i}") for i in range(workers)])
+    conn.commit()
+    conn.close()
+    return [w['id'] for w in db.get_all_workers()]
+
+
+def timed(func, repeat):
+    timings = []
+    for _ in range(repeat):
+        started = time.process_time()
+        func()
+        timings.append(time.process_time() - started)
+    timings.sort()
+    return timings[len(timings) // 2]
+
+
+def run(db, worker_ids):
+    ids = iter(worker_ids * 2 * ROUNDS)
+
+    def punch():
+        worker_id = next(ids)
+        db.record_entry(worker_id)
+        db.record_exit(worker_id)
+
+    return {
+        "punch (entry + exit)": timed(punch, len(worker_ids) // ROUNDS),
+        "worker history page": timed(lambda: db.get_worker_attendance_page(worker_ids[0], 50), 100),
+        "attendance table page": timed(
+            lambda: db.attendance_query().sort("date", True).limit(200).fetch(), 100),
+    }
+
+
+def main():
+    workers = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    with tempfile.TemporaryDirectory() as tmp:
+        db = Database(os.path.join(tmp, "attendance.db"))
+        db.init_db()
+        worker_ids = seed(db, workers)
+        # Alternating rounds, best of each, so neither run gets a warmer cache
+        plain, profiled = {}, {}
+        for _ in range(ROUNDS):
+            for name, seconds in run(db, worker_ids).items():
+                plain[name] = min(seconds, plain.get(name, seconds))
+            profiler = QueryProfiler(os.path.join(tmp, "slow.log"), slow_ms=10000).install()
+            try:
+                for name, seconds in run(db, worker_ids).items():
+                    profiled[name] = min(seconds, profiled.get(name, seconds))
+            finally:
+                profiler.uninstall()
+
+    print(f"{'CPU time per call':<24}{'plain':>10}{'profiled':>10}{'overhead':>10}")
+    for name, seconds in plain.items():
+        print(f"{name:<24}{seconds * 1000:>8.2f}ms{profiled[name] * 1000:>8.2f}ms"
+              f"{(profiled[name] - seconds) * 1e6:>8.0f}us")
+    print()
+    print(profiler.report(limit=8))
+
+
+if __name__ == "__main__":
+    main()
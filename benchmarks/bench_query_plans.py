@@ -0,0 +1,47 @@
+"""Query plans and timings of the attendance views built with AttendanceQuery.
+
+Seeds attendance, runs ANALYZE, then prints the EXPLAIN QUERY PLAN and the
+time of each filter combination the admin views use. A view whose plan
+scans the whole attendance table, or does not use the index it is
+expected to, is reported and the script exits with status 1. The views
+and the check live in utils/plan_utils.py and also run under pytest
+(tests/test_query_plans.py).
+
+Usage: python benchmarks/bench_query_plans.py [workers] [days]
+"""
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database import Database
+from utils.plan_utils import VIEWS, last_week, plan_ok, seed_attendance
+
+
+def main():
+    workers = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    days = int(sys.argv[2]) if len(sys.argv) > 2 else 365
+    with tempfile.TemporaryDirectory() as tmp:
+        db = Database(os.path.join(tmp, "bench.db"))
+        db.init_db()
+        week = last_week(seed_attendance(db, workers, days), days)
+        print(f"{workers * days} sessions\n")
+
+        failed = False
+        for label, indexes, build in VIEWS:
+            plan = build(db.attendance_query(), week).explain()
+            started = time.perf_counter()
+            rows = build(db.attendance_query(), week).fetch()
+            elapsed = (time.perf_counter() - started) * 1000
+            ok = plan_ok(plan, indexes)
+            failed |= not ok
+            print(f"{'ok ' if ok else 'BAD'} {label:<28}{elapsed:8.1f} ms {len(rows):7d} rows")
+            for step in plan:
+                print(f"      {step}")
+        sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
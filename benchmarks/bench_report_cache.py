@@ -0,0 +1,72 @@
+"""Repeated report renders with and without the report cache.
+
+Runs the date-range attendance report the way preview, Excel, PDF and
+print each do, uncached, then through ReportCache (memory tier, and the
+disk tier as a fresh process would see it).
+
+Usage: python benchmarks/bench_report_cache.py [rows]
+"""
+import datetime
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database import Database
+from utils.report_cache import ReportCache
+
+RENDERS = 4
+
+
+def seed(db, rows, workers=200):
+    conn = db.connect()
+    conn.executemany("INSERT INTO workers (personal_number, full_name) VALUES (?, ?)",
+                     [(str(1000 + i), f"کارمند {i}") for i in range(workers)])
+    start = datetime.datetime.now() - datetime.timedelta(days=rows // workers + 1)
+    data = []
+    for i in range(rows):
+        entry = start + datetime.timedelta(days=i // workers, hours=8)
+        exit_ = entry + datetime.timedelta(hours=8, minutes=i % 50)
+        data.append((i % workers + 1, entry, exit_, entry.strftime('%Y-%m-%d'), '1403/01/01',
+                     (exit_ - entry).total_seconds() / 3600))
+    conn.executemany("""
+        INSERT INTO attendance (worker_id, entry_time, exit_time, date, jalali_date, total_hours)
+        VALUES (?, ?, ?, ?, ?, ?)
+    """, data)
+    conn.commit()
+    conn.close()
+    return str(start.date()), str(datetime.date.today())
+
+
+def renders(db, start, end):
+    timings = []
+    for _ in range(RENDERS):
+        started = time.perf_counter()
+        db.get_all_attendance(start, end)
+        timings.append(time.perf_counter() - started)
+    return " ".join(f"{t * 1000:7.1f}" for t in timings) + " ms"
+
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    with tempfile.TemporaryDirectory() as tmp:
+        db = Database(os.path.join(tmp, "attendance.db"))
+        db.init_db()
+        start, end = seed(db, rows)
+        print(f"{rows} rows, {RENDERS} renders of the same date range")
+        print(f"{'uncached':<12}{renders(db, start, end)}")
+
+        cached = Database(db.db_path)
+        cache = ReportCache(cached, disk_dir=os.path.join(tmp, "cache"))
+        cache.install()
+        print(f"{'memory':<12}{renders(cached, start, end)}   ({cache.size / 1024 / 1024:.1f} MiB)")
+
+        restarted = Database(db.db_path)
+        ReportCache(restarted, disk_dir=os.path.join(tmp, "cache")).install()
+        print(f"{'disk':<12}{renders(restarted, start, end)}")
+
+
+if __name__ == "__main__":
+    main()
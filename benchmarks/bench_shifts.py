@@ -0,0 +1,87 @@
+"""Shift evaluation (lateness, early departure, overtime) for a full month.
+
+Seeds one month of two-session days for the requested number of workers on
+a day shift, then times the vectorized engine alone, a cold
+refresh_shift_summary, a warm get_shift_summary (all dates covered) and a
+refresh after one day was edited.
+
+Usage: python benchmarks/bench_shifts.py [workers] [days]
+"""
+import datetime
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database import Database
+from utils.shift_utils import evaluate_days
+
+
+def seed(db, workers, days):
+    conn = db.connect()
+    conn.executemany("INSERT INTO workers (personal_number, full_name) VALUES (?, ?)",
+                     [(str(1000 + i), f"کارمند {i}") for i in range(workers)])
+    conn.commit()
+    conn.close()
+    db.add_shift("روز", "08:00", "16:00", 30, 10)
+    conn = db.connect()
+    conn.executemany("INSERT INTO worker_shifts (worker_id, valid_from, shift_id) VALUES (?, ?, 1)",
+                     [(i + 1, "2020-01-01") for i in range(workers)])
+    rng = random.Random(42)
+    first = datetime.datetime(2024, 3, 1)
+    data = []
+    for day in range(days):
+        base = first + datetime.timedelta(days=day)
+        for worker in range(1, workers + 1):
+            entry = base + datetime.timedelta(hours=7, minutes=rng.randint(40, 100))
+            lunch = base + datetime.timedelta(hours=12)
+            exit_ = base + datetime.timedelta(hours=15, minutes=rng.randint(30, 150))
+            for start, end in ((entry, lunch), (lunch + datetime.timedelta(minutes=30), exit_)):
+                data.append((worker, start.isoformat(), end.isoformat(), base.strftime('%Y-%m-%d'),
+                             '1403/01/01', (end - start).total_seconds() / 3600))
+    conn.executemany("""
+        INSERT INTO attendance (worker_id, entry_time, exit_time, date, jalali_date, total_hours)
+        VALUES (?, ?, ?, ?, ?, ?)
+    """, data)
+    conn.commit()
+    conn.close()
+    return first.strftime('%Y-%m-%d'), (first + datetime.timedelta(days=days - 1)).strftime('%Y-%m-%d')
+
+
+def timed(label, func, *args):
+    started = time.perf_counter()
+    result = func(*args)
+    print(f"{label:<22}{time.perf_counter() - started:8.3f} s")
+    return result
+
+
+def main():
+    workers = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    days = int(sys.argv[2]) if len(sys.argv) > 2 else 30
+    with tempfile.TemporaryDirectory() as tmp:
+        db = Database(os.path.join(tmp, "bench.db"))
+        db.init_db()
+        start, end = seed(db, workers, days)
+        print(f"{workers} workers x {days} days, {workers * days * 2} sessions")
+
+        conn = db.connect()
+        sessions = conn.execute("SELECT worker_id, date, entry_time, exit_time FROM attendance").fetchall()
+        assignments = conn.execute("SELECT * FROM worker_shifts").fetchall()
+        shifts = {row['id']: row for row in conn.execute("SELECT * FROM shifts")}
+        conn.close()
+        timed("engine only", evaluate_days, sessions, assignments, shifts)
+
+        timed("cold refresh", db.refresh_shift_summary, start, end)
+        timed("warm summary", db.get_shift_summary, start, end)
+        conn = db.connect()
+        conn.execute("UPDATE attendance SET exit_time = datetime(exit_time, '+1 hour') WHERE id = 1")
+        conn.commit()
+        conn.close()
+        timed("refresh after edit", db.refresh_shift_summary, start, end)
+
+
+if __name__ == "__main__":
+    main()
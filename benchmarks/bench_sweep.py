@@ -0,0 +1,58 @@
+"""Stale-session sweep over many forgotten clock-outs.
+
+Seeds closed history plus the requested number of stale open sessions,
+then times close_stale_sessions for each policy on a fresh copy.
+
+Usage: python benchmarks/bench_sweep.py [stale_rows] [closed_rows]
+"""
+import datetime
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database import Database
+
+
+def seed(db, stale, closed, workers=1000):
+    conn = db.connect()
+    conn.executemany("INSERT INTO workers (personal_number, full_name) VALUES (?, ?)",
+                     [(str(1000 + i), f"کارمند {i}") for i in range(workers)])
+    start = datetime.datetime.now() - datetime.timedelta(days=(stale + closed) // workers + 2)
+    data = []
+    for i in range(stale + closed):
+        entry = start + datetime.timedelta(days=i // workers, hours=8, minutes=i % 60)
+        exit_ = entry + datetime.timedelta(hours=8) if i % (stale + closed) >= stale else None
+        data.append((i % workers + 1, entry, exit_, entry.strftime('%Y-%m-%d'), '1403/01/01',
+                     8.0 if exit_ else 0))
+    conn.executemany("""
+        INSERT INTO attendance (worker_id, entry_time, exit_time, date, jalali_date, total_hours)
+        VALUES (?, ?, ?, ?, ?, ?)
+    """, data)
+    conn.commit()
+    conn.close()
+
+
+def main():
+    stale = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    closed = int(sys.argv[2]) if len(sys.argv) > 2 else 400000
+    with tempfile.TemporaryDirectory() as tmp:
+        template = os.path.join(tmp, "template.db")
+        db = Database(template)
+        db.init_db()
+        seed(db, stale, closed)
+        print(f"{stale} stale open sessions, {closed} closed sessions")
+        for policy in ("shift_end", "cap", "flag"):
+            path = os.path.join(tmp, f"{policy}.db")
+            shutil.copy(template, path)
+            db = Database(path)
+            started = time.perf_counter()
+            count, _ = db.close_stale_sessions(policy)
+            print(f"{policy:<10}{count:8d} rows {time.perf_counter() - started:8.2f} s")
+
+
+if __name__ == "__main__":
+    main()
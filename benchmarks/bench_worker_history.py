@@ -0,0 +1,77 @@
+"""Latency of refreshing the worker history after a punch.
+
+Compares the old full reload (whole history fetched and formatted) with the
+paged view (first page on login, one changed row per punch) for a worker
+with a long history.
+
+Usage: python benchmarks/bench_worker_history.py [history_rows]
+"""
+import datetime
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database import Database
+from utils.columnar_utils import format_hours, format_times, to_epoch_seconds
+from ui.worker_window import HISTORY_PAGE_SIZE
+
+
+def seed(db, rows):
+    db.add_worker("1000", "کارمند نمونه")
+    worker_id = db.get_worker_by_personal_number("1000")['id']
+    conn = db.connect()
+    start = datetime.datetime.now() - datetime.timedelta(days=rows + 1)
+    data = []
+    for day in range(rows):
+        entry = start + datetime.timedelta(days=day, hours=8)
+        exit_ = entry + datetime.timedelta(hours=8, minutes=day % 60)
+        data.append((worker_id, entry, exit_, entry.strftime('%Y-%m-%d'), '1400/01/01',
+                     (exit_ - entry).total_seconds() / 3600))
+    conn.executemany("""
+        INSERT INTO attendance (worker_id, entry_time, exit_time, date, jalali_date, total_hours)
+        VALUES (?, ?, ?, ?, ?, ?)
+    """, data)
+    conn.commit()
+    conn.close()
+    return worker_id
+
+
+def format_rows(records):
+    format_times(to_epoch_seconds([r['entry_time'] for r in records]))
+    format_times(to_epoch_seconds([r['exit_time'] for r in records]))
+    format_hours([r['total_hours'] for r in records])
+
+
+def timed(func, repeat=20):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - started)
+    timings.sort()
+    return timings[len(timings) // 2]
+
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    with tempfile.TemporaryDirectory() as tmp:
+        db = Database(os.path.join(tmp, "attendance.db"))
+        db.init_db()
+        worker_id = seed(db, rows)
+        db.record_entry(worker_id)
+
+        full = timed(lambda: format_rows(db.get_worker_attendance(worker_id)))
+        first_page = timed(lambda: format_rows(db.get_worker_attendance_page(worker_id, HISTORY_PAGE_SIZE)))
+        punch = timed(lambda: format_rows(db.get_worker_attendance_page(worker_id, 1)))
+
+    print(f"history rows:           {rows}")
+    print(f"full reload per punch:  {full * 1000:.2f} ms")
+    print(f"first page on login:    {first_page * 1000:.2f} ms")
+    print(f"changed row per punch:  {punch * 1000:.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,51 @@
+"""Latency of type-ahead worker search on a large roster.
+
+Usage: python benchmarks/bench_worker_search.py [workers]
+"""
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database import Database
+
+FIRST_NAMES = ["علی", "رضا", "محمد", "حسین", "مهدی", "زهرا", "فاطمه", "مریم", "سارا", "نرگس"]
+LAST_NAMES = ["احمدی", "محمدی", "حسینی", "رضایی", "کریمی", "موسوی", "جعفری", "صادقی", "رحیمی", "نوری"]
+
+
+def seed(db, count):
+    conn = db.connect()
+    conn.executemany(
+        "INSERT INTO workers (personal_number, full_name, phone) VALUES (?, ?, ?)",
+        ((str(100000 + i), f"{random.choice(FIRST_NAMES)} {random.choice(LAST_NAMES)}{i % 997}",
+          f"0912{random.randint(1000000, 9999999)}") for i in range(count))
+    )
+    conn.commit()
+    conn.close()
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    queries = ["ع", "علی", "علی اح", "زهرا کریمی", "1000", "12345", "0912", "09123", "091234", "مریم نو"]
+    with tempfile.TemporaryDirectory() as tmp:
+        db = Database(os.path.join(tmp, "attendance.db"))
+        db.init_db()
+        seed(db, count)
+
+        print(f"workers: {count}")
+        for query in queries:
+            timings = []
+            for _ in range(50):
+                started = time.perf_counter()
+                results = db.search_workers(query)
+                timings.append(time.perf_counter() - started)
+            timings.sort()
+            print(f"{query!r:>14}: median {timings[25] * 1000:.2f} ms, "
+                  f"p95 {timings[47] * 1000:.2f} ms, {len(results)} results")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,420 @@
+import argparse
+import datetime
+import sys
+from persiantools.jdatetime import JalaliDate
+from database import Database
+from utils.maintenance_utils import MaintenanceScheduler, JOB_INTERVALS
+from utils.backup_utils import BackupManager
+from utils import sync_utils, analytics_utils
+from utils.profiling_utils import QueryProfiler, default_log_path, read_json_log
+from utils.persian_utils import jalali_period_range, get_persian_weekday_name
+
+
+def cmd_archive(db, args):
+    if args.list or args.year is None:
+        for archive in db.get_archives():
+            print(f"{archive['year']}\t{archive['row_count']}\t{archive['path']}")
+        return 0
+    success, message = db.archive_year(args.year)
+    print(message)
+    return 0 if success else 1
+
+
+def cmd_maintenance(db, args):
+    scheduler = MaintenanceScheduler(db, args.budget)
+    if args.enable_incremental_vacuum:
+        results = [scheduler.enable_incremental_vacuum()]
+    elif args.job:
+        results = [scheduler.run_job(job) for job in args.job]
+    else:
+        results = scheduler.run_due()
+    for result in results:
+        print(result)
+    return 0 if all(r.status != "failed" for r in results) else 1
+
+
+def cmd_backup(db, args):
+    manager = BackupManager(db.db_path, args.dir, keep=args.keep)
+    if args.list:
+        for path in manager.list_backups():
+            print(path)
+        return 0
+    if args.verify:
+        ok, detail = manager.verify_backup(args.verify)
+        print(f"{args.verify}: {'ok' if ok else 'FAILED'} ({detail})")
+        return 0 if ok else 1
+    if args.restore:
+        manager.restore_backup(args.restore, db.db_path)
+        print(f"{args.restore} -> {db.db_path}")
+        for path in manager.restore_archives(db.db_path):
+            print(f"بایگانی بازیابی شد: {path}")
+        return 0
+    result = manager.create_backup(compress=args.compress, verify=not args.no_verify)
+    print(result)
+    return 0 if result.verified is not False and not result.missing_archives else 1
+
+
+def cmd_sync(db, args):
+    if args.action == "export":
+        site_id = args.site or db.get_setting("site_id")
+        if not site_id:
+            print("شناسه شعبه را با --site مشخص کنید")
+            return 1
+        db.set_setting("site_id", site_id)
+        path = sync_utils.export_batch(db, site_id, args.out)
+        print(path or "تغییری برای ارسال وجود ندارد")
+        return 0
+
+    status = 0
+    for batch in sorted(args.batches):
+        applied, message = sync_utils.apply_batch(args.central, batch, force=args.force)
+        print(message)
+        if not applied and "missing" in message:
+            status = 1
+    return status
+
+
+def cmd_analytics(db, args):
+    if args.action == "summary":
+        for row in db.get_hours_summary(args.start, args.end, args.period):
+            print(f"{row['period']}\t{row['personal_number']}\t{row['full_name']}\t"
+                  f"{row['days_worked']}\t{row['total_hours']:.2f}")
+        return 0
+    if not analytics_utils.is_available():
+        print("برای پایگاه تحلیلی نصب pyarrow لازم است")
+        return 1
+    mirror = analytics_utils.AnalyticsMirror(db)
+    if args.action == "build":
+        print(f"{mirror.root}: watermark {mirror.rebuild()}")
+    else:
+        applied = mirror.refresh()
+        print(f"{mirror.root}: " + ("built" if applied is None else f"{applied} changes applied"))
+    return 0
+
+
+def cmd_export(db, args):
+    from utils.export_utils import ExportManager
+    manager = ExportManager()
+    export = manager.export_to_parquet if args.format == "parquet" else manager.export_to_feather
+    if not export(db, args.path, args.start, args.end):
+        return 1
+    print(args.path)
+    return 0
+
+
+def cmd_reports(db, args):
+    from utils.bulk_report_utils import BulkReportJob
+    job = BulkReportJob(db, args.year, args.month, args.format, args.jobs)
+    out = args.out or f"reports_{args.year}_{args.month:02d}.zip"
+    result = job.run(out, progress=lambda done, total: print(f"\r{done}/{total}", end="", flush=True))
+    print()
+    print(result)
+    return 0 if not result.failed else 1
+
+
+def cmd_sweep(db, args):
+    if args.save:
+        for key, value in (("sweep_policy", args.policy), ("sweep_shift_end", args.shift_end),
+                           ("sweep_cap_hours", args.cap_hours)):
+            if value is not None:
+                db.set_setting(key, value)
+    count, message = db.close_stale_sessions(args.policy, args.before, args.shift_end, args.cap_hours)
+    print(message)
+    return 0
+
+
+def cmd_shifts(db, args):
+    if args.action == "add":
+        ok, message = db.add_shift(args.name, args.start, args.end, args.break_minutes, args.grace)
+        print(message)
+        return 0 if ok else 1
+    if args.action == "list":
+        for shift in db.get_shifts():
+            print(f"{shift['id']}\t{shift['name']}\t{shift['start_time']}-{shift['end_time']}\t"
+                  f"{shift['break_minutes']}\t{shift['grace_minutes']}")
+        return 0
+    if args.action == "assign":
+        worker = db.get_worker_by_personal_number(args.personal_number)
+        if not worker:
+            print("کارمند یافت نشد")
+            return 1
+        ok, message = db.assign_shift(worker['id'], args.shift_id, args.valid_from)
+        print(message)
+        return 0
+    for row in db.get_shift_summary(args.start, args.end):
+        print(f"{row['personal_number']}\t{row['full_name']}\t{row['days_worked']}\t"
+              f"{row['late_days']}\t{row['late_minutes']:.0f}\t{row['early_minutes']:.0f}\t"
+              f"{row['overtime_minutes']:.0f}\t{row['worked_minutes'] / 60:.2f}")
+    return 0
+
+
+def cmd_inside(db, args):
+    day = JalaliDate(*map(int, args.date.split("/"))).to_gregorian()
+    start = datetime.datetime.combine(day, datetime.time.fromisoformat(args.start))
+    end = datetime.datetime.combine(day, datetime.time.fromisoformat(args.end or args.start))
+    if end < start:
+        end += datetime.timedelta(days=1)
+    for row in db.get_sessions_between(start, end):
+        print(f"{row['personal_number']}\t{row['full_name']}\t{row['entry_time']}\t{row['exit_time'] or '-'}")
+    return 0
+
+
+def cmd_calendar(db, args):
+    if args.action == "import":
+        ok, message = db.import_holidays(args.file)
+        print(message)
+        return 0 if ok else 1
+    start, end = jalali_period_range(args.year)
+    for day in db.get_holidays(start, end):
+        print(f"{day['jalali_date']}\t{get_persian_weekday_name(day['weekday'])}\t{day['holiday']}")
+    return 0
+
+
+def cmd_absences(db, args):
+    start, end = jalali_period_range(args.year, args.month)
+    for row in db.get_absence_report(start, end):
+        print(f"{row['personal_number']}\t{row['full_name']}\t{row['workdays']}\t"
+              f"{row['present_days']}\t{row['absent_days']}")
+    return 0
+
+
+def cmd_departments(db, args):
+    if args.action == "add":
+        ok, message = db.add_department(args.name, args.parent)
+        print(message)
+        return 0 if ok else 1
+    if args.action == "list":
+        for department in db.get_departments():
+            print(f"{department['id']}\t{'  ' * department['depth']}{department['name']}\t{department['members']}")
+        return 0
+    if args.action == "assign":
+        worker = db.get_worker_by_personal_number(args.personal_number)
+        if not worker:
+            print("کارمند یافت نشد")
+            return 1
+        ok, message = db.set_worker_department(worker['id'], args.department_id or None)
+        print(message)
+        return 0
+    if args.action == "rebuild":
+        print(f"{db.rebuild_department_rollups()} رکورد جمع‌بندی روزانه بازسازی شد")
+        return 0
+    for row in db.get_department_dashboard(args.year, args.month):
+        print(f"{row['id']}\t{'  ' * row['depth']}{row['name']}\t{row['members']}\t{row['worker_days']}\t"
+              f"{row['hours']:.1f}\t{row['late_minutes']:.0f}\t{row['overtime_minutes']:.0f}")
+    return 0
+
+
+def cmd_query(db, args):
+    query = db.attendance_query()
+    if args.start and args.end:
+        query.between(args.start, args.end)
+    if args.worker:
+        worker = db.get_worker_by_personal_number(args.worker)
+        if not worker:
+            print("کارمند یافت نشد")
+            return 1
+        query.worker(worker['id'])
+    if args.name:
+        query.name(args.name)
+    if args.department:
+        query.department(args.department)
+    query.status(args.status)
+    if args.min_hours is not None:
+        query.min_hours(args.min_hours)
+    if args.limit:
+        query.limit(args.limit)
+    try:
+        for order in args.order or ["date:desc"]:
+            column, _, direction = order.partition(":")
+            query.order_by(column, direction == "desc")
+    except ValueError as e:
+        print(e)
+        return 1
+    if args.explain:
+        print("\n".join(query.explain()))
+        return 0
+    for row in query.fetch():
+        print(f"{row['date']}\t{row['personal_number']}\t{row['full_name']}\t{row['entry_time']}\t"
+              f"{row['exit_time'] or '-'}\t{row['total_hours'] or 0:.2f}")
+    return 0
+
+
+def cmd_slow_queries(db, args):
+    entries = read_json_log(default_log_path(db.db_path), args.limit)
+    if not entries:
+        print("پرس‌وجوی کندی ثبت نشده است")
+    for entry in entries:
+        sql = " ".join((entry['sql'] or "-").split())
+        print(f"{entry['time']}\t{entry['ms']:.1f} ms\t{entry['method']}\t{sql}")
+        for step in entry.get("plan", []):
+            print(f"\t{step}")
+    return 0
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="main.py", description="سیستم مدیریت حضور و غیاب")
+    parser.add_argument("--db", default="attendance.db", help="مسیر فایل پایگاه داده")
+    parser.add_argument("--profile", action="store_true",
+                        help="نمایش آمار زمان پرس‌وجوها پس از اجرا و ثبت پرس‌وجوهای کند")
+    parser.add_argument("--slow-ms", type=float, default=100, help="آستانه پرس‌وجوی کند به میلی‌ثانیه")
+    commands = parser.add_subparsers(dest="command", required=True)
+    parser.commands = commands
+
+    archive = commands.add_parser("archive", help="بایگانی سال‌های بسته‌شده")
+    archive.add_argument("year", type=int, nargs="?", help="سال شمسی")
+    archive.add_argument("--list", action="store_true", help="نمایش بایگانی‌های موجود")
+    archive.set_defaults(handler=cmd_archive)
+
+    maintenance = commands.add_parser("maintenance", help="نگهداری پایگاه داده")
+    maintenance.add_argument("--job", action="append", choices=list(JOB_INTERVALS),
+                             help="اجرای یک کار مشخص (پیش‌فرض: کارهای سررسیدشده)")
+    maintenance.add_argument("--budget", type=float, default=5.0,
+                             help="حداکثر زمان هر کار به ثانیه")
+    maintenance.add_argument("--enable-incremental-vacuum", action="store_true",
+                             help="فعال‌سازی auto_vacuum=INCREMENTAL با یک VACUUM کامل")
+    maintenance.set_defaults(handler=cmd_maintenance)
+
+    backup = commands.add_parser("backup", help="پشتیبان‌گیری آنلاین")
+    backup.add_argument("--dir", default="backups", help="پوشه پشتیبان‌ها")
+    backup.add_argument("--keep", type=int, default=7, help="تعداد پشتیبان‌های نگه‌داری‌شده")
+    backup.add_argument("--compress", action="store_true", help="فشرده‌سازی با gzip")
+    backup.add_argument("--no-verify", action="store_true", help="بدون بازیابی آزمایشی")
+    backup.add_argument("--list", action="store_true", help="فهرست پشتیبان‌ها")
+    backup.add_argument("--verify", metavar="PATH", help="بررسی یک پشتیبان موجود")
+    backup.add_argument("--restore", metavar="PATH", help="بازیابی پشتیبان روی پایگاه داده")
+    backup.set_defaults(handler=cmd_backup)
+
+    sync = commands.add_parser("sync", help="همگام‌سازی با پایگاه داده مرکزی")
+    sync_actions = sync.add_subparsers(dest="action", required=True)
+    sync_export = sync_actions.add_parser("export", help="ساخت فایل تغییرات این شعبه")
+    sync_export.add_argument("--site", help="شناسه شعبه")
+    sync_export.add_argument("--out", default="sync_out", help="پوشه فایل‌های تغییرات")
+    sync_apply = sync_actions.add_parser("apply", help="اعمال فایل‌های تغییرات در پایگاه مرکزی")
+    sync_apply.add_argument("--central", required=True, help="مسیر پایگاه داده مرکزی")
+    sync_apply.add_argument("--force", action="store_true", help="اعمال حتی با وجود فاصله در تغییرات")
+    sync_apply.add_argument("batches", nargs="+", help="فایل‌های تغییرات")
+    sync.set_defaults(handler=cmd_sync)
+
+    analytics = commands.add_parser("analytics", help="پایگاه تحلیلی ستونی (Parquet)")
+    analytics.add_argument("action", choices=["build", "refresh", "summary"])
+    analytics.add_argument("--from", dest="start", help="تاریخ شروع (میلادی)")
+    analytics.add_argument("--to", dest="end", help="تاریخ پایان (میلادی)")
+    analytics.add_argument("--period", choices=list(analytics_utils.PERIOD_PREFIX), default="month")
+    analytics.set_defaults(handler=cmd_analytics)
+
+    export = commands.add_parser("export", help="خروجی ستونی حضور و غیاب (Parquet / Feather)")
+    export.add_argument("path", help="مسیر فایل خروجی")
+    export.add_argument("--format", choices=["parquet", "feather"], default="parquet")
+    export.add_argument("--from", dest="start", help="تاریخ شروع (میلادی)")
+    export.add_argument("--to", dest="end", help="تاریخ پایان (میلادی)")
+    export.set_defaults(handler=cmd_export)
+
+    reports = commands.add_parser("reports", help="گزارش ماهانه تک‌تک کارمندان در یک فایل zip")
+    reports.add_argument("year", type=int, help="سال شمسی")
+    reports.add_argument("month", type=int, choices=range(1, 13), metavar="month", help="ماه شمسی")
+    reports.add_argument("--format", choices=["pdf", "excel"], default="pdf")
+    reports.add_argument("--out", help="مسیر فایل zip")
+    reports.add_argument("--jobs", type=int, help="تعداد پردازه‌ها (پیش‌فرض: تعداد هسته‌ها)")
+    reports.set_defaults(handler=cmd_reports)
+
+    sweep = commands.add_parser("sweep", help="بستن جلسات باز روزهای گذشته")
+    sweep.add_argument("--policy", choices=["shift_end", "cap", "flag"],
+                       help="shift_end: پایان شیفت، cap: سقف ساعت، flag: فقط علامت‌گذاری")
+    sweep.add_argument("--shift-end", help="ساعت پایان شیفت (HH:MM:SS)")
+    sweep.add_argument("--cap-hours", type=float, help="حداکثر ساعت حضور")
+    sweep.add_argument("--before", help="فقط جلسات قبل از این تاریخ میلادی (پیش‌فرض: امروز)")
+    sweep.add_argument("--save", action="store_true", help="ذخیره تنظیمات به‌عنوان پیش‌فرض")
+    sweep.set_defaults(handler=cmd_sweep)
+
+    shifts = commands.add_parser("shifts", help="شیفت‌ها، تاخیر و اضافه‌کار")
+    shift_actions = shifts.add_subparsers(dest="action", required=True)
+    shift_add = shift_actions.add_parser("add", help="تعریف شیفت")
+    shift_add.add_argument("name")
+    shift_add.add_argument("start", help="ساعت شروع (HH:MM)")
+    shift_add.add_argument("end", help="ساعت پایان (HH:MM)")
+    shift_add.add_argument("--break", dest="break_minutes", type=int, default=0, help="دقایق استراحت")
+    shift_add.add_argument("--grace", type=int, default=0, help="دقایق مجاز تاخیر")
+    shift_actions.add_parser("list", help="فهرست شیفت‌ها")
+    shift_assign = shift_actions.add_parser("assign", help="تعیین شیفت کارمند")
+    shift_assign.add_argument("personal_number")
+    shift_assign.add_argument("shift_id", type=int)
+    shift_assign.add_argument("--from", dest="valid_from", required=True, help="تاریخ شروع (میلادی)")
+    shift_summary = shift_actions.add_parser("summary", help="خلاصه تاخیر و اضافه‌کار")
+    shift_summary.add_argument("--from", dest="start", required=True, help="تاریخ شروع (میلادی)")
+    shift_summary.add_argument("--to", dest="end", required=True, help="تاریخ پایان (میلادی)")
+    shifts.set_defaults(handler=cmd_shifts)
+
+    inside = commands.add_parser("inside", help="حاضرین در یک لحظه یا بازه زمانی")
+    inside.add_argument("date", help="تاریخ شمسی (1403/05/12)")
+    inside.add_argument("start", help="ساعت (HH:MM)")
+    inside.add_argument("end", nargs="?", help="تا ساعت (HH:MM)")
+    inside.set_defaults(handler=cmd_inside)
+
+    calendar = commands.add_parser("calendar", help="تقویم کاری و تعطیلات رسمی")
+    calendar_actions = calendar.add_subparsers(dest="action", required=True)
+    calendar_import = calendar_actions.add_parser("import", help="ورود تعطیلات از فایل CSV")
+    calendar_import.add_argument("file", help="سطرهای «تاریخ شمسی,عنوان»")
+    calendar_holidays = calendar_actions.add_parser("holidays", help="فهرست تعطیلات یک سال")
+    calendar_holidays.add_argument("year", type=int, help="سال شمسی")
+    calendar.set_defaults(handler=cmd_calendar)
+
+    absences = commands.add_parser("absences", help="روزهای غیبت همه کارمندان")
+    absences.add_argument("year", type=int, help="سال شمسی")
+    absences.add_argument("month", type=int, nargs="?", choices=range(1, 13), metavar="month",
+                          help="ماه شمسی (پیش‌فرض: کل سال)")
+    absences.set_defaults(handler=cmd_absences)
+
+    departments = commands.add_parser("departments", help="واحدها و جمع‌بندی حضور آن‌ها")
+    department_actions = departments.add_subparsers(dest="action", required=True)
+    department_add = department_actions.add_parser("add", help="تعریف واحد")
+    department_add.add_argument("name")
+    department_add.add_argument("--parent", type=int, help="شناسه واحد بالادستی")
+    department_actions.add_parser("list", help="درخت واحدها")
+    department_assign = department_actions.add_parser("assign", help="تعیین واحد کارمند")
+    department_assign.add_argument("personal_number")
+    department_assign.add_argument("department_id", type=int, help="شناسه واحد (0: بدون واحد)")
+    department_report = department_actions.add_parser("report", help="جمع هر واحد با زیرمجموعه‌ها")
+    department_report.add_argument("year", type=int, help="سال شمسی")
+    department_report.add_argument("month", type=int, nargs="?", choices=range(1, 13), metavar="month",
+                                   help="ماه شمسی (پیش‌فرض: کل سال)")
+    department_actions.add_parser("rebuild", help="محاسبه دوباره جمع‌بندی‌ها")
+    departments.set_defaults(handler=cmd_departments)
+
+    query = commands.add_parser("query", help="جستجوی حضور و غیاب با فیلتر")
+    query.add_argument("--from", dest="start", help="تاریخ شروع (میلادی)")
+    query.add_argument("--to", dest="end", help="تاریخ پایان (میلادی)")
+    query.add_argument("--worker", help="شماره پرسنلی")
+    query.add_argument("--name", help="بخشی از نام کارمند")
+    query.add_argument("--department", type=int, help="شناسه واحد (با زیرمجموعه‌ها)")
+    query.add_argument("--status", choices=["open", "closed"])
+    query.add_argument("--min-hours", type=float)
+    query.add_argument("--order", action="append", help="ستون مرتب‌سازی، مثلاً total_hours:desc")
+    query.add_argument("--limit", type=int)
+    query.add_argument("--explain", action="store_true", help="نمایش طرح اجرای پرس‌وجو")
+    query.set_defaults(handler=cmd_query)
+
+    slow_queries = commands.add_parser("slow-queries", help="آخرین پرس‌وجوهای کند با طرح اجرا")
+    slow_queries.add_argument("--limit", type=int, default=20)
+    slow_queries.set_defaults(handler=cmd_slow_queries)
+
+    return parser
+
+
+def is_command(argv):
+    """True when the arguments name a command rather than GUI/Qt options"""
+    return bool(set(argv) & set(build_parser().commands.choices))
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    profiler = None
+    if args.profile:
+        profiler = QueryProfiler(default_log_path(args.db), slow_ms=args.slow_ms).install()
+    db = Database(args.db)
+    try:
+        db.init_db()
+        return args.handler(db, args)
+    finally:
+        if profiler:
+            print(profiler.report(), file=sys.stderr)
+            profiler.uninstall()
@@ -1,25 +1,54 @@
 import sqlite3
+import csv
 import os
-from datetime import datetime
+import re
+from datetime import datetime, timedelta
 import hashlib
-from persiantools.jdatetime import JalaliDateTime
+import uuid
+from persiantools import digits
+from persiantools.jdatetime import JalaliDateTime, JalaliDate
+
+# End of open sessions in attendance_rtree (largest 32-bit second, 2038-01-19)
+SESSION_OPEN_END = 2**31 - 1
 
 class Database:
-    def __init__(self):
-        self.db_path = "attendance.db"
+    # Class of the connections connect() opens (QueryProfiler installs a traced one)
+    connection_factory = sqlite3.Connection
+    
+    def __init__(self, db_path="attendance.db"):
+        self.db_path = db_path
         self.conn = None
+        self._version_conn = None
         
     def connect(self):
         """Create database connection"""
-        self.conn = sqlite3.connect(self.db_path)
+        self.conn = sqlite3.connect(self.db_path, factory=self.connection_factory)
         self.conn.row_factory = sqlite3.Row
         return self.conn
     
+    def get_data_version(self):
+        """Return a number that changes whenever the database is modified.
+        
+        Uses ``PRAGMA data_version`` on a long-lived connection that never
+        writes, so commits from every other connection (including the
+        short-lived ones opened by this class) change the value.
+        """
+        if self._version_conn is None:
+            self._version_conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        return self._version_conn.execute("PRAGMA data_version").fetchone()[0]
+    
     def init_db(self):
         """Initialize database tables"""
         conn = self.connect()
         cursor = conn.cursor()
         
+        # Lets deleted pages be reclaimed incrementally; only takes effect
+        # on a new database (existing ones: "main.py maintenance --enable-incremental-vacuum")
+        cursor.execute("PRAGMA auto_vacuum = INCREMENTAL")
+        
+        # Readers (including online backups) never block kiosk writers
+        cursor.execute("PRAGMA journal_mode = WAL")
+        
         # Create workers table
         cursor.execute('''
             CREATE TABLE IF NOT EXISTS workers (
@@ -45,6 +74,95 @@ class Database:
             )
         ''')
         
+        # Set on sessions closed or flagged by close_stale_sessions
+        if "needs_review" not in {name for name, _ in self._attendance_columns(cursor)}:
+            cursor.execute("ALTER TABLE attendance ADD COLUMN needs_review INTEGER DEFAULT 0")
+        
+        # Change feed consumed by live views
+        self._init_change_log(cursor)
+        
+        # Full-text index for type-ahead worker search
+        self._init_worker_search(cursor)
+        
+        # Interval index for "who was inside at/between" queries
+        self._init_interval_index(cursor)
+        
+        # Worker history is always read newest-first per worker
+        cursor.execute('''
+            CREATE INDEX IF NOT EXISTS idx_attendance_worker_date
+            ON attendance (worker_id, date, id)
+        ''')
+        
+        # Date-range reports across all workers
+        cursor.execute('''
+            CREATE INDEX IF NOT EXISTS idx_attendance_date ON attendance (date)
+        ''')
+        
+        # Sort orders of the attendance table (expressions as in query_utils.SORT_EXPRESSIONS)
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_attendance_hours ON attendance (COALESCE(total_hours, 0))")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_attendance_entry ON attendance (COALESCE(entry_time, ''))")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_attendance_exit ON attendance (COALESCE(exit_time, ''))")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_workers_name ON workers (full_name)")
+        
+        # Open sessions only; keeps "who is in" lookups O(open sessions)
+        cursor.execute('''
+            CREATE INDEX IF NOT EXISTS idx_attendance_open
+            ON attendance (worker_id) WHERE exit_time IS NULL
+        ''')
+        
+        # Yearly archive files (attendance_<year>.db)
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS archives (
+                year INTEGER PRIMARY KEY,
+                path TEXT NOT NULL,
+                start_date TEXT NOT NULL,
+                end_date TEXT NOT NULL,
+                row_count INTEGER DEFAULT 0,
+                archived_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        ''')
+        
+        # Key/value settings (site id, sync watermarks, ...)
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS settings (
+                key TEXT PRIMARY KEY,
+                value TEXT
+            )
+        ''')
+        # Identifies this database's history; renewed when a backup is restored
+        cursor.execute("INSERT OR IGNORE INTO settings (key, value) VALUES ('data_generation', ?)",
+                       (uuid.uuid4().hex,))
+        
+        # One row per day: Jalali date, weekday and workday/holiday flags
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS calendar (
+                date TEXT PRIMARY KEY,
+                jalali_date TEXT NOT NULL,
+                weekday INTEGER NOT NULL,
+                is_workday INTEGER NOT NULL DEFAULT 1,
+                holiday TEXT
+            )
+        ''')
+        
+        # Work shifts, assignments and the cached lateness/overtime summary
+        self._init_shifts(cursor)
+        
+        # Department tree, membership and the daily / monthly rollups
+        self._init_departments(cursor)
+        
+        # History of maintenance jobs (see utils/maintenance_utils.py)
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS maintenance_log (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                job TEXT NOT NULL,
+                started_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                duration REAL,
+                reclaimed_bytes INTEGER DEFAULT 0,
+                status TEXT NOT NULL,
+                detail TEXT
+            )
+        ''')
+        
         # Create admin table
         cursor.execute('''
             CREATE TABLE IF NOT EXISTS admin (
@@ -62,6 +180,555 @@ class Database:
         conn.commit()
         conn.close()
     
+    def _init_change_log(self, cursor):
+        """Create the change log and the triggers that append to it.
+        
+        Every insert, update and delete on workers and attendance gets a
+        monotonically increasing ``seq``, so readers can fetch only the rows
+        changed since the last ``seq`` they have seen.
+        """
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS change_log (
+                seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                table_name TEXT NOT NULL,
+                row_id INTEGER NOT NULL,
+                operation TEXT NOT NULL,
+                changed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        ''')
+        for table in ("workers", "attendance"):
+            for operation, row in (("INSERT", "new"), ("UPDATE", "new"), ("DELETE", "old")):
+                cursor.execute(f'''
+                    CREATE TRIGGER IF NOT EXISTS {table}_log_{operation.lower()}
+                    AFTER {operation} ON {table} BEGIN
+                        INSERT INTO change_log (table_name, row_id, operation)
+                        VALUES ('{table}', {row}.id, '{operation}');
+                    END
+                ''')
+    
+    def _init_worker_search(self, cursor):
+        """Create the FTS5 index over workers and the triggers that sync it"""
+        cursor.execute("SELECT 1 FROM sqlite_master WHERE name = 'workers_fts'")
+        exists = cursor.fetchone() is not None
+        try:
+            cursor.execute('''
+                CREATE VIRTUAL TABLE IF NOT EXISTS workers_fts USING fts5(
+                    full_name, personal_number, phone,
+                    content='workers', content_rowid='id', prefix='2 3 4'
+                )
+            ''')
+        except sqlite3.OperationalError:
+            # SQLite built without FTS5; search_workers falls back to LIKE
+            return
+        
+        cursor.executescript('''
+            CREATE TRIGGER IF NOT EXISTS workers_fts_insert AFTER INSERT ON workers BEGIN
+                INSERT INTO workers_fts (rowid, full_name, personal_number, phone)
+                VALUES (new.id, new.full_name, new.personal_number, new.phone);
+            END;
+            CREATE TRIGGER IF NOT EXISTS workers_fts_delete AFTER DELETE ON workers BEGIN
+                INSERT INTO workers_fts (workers_fts, rowid, full_name, personal_number, phone)
+                VALUES ('delete', old.id, old.full_name, old.personal_number, old.phone);
+            END;
+            CREATE TRIGGER IF NOT EXISTS workers_fts_update AFTER UPDATE ON workers BEGIN
+                INSERT INTO workers_fts (workers_fts, rowid, full_name, personal_number, phone)
+                VALUES ('delete', old.id, old.full_name, old.personal_number, old.phone);
+                INSERT INTO workers_fts (rowid, full_name, personal_number, phone)
+                VALUES (new.id, new.full_name, new.personal_number, new.phone);
+            END;
+        ''')
+        
+        # Index workers that existed before the search index
+        if not exists:
+            cursor.execute("INSERT INTO workers_fts (workers_fts) VALUES ('rebuild')")
+            cursor.connection.commit()
+    
+    def _init_interval_index(self, cursor):
+        """Create the R*Tree over session intervals and the triggers that sync it.
+        
+        Each session is stored as (entry, exit) in whole seconds of local
+        time; open sessions extend to SESSION_OPEN_END until they are closed.
+        """
+        cursor.execute("SELECT 1 FROM sqlite_master WHERE name = 'attendance_rtree'")
+        exists = cursor.fetchone() is not None
+        try:
+            cursor.execute('''
+                CREATE VIRTUAL TABLE IF NOT EXISTS attendance_rtree
+                USING rtree_i32(id, start_ts, end_ts)
+            ''')
+        except sqlite3.OperationalError:
+            # SQLite built without R*Tree; get_sessions_between falls back to dates
+            return
+        
+        start = "CAST(strftime('%s', {0}.entry_time) AS INTEGER)"
+        end = f"MAX({start}, COALESCE(CAST(strftime('%s', {{0}}.exit_time) AS INTEGER), {SESSION_OPEN_END}))"
+        insert = f"""
+                INSERT INTO attendance_rtree (id, start_ts, end_ts)
+                SELECT new.id, {start.format('new')}, {end.format('new')}
+                WHERE new.entry_time IS NOT NULL;"""
+        cursor.executescript(f'''
+            CREATE TRIGGER IF NOT EXISTS attendance_rtree_insert AFTER INSERT ON attendance BEGIN
+                {insert}
+            END;
+            CREATE TRIGGER IF NOT EXISTS attendance_rtree_update
+            AFTER UPDATE OF id, entry_time, exit_time ON attendance BEGIN
+                DELETE FROM attendance_rtree WHERE id = old.id;
+                {insert}
+            END;
+            CREATE TRIGGER IF NOT EXISTS attendance_rtree_delete AFTER DELETE ON attendance BEGIN
+                DELETE FROM attendance_rtree WHERE id = old.id;
+            END;
+        ''')
+        
+        # Index sessions that existed before the interval index
+        if not exists:
+            cursor.execute(f"""
+                INSERT INTO attendance_rtree (id, start_ts, end_ts)
+                SELECT id, {start.format('attendance')}, {end.format('attendance')}
+                FROM attendance WHERE entry_time IS NOT NULL
+            """)
+            cursor.connection.commit()
+    
+    def _init_shifts(self, cursor):
+        """Create shift tables and the per-day summary cache.
+        
+        ``summary_coverage`` lists the dates whose rows in
+        ``attendance_summary`` are current; any attendance write clears the
+        affected date, so only those dates are evaluated again.
+        """
+        cursor.executescript('''
+            CREATE TABLE IF NOT EXISTS shifts (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                name TEXT UNIQUE NOT NULL,
+                start_time TEXT NOT NULL,
+                end_time TEXT NOT NULL,
+                break_minutes INTEGER DEFAULT 0,
+                grace_minutes INTEGER DEFAULT 0
+            );
+            CREATE TABLE IF NOT EXISTS worker_shifts (
+                worker_id INTEGER NOT NULL,
+                valid_from TEXT NOT NULL,
+                shift_id INTEGER NOT NULL,
+                PRIMARY KEY (worker_id, valid_from),
+                FOREIGN KEY (worker_id) REFERENCES workers (id),
+                FOREIGN KEY (shift_id) REFERENCES shifts (id)
+            );
+            CREATE TABLE IF NOT EXISTS attendance_summary (
+                worker_id INTEGER NOT NULL,
+                date TEXT NOT NULL,
+                shift_id INTEGER,
+                first_entry TIMESTAMP,
+                last_exit TIMESTAMP,
+                sessions INTEGER DEFAULT 0,
+                worked_minutes REAL DEFAULT 0,
+                late_minutes REAL DEFAULT 0,
+                early_minutes REAL DEFAULT 0,
+                overtime_minutes REAL DEFAULT 0,
+                PRIMARY KEY (worker_id, date)
+            );
+            CREATE INDEX IF NOT EXISTS idx_attendance_summary_date ON attendance_summary (date);
+            CREATE TABLE IF NOT EXISTS summary_coverage (
+                date TEXT PRIMARY KEY
+            );
+            CREATE TRIGGER IF NOT EXISTS attendance_summary_insert AFTER INSERT ON attendance BEGIN
+                DELETE FROM summary_coverage WHERE date = new.date;
+            END;
+            CREATE TRIGGER IF NOT EXISTS attendance_summary_update AFTER UPDATE ON attendance BEGIN
+                DELETE FROM summary_coverage WHERE date IN (old.date, new.date);
+            END;
+            CREATE TRIGGER IF NOT EXISTS attendance_summary_delete AFTER DELETE ON attendance BEGIN
+                DELETE FROM summary_coverage WHERE date = old.date;
+            END;
+        ''')
+    
+    def _init_departments(self, cursor):
+        """Create the department tree, worker membership and the rollup tables.
+        
+        Departments form a tree stored as materialized paths ('/1/4/'), so a
+        subtree is one GLOB on ``path``. ``department_daily`` holds each
+        department's own members' totals per day and ``department_monthly``
+        the same per Jalali month ('1403/05'). Triggers keep both current:
+        attendance and attendance_summary writes adjust the day of the
+        worker's department, every day row change is applied to its month,
+        and moving a worker moves their live history with them. Reports
+        add up the rollup rows of a subtree instead of the members' sessions.
+        When the trigger definitions change, the old triggers are replaced
+        and the rollups rebuilt once.
+        """
+        if "department_id" not in {row[1] for row in cursor.execute("PRAGMA table_info(workers)")}:
+            cursor.execute("ALTER TABLE workers ADD COLUMN department_id INTEGER REFERENCES departments (id)")
+        cursor.executescript('''
+            CREATE TABLE IF NOT EXISTS departments (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                name TEXT NOT NULL,
+                parent_id INTEGER REFERENCES departments (id),
+                path TEXT NOT NULL DEFAULT '',
+                UNIQUE (parent_id, name)
+            );
+            CREATE INDEX IF NOT EXISTS idx_departments_path ON departments (path);
+            CREATE INDEX IF NOT EXISTS idx_workers_department ON workers (department_id);
+            CREATE TABLE IF NOT EXISTS department_daily (
+                department_id INTEGER NOT NULL,
+                date TEXT NOT NULL,
+                month TEXT NOT NULL,
+                worker_days INTEGER DEFAULT 0,
+                sessions INTEGER DEFAULT 0,
+                hours REAL DEFAULT 0,
+                late_minutes REAL DEFAULT 0,
+                overtime_minutes REAL DEFAULT 0,
+                PRIMARY KEY (department_id, date)
+            ) WITHOUT ROWID;
+            CREATE TABLE IF NOT EXISTS department_monthly (
+                department_id INTEGER NOT NULL,
+                month TEXT NOT NULL,
+                days INTEGER DEFAULT 0,
+                worker_days INTEGER DEFAULT 0,
+                sessions INTEGER DEFAULT 0,
+                hours REAL DEFAULT 0,
+                late_minutes REAL DEFAULT 0,
+                overtime_minutes REAL DEFAULT 0,
+                PRIMARY KEY (department_id, month)
+            ) WITHOUT ROWID;
+        ''')
+        
+        # Lateness and overtime of a department's day: the attendance_summary
+        # rows of its current members (idx_workers_department, then the summary key)
+        lateness = """COALESCE((
+                    SELECT SUM(s.{column}) FROM workers m
+                    JOIN attendance_summary s ON s.worker_id = m.id AND s.date = {date}
+                    WHERE m.department_id = {department}), 0)"""
+        # A day row exists while its department has sessions that day and
+        # always counts all of its members' summary rows for the day, as
+        # rebuild_department_rollups() computes it; a new row starts from them
+        open_day = f"""
+                INSERT INTO department_daily (department_id, date, month, late_minutes, overtime_minutes)
+                SELECT w.department_id, new.date, substr(new.jalali_date, 1, 7),
+                       {lateness.format(column="late_minutes", date="new.date", department="w.department_id")},
+                       {lateness.format(column="overtime_minutes", date="new.date", department="w.department_id")}
+                FROM workers w
+                WHERE w.id = new.worker_id AND w.department_id IS NOT NULL
+                  AND NOT EXISTS (SELECT 1 FROM department_daily d
+                                  WHERE d.department_id = w.department_id AND d.date = new.date);"""
+        # A session is added to / removed from its worker's department and day;
+        # worker_days only changes with the worker's first / last session of the day
+        add = open_day + """
+                INSERT INTO department_daily (department_id, date, month, worker_days, sessions, hours)
+                SELECT w.department_id, new.date, substr(new.jalali_date, 1, 7),
+                       NOT EXISTS (SELECT 1 FROM attendance a
+                                   WHERE a.worker_id = new.worker_id AND a.date = new.date AND a.id != new.id),
+                       1, COALESCE(new.total_hours, 0)
+                FROM workers w WHERE w.id = new.worker_id AND w.department_id IS NOT NULL
+                ON CONFLICT (department_id, date) DO UPDATE SET
+                    worker_days = worker_days + excluded.worker_days,
+                    sessions = sessions + 1,
+                    hours = hours + excluded.hours;"""
+        remove = """
+                UPDATE department_daily SET
+                    worker_days = worker_days - NOT EXISTS (
+                        SELECT 1 FROM attendance a
+                        WHERE a.worker_id = old.worker_id AND a.date = old.date AND a.id != old.id),
+                    sessions = sessions - 1,
+                    hours = hours - COALESCE(old.total_hours, 0)
+                WHERE department_id = (SELECT department_id FROM workers WHERE id = old.worker_id)
+                  AND date = old.date;"""
+        # Summary rows of days without a row are picked up when the day opens
+        summary = """
+                UPDATE department_daily SET
+                    late_minutes = late_minutes {sign} {row}.late_minutes,
+                    overtime_minutes = overtime_minutes {sign} {row}.overtime_minutes
+                WHERE department_id = (SELECT department_id FROM workers WHERE id = {row}.worker_id)
+                  AND date = {row}.date;"""
+        # A day is dropped with its department's last session
+        prune = """
+                DELETE FROM department_daily
+                WHERE department_id = (SELECT department_id FROM workers WHERE id = old.worker_id)
+                  AND date = old.date AND sessions <= 0;"""
+        # Moving a worker: their sessions and summary rows per day, applied to
+        # the days their old / new department already has
+        moved_sessions = """
+                UPDATE department_daily SET
+                    worker_days = worker_days {sign} 1,
+                    sessions = sessions {sign} (
+                        SELECT COUNT(*) FROM attendance a
+                        WHERE a.worker_id = new.id AND a.date = department_daily.date),
+                    hours = hours {sign} (
+                        SELECT COALESCE(SUM(a.total_hours), 0) FROM attendance a
+                        WHERE a.worker_id = new.id AND a.date = department_daily.date)
+                WHERE department_id = {department}
+                  AND date IN (SELECT date FROM attendance WHERE worker_id = new.id);"""
+        moved_summary = """
+                UPDATE department_daily SET
+                    late_minutes = late_minutes {sign} (
+                        SELECT s.late_minutes FROM attendance_summary s
+                        WHERE s.worker_id = new.id AND s.date = department_daily.date),
+                    overtime_minutes = overtime_minutes {sign} (
+                        SELECT s.overtime_minutes FROM attendance_summary s
+                        WHERE s.worker_id = new.id AND s.date = department_daily.date)
+                WHERE department_id = {department}
+                  AND date IN (SELECT date FROM attendance_summary WHERE worker_id = new.id);"""
+        triggers = f'''
+            CREATE TRIGGER department_rollup_insert AFTER INSERT ON attendance BEGIN
+                {add}
+            END;
+            CREATE TRIGGER department_rollup_update
+            AFTER UPDATE OF worker_id, date, total_hours ON attendance BEGIN
+                {remove}
+                {add}
+                {prune}
+            END;
+            CREATE TRIGGER department_rollup_delete AFTER DELETE ON attendance BEGIN
+                {remove}
+                {prune}
+            END;
+            CREATE TRIGGER department_summary_insert AFTER INSERT ON attendance_summary BEGIN
+                {summary.format(sign="+", row="new")}
+            END;
+            CREATE TRIGGER department_summary_update AFTER UPDATE ON attendance_summary BEGIN
+                {summary.format(sign="-", row="old")}
+                {summary.format(sign="+", row="new")}
+            END;
+            CREATE TRIGGER department_summary_delete AFTER DELETE ON attendance_summary BEGIN
+                {summary.format(sign="-", row="old")}
+            END;
+            CREATE TRIGGER department_rollup_move AFTER UPDATE OF department_id ON workers
+            WHEN old.department_id IS NOT new.department_id BEGIN
+                {moved_sessions.format(sign="-", department="old.department_id")}
+                {moved_summary.format(sign="-", department="old.department_id")}
+                DELETE FROM department_daily WHERE department_id = old.department_id AND sessions <= 0;
+                {moved_sessions.format(sign="+", department="new.department_id")}
+                {moved_summary.format(sign="+", department="new.department_id")}
+                INSERT INTO department_daily (department_id, date, month, worker_days, sessions,
+                                              hours, late_minutes, overtime_minutes)
+                SELECT new.department_id, a.date, substr(MIN(a.jalali_date), 1, 7), 1, COUNT(*),
+                       COALESCE(SUM(a.total_hours), 0),
+                       {lateness.format(column="late_minutes", date="a.date", department="new.department_id")},
+                       {lateness.format(column="overtime_minutes", date="a.date", department="new.department_id")}
+                FROM attendance a
+                WHERE a.worker_id = new.id AND new.department_id IS NOT NULL
+                GROUP BY a.date
+                ON CONFLICT (department_id, date) DO NOTHING;
+            END;
+            CREATE TRIGGER department_monthly_insert AFTER INSERT ON department_daily BEGIN
+                INSERT INTO department_monthly (department_id, month, days, worker_days, sessions,
+                                                hours, late_minutes, overtime_minutes)
+                VALUES (new.department_id, new.month, 1, new.worker_days, new.sessions,
+                        new.hours, new.late_minutes, new.overtime_minutes)
+                ON CONFLICT (department_id, month) DO UPDATE SET
+                    days = days + 1,
+                    worker_days = worker_days + excluded.worker_days,
+                    sessions = sessions + excluded.sessions,
+                    hours = hours + excluded.hours,
+                    late_minutes = late_minutes + excluded.late_minutes,
+                    overtime_minutes = overtime_minutes + excluded.overtime_minutes;
+            END;
+            CREATE TRIGGER department_monthly_update AFTER UPDATE ON department_daily BEGIN
+                UPDATE department_monthly SET
+                    worker_days = worker_days + new.worker_days - old.worker_days,
+                    sessions = sessions + new.sessions - old.sessions,
+                    hours = hours + new.hours - old.hours,
+                    late_minutes = late_minutes + new.late_minutes - old.late_minutes,
+                    overtime_minutes = overtime_minutes + new.overtime_minutes - old.overtime_minutes
+                WHERE department_id = new.department_id AND month = new.month;
+            END;
+            CREATE TRIGGER department_monthly_delete AFTER DELETE ON department_daily BEGIN
+                UPDATE department_monthly SET
+                    days = days - 1,
+                    worker_days = worker_days - old.worker_days,
+                    sessions = sessions - old.sessions,
+                    hours = hours - old.hours,
+                    late_minutes = late_minutes - old.late_minutes,
+                    overtime_minutes = overtime_minutes - old.overtime_minutes
+                WHERE department_id = old.department_id AND month = old.month;
+                DELETE FROM department_monthly
+                WHERE department_id = old.department_id AND month = old.month AND days <= 0;
+            END;
+        '''
+        # Replace the triggers of an older definition and recompute what they maintained
+        version = hashlib.sha1(triggers.encode("utf-8")).hexdigest()
+        cursor.execute("SELECT value FROM settings WHERE key = 'department_triggers'")
+        row = cursor.fetchone()
+        if row is None or row[0] != version:
+            for (name,) in cursor.execute(
+                    "SELECT name FROM sqlite_master WHERE type = 'trigger' AND name GLOB 'department_*'").fetchall():
+                cursor.execute(f"DROP TRIGGER {name}")
+            cursor.executescript(triggers)
+            self._rebuild_department_rollups(cursor)
+            cursor.execute('''
+                INSERT INTO settings (key, value) VALUES ('department_triggers', ?)
+                ON CONFLICT(key) DO UPDATE SET value = excluded.value
+            ''', (version,))
+            cursor.connection.commit()
+    
+    def _attendance_columns(self, cursor, schema="main"):
+        cursor.execute(f"PRAGMA {schema}.table_info(attendance)")
+        return [(row['name'], row['type']) for row in cursor.fetchall()]
+    
+    def _attendance_view(self, cursor, start_date=None, end_date=None):
+        """Return the name of the attendance relation to read from.
+        
+        Only yearly archives overlapping ``start_date``..``end_date`` (all of
+        them when no range is given) are ATTACHed and combined with the live
+        table in a temporary UNION ALL view; without any matching archive
+        the live ``attendance`` table is used directly. SQLite allows at most
+        ten attached databases per connection, so unbounded queries over
+        more archived years than that need a date range.
+        """
+        cursor.execute("SELECT 1 FROM sqlite_master WHERE name = 'archives'")
+        if cursor.fetchone() is None:
+            return "attendance"
+        if start_date and end_date:
+            cursor.execute("""
+                SELECT year, path, start_date, end_date FROM archives
+                WHERE start_date <= ? AND end_date >= ?
+                ORDER BY year
+            """, (end_date, start_date))
+        else:
+            cursor.execute("SELECT year, path, start_date, end_date FROM archives ORDER BY year")
+        archives = [row for row in cursor.fetchall() if os.path.exists(row['path'])]
+        if not archives:
+            return "attendance"
+        
+        columns = [name for name, _ in self._attendance_columns(cursor)]
+        selects = [f"SELECT {', '.join(columns)} FROM main.attendance"]
+        for archive in archives:
+            schema = f"archive_{archive['year']}"
+            cursor.execute(f"ATTACH DATABASE ? AS {schema}", (archive['path'],))
+            archived = {name for name, _ in self._attendance_columns(cursor, schema)}
+            select_list = ", ".join(c if c in archived else f"NULL AS {c}" for c in columns)
+            # A row still live (archive_year interrupted between its two commits) is read from main
+            selects.append(f"""
+                SELECT {select_list} FROM {schema}.attendance
+                WHERE id NOT IN (SELECT id FROM main.attendance
+                                 WHERE date BETWEEN '{archive['start_date']}' AND '{archive['end_date']}')
+            """)
+        cursor.execute("DROP VIEW IF EXISTS temp.attendance_all")
+        cursor.execute("CREATE TEMP VIEW attendance_all AS " + " UNION ALL ".join(selects))
+        return "attendance_all"
+    
+    def _archive_bounds(self, jalali_year):
+        start = JalaliDate(jalali_year, 1, 1).to_gregorian()
+        next_start = JalaliDate(jalali_year + 1, 1, 1).to_gregorian()
+        return str(start), str(next_start - timedelta(days=1))
+    
+    def get_archives(self):
+        """Get the list of archived years"""
+        conn = self.connect()
+        cursor = conn.cursor()
+        cursor.execute("SELECT * FROM archives ORDER BY year")
+        results = cursor.fetchall()
+        conn.close()
+        return results
+    
+    def archive_year(self, jalali_year):
+        """Move a closed Jalali year of attendance into attendance_<year>.db.
+        
+        In WAL mode a transaction spanning ATTACHed files is atomic in each
+        file but not across them, so the move is two transactions: the rows
+        are copied into the archive and committed, then removed from the
+        live table. A crash in between leaves them in both files, where the
+        archive view reads the live copy; running the year again finishes
+        the move. Rows edited between the two steps stay live until then.
+        """
+        if jalali_year >= JalaliDate.today().year:
+            return False, "فقط سال‌های بسته‌شده قابل بایگانی هستند"
+        
+        start_date, end_date = self._archive_bounds(jalali_year)
+        path = os.path.join(os.path.dirname(os.path.abspath(self.db_path)),
+                            f"attendance_{jalali_year}.db")
+        conn = self.connect()
+        cursor = conn.cursor()
+        try:
+            cursor.execute("ATTACH DATABASE ? AS archive", (path,))
+            
+            # Mirror the live table's columns in the archive file
+            columns = self._attendance_columns(cursor)
+            archived = {name for name, _ in self._attendance_columns(cursor, "archive")}
+            if not archived:
+                definitions = ", ".join(
+                    "id INTEGER PRIMARY KEY" if name == "id" else f"{name} {col_type}"
+                    for name, col_type in columns
+                )
+                cursor.execute(f"CREATE TABLE archive.attendance ({definitions})")
+                cursor.execute("""
+                    CREATE INDEX archive.idx_attendance_worker_date
+                    ON attendance (worker_id, date, id)
+                """)
+                cursor.execute("CREATE INDEX archive.idx_attendance_date ON attendance (date)")
+            else:
+                for name, col_type in columns:
+                    if name not in archived:
+                        cursor.execute(f"ALTER TABLE archive.attendance ADD COLUMN {name} {col_type}")
+            
+            column_list = ", ".join(name for name, _ in columns)
+            cursor.execute(f"""
+                INSERT OR REPLACE INTO archive.attendance ({column_list})
+                SELECT {column_list} FROM main.attendance
+                WHERE date BETWEEN ? AND ?
+            """, (start_date, end_date))
+            # The archive file is durable before any live row goes
+            conn.commit()
+            
+            cursor.execute("SELECT COALESCE(MAX(seq), 0) FROM change_log")
+            last_seq = cursor.fetchone()[0]
+            # Department rollups of the archived days stay as they are
+            cursor.execute("""
+                CREATE TEMP TABLE archived_rollups AS
+                SELECT * FROM department_daily WHERE date BETWEEN ? AND ?
+            """, (start_date, end_date))
+            # Only rows whose archived copy is identical; one edited since the copy stays live
+            same = " AND ".join(f"copy.{name} IS attendance.{name}" for name, _ in columns)
+            cursor.execute(f"""
+                DELETE FROM main.attendance
+                WHERE date BETWEEN ? AND ?
+                  AND EXISTS (SELECT 1 FROM archive.attendance copy WHERE {same})
+            """, (start_date, end_date))
+            moved = cursor.rowcount
+            cursor.execute("DELETE FROM department_daily WHERE date BETWEEN ? AND ?", (start_date, end_date))
+            cursor.execute("INSERT INTO department_daily SELECT * FROM temp.archived_rollups")
+            cursor.execute("DROP TABLE temp.archived_rollups")
+            # Archived rows still exist; tell change-feed readers apart from deletions
+            cursor.execute("""
+                UPDATE change_log SET operation = 'ARCHIVE'
+                WHERE seq > ? AND table_name = 'attendance' AND operation = 'DELETE'
+            """, (last_seq,))
+            cursor.execute("SELECT COUNT(*) FROM archive.attendance")
+            row_count = cursor.fetchone()[0]
+            cursor.execute("""
+                INSERT INTO archives (year, path, start_date, end_date, row_count)
+                VALUES (?, ?, ?, ?, ?)
+                ON CONFLICT(year) DO UPDATE SET
+                    path = excluded.path,
+                    row_count = excluded.row_count,
+                    archived_at = CURRENT_TIMESTAMP
+            """, (jalali_year, path, start_date, end_date, row_count))
+            conn.commit()
+            return True, f"{moved} رکورد به بایگانی سال {jalali_year} منتقل شد"
+        except Exception as e:
+            conn.rollback()
+            return False, f"خطا در بایگانی: {e}"
+        finally:
+            conn.close()
+    
+    def get_setting(self, key, default=None):
+        """Get a value from the settings table"""
+        conn = self.connect()
+        cursor = conn.cursor()
+        cursor.execute("SELECT value FROM settings WHERE key = ?", (key,))
+        row = cursor.fetchone()
+        conn.close()
+        return row['value'] if row else default
+    
+    def set_setting(self, key, value):
+        """Store a value in the settings table"""
+        conn = self.connect()
+        cursor = conn.cursor()
+        cursor.execute("""
+            INSERT INTO settings (key, value) VALUES (?, ?)
+            ON CONFLICT(key) DO UPDATE SET value = excluded.value
+        """, (key, str(value)))
+        conn.commit()
+        conn.close()
+    
     def create_admin(self, username, password):
         """Create admin user"""
         conn = self.connect()
@@ -115,6 +782,36 @@ class Database:
         conn.close()
         return results
     
+    def search_workers(self, text, limit=20):
+        """Prefix search over worker name, personal number and phone"""
+        tokens = re.findall(r"\w+", digits.fa_to_en(text or ""))
+        if not tokens:
+            return []
+        
+        conn = self.connect()
+        cursor = conn.cursor()
+        try:
+            # Every token must match as a prefix (implicit AND)
+            match = " ".join(f'"{token}"*' for token in tokens)
+            cursor.execute("""
+                SELECT w.* FROM workers_fts f
+                JOIN workers w ON w.id = f.rowid
+                WHERE workers_fts MATCH ?
+                LIMIT ?
+            """, (match, limit))
+        except sqlite3.OperationalError:
+            conditions = " AND ".join(
+                "(full_name LIKE ? OR personal_number LIKE ? OR phone LIKE ?)" for _ in tokens
+            )
+            params = []
+            for token in tokens:
+                params.extend([f"%{token}%"] * 3)
+            cursor.execute(f"SELECT * FROM workers WHERE {conditions} LIMIT ?", (*params, limit))
+        
+        results = sorted(cursor.fetchall(), key=lambda w: w['full_name'])
+        conn.close()
+        return results
+    
     def record_entry(self, worker_id):
         """Record worker entry time"""
         conn = self.connect()
@@ -163,54 +860,632 @@ class Database:
         conn.close()
         return True, f"خروج با موفقیت ثبت شد. مدت حضور: {total_hours:.2f} ساعت"
     
+    def get_open_sessions(self):
+        """Get all sessions without an exit time, with worker info"""
+        conn = self.connect()
+        cursor = conn.cursor()
+        cursor.execute("""
+            SELECT a.*, w.full_name, w.personal_number
+            FROM attendance a INDEXED BY idx_attendance_open
+            JOIN workers w ON a.worker_id = w.id
+            WHERE a.exit_time IS NULL
+        """)
+        results = cursor.fetchall()
+        conn.close()
+        return results
+    
+    def close_stale_sessions(self, policy=None, before=None, shift_end=None, cap_hours=None):
+        """Close or flag open sessions from days before ``before`` (default: today).
+        
+        Policies (arguments default to the ``sweep_*`` settings):
+        ``shift_end`` closes at the end of the session's shift (sessions
+        that started later get a zero-length close), ``cap`` closes
+        ``cap_hours`` after entry and ``flag`` only marks them. The shift
+        is the worker's assigned one (an overnight shift ends the next
+        day), else one ending at ``shift_end``; sessions whose shift has
+        not ended yet are left open. Every touched row gets
+        ``needs_review = 1``. It is a single set-based UPDATE driven by the
+        open-session index. Returns (count, message).
+        """
+        policy = policy or self.get_setting("sweep_policy", "shift_end")
+        before = before or datetime.now().strftime('%Y-%m-%d')
+        shift_end = shift_end or self.get_setting("sweep_shift_end", "17:00:00")
+        if policy == "shift_end":
+            new_exit = """CASE WHEN julianday(entry_time) > julianday(shift_ends)
+                               THEN entry_time ELSE shift_ends END"""
+        elif policy == "cap":
+            cap_hours = float(cap_hours or self.get_setting("sweep_cap_hours", 8))
+            new_exit = "strftime('%Y-%m-%d %H:%M:%S', entry_time, :cap)"
+        elif policy != "flag":
+            return 0, f"سیاست نامعتبر: {policy}"
+        
+        conn = self.connect()
+        cursor = conn.cursor()
+        # Open sessions of earlier days whose shift is over, with the time it ended
+        # (same text form as the exit times written by record_exit)
+        stale = """
+            WITH stale AS (
+                SELECT a.id, a.entry_time,
+                       CASE WHEN s.id IS NULL
+                            THEN strftime('%Y-%m-%d %H:%M:%S', a.date || ' ' || :shift_end)
+                            ELSE strftime('%Y-%m-%d %H:%M:%S', a.date || ' ' || s.end_time,
+                                          CASE WHEN s.end_time <= s.start_time THEN '+1 day' ELSE '+0 day' END)
+                       END AS shift_ends
+                FROM attendance a INDEXED BY idx_attendance_open
+                LEFT JOIN shifts s ON s.id = (
+                    SELECT ws.shift_id FROM worker_shifts ws
+                    WHERE ws.worker_id = a.worker_id AND ws.valid_from <= a.date
+                    ORDER BY ws.valid_from DESC LIMIT 1)
+                WHERE a.exit_time IS NULL AND a.date < :before
+            ), ended AS (
+                SELECT * FROM stale WHERE shift_ends <= :now
+            )"""
+        params = {"before": before, "shift_end": shift_end,
+                  "now": datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+                  "cap": f"+{cap_hours * 3600:.0f} seconds" if policy == "cap" else None}
+        try:
+            if policy == "flag":
+                cursor.execute(f"""
+                    {stale}
+                    UPDATE attendance SET needs_review = 1
+                    FROM ended
+                    WHERE attendance.id = ended.id AND attendance.needs_review = 0
+                """, params)
+            else:
+                cursor.execute(f"""
+                    {stale}
+                    UPDATE attendance SET
+                        exit_time = closing.new_exit,
+                        total_hours = ROUND((julianday(closing.new_exit)
+                                             - julianday(attendance.entry_time)) * 24, 6),
+                        needs_review = 1
+                    FROM (SELECT id, {new_exit} AS new_exit FROM ended) AS closing
+                    WHERE attendance.id = closing.id
+                """, params)
+            # rowcount is -1 for statements starting with WITH; changes() ignores trigger writes
+            cursor.execute("SELECT changes()")
+            count = cursor.fetchone()[0]
+            conn.commit()
+        except sqlite3.Error as e:
+            conn.rollback()
+            return 0, f"خطا در بستن جلسات باز: {e}"
+        finally:
+            conn.close()
+        if policy == "flag":
+            return count, f"{count} جلسه باز برای بررسی علامت‌گذاری شد"
+        return count, f"{count} جلسه باز بسته شد"
+    
+    def add_shift(self, name, start_time, end_time, break_minutes=0, grace_minutes=0):
+        """Add a shift; times are 'HH:MM' (an end before the start means overnight)"""
+        pattern = r"([01]\d|2[0-3]):[0-5]\d(:[0-5]\d)?"
+        if not re.fullmatch(pattern, start_time) or not re.fullmatch(pattern, end_time):
+            return False, "ساعت شیفت باید به صورت HH:MM باشد"
+        conn = self.connect()
+        cursor = conn.cursor()
+        try:
+            cursor.execute("""
+                INSERT INTO shifts (name, start_time, end_time, break_minutes, grace_minutes)
+                VALUES (?, ?, ?, ?, ?)
+            """, (name, start_time, end_time, break_minutes, grace_minutes))
+            conn.commit()
+            return True, "شیفت با موفقیت اضافه شد"
+        except sqlite3.IntegrityError:
+            return False, "شیفتی با این نام وجود دارد"
+        finally:
+            conn.close()
+    
+    def get_shifts(self):
+        """Get all shifts"""
+        conn = self.connect()
+        cursor = conn.cursor()
+        cursor.execute("SELECT * FROM shifts ORDER BY name")
+        results = cursor.fetchall()
+        conn.close()
+        return results
+    
+    def delete_shift(self, shift_id):
+        """Delete a shift and its assignments"""
+        conn = self.connect()
+        cursor = conn.cursor()
+        cursor.execute("DELETE FROM worker_shifts WHERE shift_id = ?", (shift_id,))
+        cursor.execute("DELETE FROM shifts WHERE id = ?", (shift_id,))
+        cursor.execute("DELETE FROM summary_coverage")
+        conn.commit()
+        conn.close()
+    
+    def assign_shift(self, worker_id, shift_id, valid_from):
+        """Put a worker on a shift from ``valid_from`` (Gregorian date) onwards"""
+        conn = self.connect()
+        cursor = conn.cursor()
+        cursor.execute("""
+            INSERT INTO worker_shifts (worker_id, valid_from, shift_id) VALUES (?, ?, ?)
+            ON CONFLICT (worker_id, valid_from) DO UPDATE SET shift_id = excluded.shift_id
+        """, (worker_id, valid_from, shift_id))
+        cursor.execute("DELETE FROM summary_coverage WHERE date >= ?", (valid_from,))
+        conn.commit()
+        conn.close()
+        return True, "شیفت کارمند ثبت شد"
+    
+    def get_worker_shifts(self, worker_id=None):
+        """Get shift assignments, optionally for one worker"""
+        conn = self.connect()
+        cursor = conn.cursor()
+        query = """
+            SELECT ws.*, s.name AS shift_name, w.full_name, w.personal_number
+            FROM worker_shifts ws
+            JOIN shifts s ON ws.shift_id = s.id
+            JOIN workers w ON ws.worker_id = w.id
+        """
+        if worker_id is not None:
+            cursor.execute(query + " WHERE ws.worker_id = ? ORDER BY ws.valid_from", (worker_id,))
+        else:
+            cursor.execute(query + " ORDER BY w.full_name, ws.valid_from")
+        results = cursor.fetchall()
+        conn.close()
+        return results
+    
+    def refresh_shift_summary(self, start_date, end_date):
+        """Evaluate the dates in range whose summary is missing or outdated.
+        
+        All stale dates are evaluated in one vectorized pass (see
+        utils/shift_utils.py) and upserted. Returns the number of dates
+        evaluated.
+        """
+        from utils.shift_utils import evaluate_days, summary_rows
+        
+        first = datetime.strptime(start_date, '%Y-%m-%d')
+        days = [(first + timedelta(days=i)).strftime('%Y-%m-%d')
+                for i in range((datetime.strptime(end_date, '%Y-%m-%d') - first).days + 1)]
+        conn = self.connect()
+        cursor = conn.cursor()
+        cursor.execute("SELECT date FROM summary_coverage WHERE date BETWEEN ? AND ?",
+                       (start_date, end_date))
+        covered = {row['date'] for row in cursor.fetchall()}
+        stale = [day for day in days if day not in covered]
+        if not stale:
+            conn.close()
+            return 0
+        
+        stale_set = set(stale)
+        source = self._attendance_view(cursor, stale[0], stale[-1])
+        cursor.execute(f"""
+            SELECT worker_id, date, entry_time, exit_time FROM {source}
+            WHERE date BETWEEN ? AND ?
+        """, (stale[0], stale[-1]))
+        sessions = [row for row in cursor.fetchall() if row['date'] in stale_set]
+        cursor.execute("SELECT worker_id, shift_id, valid_from FROM worker_shifts")
+        assignments = cursor.fetchall()
+        cursor.execute("SELECT * FROM shifts")
+        shifts = {row['id']: row for row in cursor.fetchall()}
+        rows = summary_rows(evaluate_days(sessions, assignments, shifts))
+        
+        # Days that no longer have sessions for a worker lose their row
+        cursor.execute("""
+            SELECT worker_id, date FROM attendance_summary WHERE date BETWEEN ? AND ?
+        """, (stale[0], stale[-1]))
+        fresh = {(row[0], row[1]) for row in rows}
+        gone = [(row['worker_id'], row['date']) for row in cursor.fetchall()
+                if row['date'] in stale_set and (row['worker_id'], row['date']) not in fresh]
+        
+        cursor.executemany("DELETE FROM attendance_summary WHERE worker_id = ? AND date = ?", gone)
+        cursor.executemany("""
+            INSERT INTO attendance_summary (worker_id, date, shift_id, first_entry, last_exit,
+                sessions, worked_minutes, late_minutes, early_minutes, overtime_minutes)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT (worker_id, date) DO UPDATE SET
+                shift_id = excluded.shift_id,
+                first_entry = excluded.first_entry,
+                last_exit = excluded.last_exit,
+                sessions = excluded.sessions,
+                worked_minutes = excluded.worked_minutes,
+                late_minutes = excluded.late_minutes,
+                early_minutes = excluded.early_minutes,
+                overtime_minutes = excluded.overtime_minutes
+        """, rows)
+        cursor.executemany("INSERT OR IGNORE INTO summary_coverage (date) VALUES (?)",
+                           [(day,) for day in stale])
+        conn.commit()
+        conn.close()
+        return len(stale)
+    
+    def get_shift_summary(self, start_date, end_date, worker_id=None):
+        """Lateness, early departure, overtime and net minutes per worker over a date range"""
+        self.refresh_shift_summary(start_date, end_date)
+        conn = self.connect()
+        cursor = conn.cursor()
+        query = """
+            SELECT s.worker_id, w.full_name, w.personal_number,
+                   COUNT(*) AS days_worked,
+                   SUM(s.late_minutes > 0) AS late_days,
+                   SUM(s.late_minutes) AS late_minutes,
+                   SUM(s.early_minutes) AS early_minutes,
+                   SUM(s.overtime_minutes) AS overtime_minutes,
+                   SUM(s.worked_minutes) AS worked_minutes
+            FROM attendance_summary s
+            JOIN workers w ON s.worker_id = w.id
+            WHERE s.date BETWEEN ? AND ?
+        """
+        params = [start_date, end_date]
+        if worker_id is not None:
+            query += " AND s.worker_id = ?"
+            params.append(worker_id)
+        cursor.execute(query + " GROUP BY s.worker_id ORDER BY w.full_name", params)
+        results = cursor.fetchall()
+        conn.close()
+        return results
+    
+    def add_department(self, name, parent_id=None):
+        """Add a department, at the top level or under ``parent_id``"""
+        conn = self.connect()
+        cursor = conn.cursor()
+        try:
+            parent_path = "/"
+            if parent_id is not None:
+                cursor.execute("SELECT path FROM departments WHERE id = ?", (parent_id,))
+                parent = cursor.fetchone()
+                if parent is None:
+                    return False, "واحد بالادستی یافت نشد"
+                parent_path = parent['path']
+            # UNIQUE (parent_id, name) does not cover top-level departments (NULL parent)
+            cursor.execute("SELECT 1 FROM departments WHERE name = ? AND parent_id IS ?", (name, parent_id))
+            if cursor.fetchone():
+                return False, "واحدی با این نام در این سطح وجود دارد"
+            cursor.execute("INSERT INTO departments (name, parent_id) VALUES (?, ?)", (name, parent_id))
+            cursor.execute("UPDATE departments SET path = ? || id || '/' WHERE id = ?",
+                           (parent_path, cursor.lastrowid))
+            conn.commit()
+            return True, "واحد با موفقیت اضافه شد"
+        finally:
+            conn.close()
+    
+    def get_departments(self):
+        """All departments in tree order, with their depth and own member count"""
+        conn = self.connect()
+        cursor = conn.cursor()
+        cursor.execute("""
+            SELECT d.*,
+                   length(d.path) - length(replace(d.path, '/', '')) - 2 AS depth,
+                   (SELECT COUNT(*) FROM workers w WHERE w.department_id = d.id) AS members
+            FROM departments d
+            ORDER BY d.path
+        """)
+        results = cursor.fetchall()
+        conn.close()
+        return results
+    
+    def delete_department(self, department_id):
+        """Delete a department without sub-departments; its members are left unassigned"""
+        conn = self.connect()
+        cursor = conn.cursor()
+        try:
+            cursor.execute("SELECT 1 FROM departments WHERE parent_id = ?", (department_id,))
+            if cursor.fetchone():
+                return False, "ابتدا زیرمجموعه‌های این واحد را حذف کنید"
+            cursor.execute("UPDATE workers SET department_id = NULL WHERE department_id = ?", (department_id,))
+            cursor.execute("DELETE FROM department_daily WHERE department_id = ?", (department_id,))
+            cursor.execute("DELETE FROM departments WHERE id = ?", (department_id,))
+            conn.commit()
+            return True, "واحد حذف شد"
+        finally:
+            conn.close()
+    
+    def set_worker_department(self, worker_id, department_id):
+        """Move a worker to a department (None to unassign); their live history moves too"""
+        conn = self.connect()
+        cursor = conn.cursor()
+        cursor.execute("UPDATE workers SET department_id = ? WHERE id = ?", (department_id, worker_id))
+        conn.commit()
+        conn.close()
+        return True, "واحد کارمند ثبت شد"
+    
+    def get_department_dashboard(self, year, month=None):
+        """Totals per department over a Jalali month (or year), each including its sub-departments.
+        
+        Reads department_monthly only: one row per department and month,
+        however many members and sessions there are. Lateness and overtime
+        come from the shift summary, which is brought up to date first.
+        """
+        from utils.persian_utils import jalali_period_range
+        
+        start_date, end_date = jalali_period_range(year, month)
+        today = datetime.now().strftime('%Y-%m-%d')
+        if start_date <= today:
+            self.refresh_shift_summary(start_date, min(end_date, today))
+        first, last = (f"{year}/{month:02d}",) * 2 if month else (f"{year}/01", f"{year}/12")
+        conn = self.connect()
+        cursor = conn.cursor()
+        cursor.execute("""
+            SELECT d.id, d.name, d.parent_id, d.path,
+                   length(d.path) - length(replace(d.path, '/', '')) - 2 AS depth,
+                   (SELECT COUNT(*) FROM workers w JOIN departments c ON w.department_id = c.id
+                    WHERE c.path GLOB d.path || '*') AS members,
+                   COALESCE(SUM(m.worker_days), 0) AS worker_days,
+                   COALESCE(SUM(m.sessions), 0) AS sessions,
+                   COALESCE(SUM(m.hours), 0) AS hours,
+                   COALESCE(SUM(m.late_minutes), 0) AS late_minutes,
+                   COALESCE(SUM(m.overtime_minutes), 0) AS overtime_minutes
+            FROM departments d
+            JOIN departments c ON c.path GLOB d.path || '*'
+            LEFT JOIN department_monthly m ON m.department_id = c.id AND m.month BETWEEN ? AND ?
+            GROUP BY d.id
+            ORDER BY d.path
+        """, (first, last))
+        results = cursor.fetchall()
+        conn.close()
+        return results
+    
+    def get_department_days(self, department_id, start_date, end_date):
+        """Daily totals of a department and its sub-departments"""
+        conn = self.connect()
+        cursor = conn.cursor()
+        cursor.execute("""
+            SELECT r.date, SUM(r.worker_days) AS worker_days, SUM(r.sessions) AS sessions,
+                   SUM(r.hours) AS hours, SUM(r.late_minutes) AS late_minutes,
+                   SUM(r.overtime_minutes) AS overtime_minutes
+            FROM departments c
+            JOIN department_daily r ON r.department_id = c.id AND r.date BETWEEN ? AND ?
+            WHERE c.path GLOB (SELECT path FROM departments WHERE id = ?) || '*'
+            GROUP BY r.date
+            ORDER BY r.date
+        """, (start_date, end_date, department_id))
+        results = cursor.fetchall()
+        conn.close()
+        return results
+    
+    def rebuild_department_rollups(self):
+        """Recompute the rollups of live attendance from scratch.
+        
+        The triggers keep them current, so this is only needed after
+        changing the database by other means. Days of archived years keep
+        the totals they had when they were archived.
+        """
+        conn = self.connect()
+        cursor = conn.cursor()
+        days = self._rebuild_department_rollups(cursor)
+        conn.commit()
+        conn.close()
+        return days
+    
+    def _rebuild_department_rollups(self, cursor):
+        cursor.execute("SELECT COALESCE(MAX(end_date), '') FROM archives")
+        archived_until = cursor.fetchone()[0]
+        cursor.execute("DELETE FROM department_daily WHERE date > ?", (archived_until,))
+        cursor.execute("""
+            WITH sessions AS (
+                SELECT w.department_id, a.date, substr(MIN(a.jalali_date), 1, 7) AS month,
+                       COUNT(DISTINCT a.worker_id) AS worker_days, COUNT(*) AS sessions,
+                       COALESCE(SUM(a.total_hours), 0) AS hours
+                FROM attendance a JOIN workers w ON w.id = a.worker_id
+                WHERE w.department_id IS NOT NULL AND a.date > ?
+                GROUP BY w.department_id, a.date
+            ), lateness AS (
+                SELECT w.department_id, s.date, SUM(s.late_minutes) AS late_minutes,
+                       SUM(s.overtime_minutes) AS overtime_minutes
+                FROM attendance_summary s JOIN workers w ON w.id = s.worker_id
+                WHERE w.department_id IS NOT NULL AND s.date > ?
+                GROUP BY w.department_id, s.date
+            )
+            INSERT INTO department_daily (department_id, date, month, worker_days, sessions,
+                                          hours, late_minutes, overtime_minutes)
+            SELECT x.department_id, x.date, x.month, x.worker_days, x.sessions, x.hours,
+                   COALESCE(l.late_minutes, 0), COALESCE(l.overtime_minutes, 0)
+            FROM sessions x
+            LEFT JOIN lateness l ON l.department_id = x.department_id AND l.date = x.date
+        """, (archived_until, archived_until))
+        cursor.execute("DELETE FROM department_monthly")
+        cursor.execute("""
+            INSERT INTO department_monthly (department_id, month, days, worker_days, sessions,
+                                            hours, late_minutes, overtime_minutes)
+            SELECT department_id, month, COUNT(*), SUM(worker_days), SUM(sessions),
+                   SUM(hours), SUM(late_minutes), SUM(overtime_minutes)
+            FROM department_daily
+            GROUP BY department_id, month
+        """)
+        cursor.execute("SELECT COUNT(*) FROM department_daily")
+        return cursor.fetchone()[0]
+    
     def get_worker_attendance(self, worker_id, start_date=None, end_date=None):
         """Get worker attendance records"""
+        query = self.attendance_query().worker(worker_id).order_by("date", descending=True)
+        if start_date and end_date:
+            query.between(start_date, end_date)
+        return query.fetch()
+    
+    def get_worker_attendance_page(self, worker_id, limit=50, before=None):
+        """Get one page of worker attendance records, newest first.
+        
+        ``before`` is the ``(date, id)`` of the last record already loaded;
+        paging continues from there using the (worker_id, date, id) index.
+        """
         conn = self.connect()
         cursor = conn.cursor()
         
-        if start_date and end_date:
-            cursor.execute("""
-                SELECT * FROM attendance 
-                WHERE worker_id = ? AND date BETWEEN ? AND ?
-                ORDER BY date DESC
-            """, (worker_id, start_date, end_date))
+        if before:
+            source = self._attendance_view(cursor, "0000-00-00", before[0])
+            cursor.execute(f"""
+                SELECT * FROM {source}
+                WHERE worker_id = ? AND (date, id) < (?, ?)
+                ORDER BY date DESC, id DESC
+                LIMIT ?
+            """, (worker_id, before[0], before[1], limit))
         else:
-            cursor.execute("""
-                SELECT * FROM attendance 
+            source = self._attendance_view(cursor)
+            cursor.execute(f"""
+                SELECT * FROM {source}
                 WHERE worker_id = ?
-                ORDER BY date DESC
-            """, (worker_id,))
+                ORDER BY date DESC, id DESC
+                LIMIT ?
+            """, (worker_id, limit))
         
         results = cursor.fetchall()
         conn.close()
         return results
     
+    def get_attendance_by_ids(self, attendance_ids):
+        """Get attendance records with worker info for the given ids"""
+        attendance_ids = list(attendance_ids)
+        conn = self.connect()
+        cursor = conn.cursor()
+        results = []
+        # Stay well below SQLite's bound parameter limit
+        for i in range(0, len(attendance_ids), 500):
+            chunk = attendance_ids[i:i + 500]
+            placeholders = ", ".join("?" * len(chunk))
+            cursor.execute(f"""
+                SELECT a.*, w.full_name, w.personal_number
+                FROM attendance a
+                JOIN workers w ON a.worker_id = w.id
+                WHERE a.id IN ({placeholders})
+            """, chunk)
+            results.extend(cursor.fetchall())
+        conn.close()
+        return results
+    
+    def attendance_query(self):
+        """Start a composable attendance query (see utils/query_utils.py)"""
+        from utils.query_utils import AttendanceQuery
+        return AttendanceQuery(self)
+    
     def get_all_attendance(self, start_date=None, end_date=None):
         """Get all attendance records with worker info"""
+        query = self.attendance_query().order_by("date", descending=True).order_by("full_name")
+        if start_date and end_date:
+            query.between(start_date, end_date)
+        return query.fetch()
+    
+    def iter_attendance_batches(self, start_date=None, end_date=None, batch_size=50000):
+        """Yield attendance records with worker info in batches of ``batch_size`` rows"""
+        query = self.attendance_query().order_by("date").order_by("id")
+        if start_date and end_date:
+            query.between(start_date, end_date)
+        return query.iter_batches(batch_size)
+    
+    def get_sessions_between(self, start, end=None):
+        """Sessions overlapping ``start``..``end`` (a single instant without ``end``).
+        
+        ``start`` and ``end`` are local datetimes or ISO strings. Live
+        sessions are found through the attendance_rtree interval index,
+        including sessions that cross midnight or are still open; archived
+        years covering the range are scanned by date.
+        """
+        start = datetime.fromisoformat(str(start))
+        end = datetime.fromisoformat(str(end)) if end else start
+        since = (start - timedelta(days=1)).strftime('%Y-%m-%d')
+        until = end.strftime('%Y-%m-%d')
+        columns = """
+            a.id, a.worker_id, w.full_name, w.personal_number, a.date, a.jalali_date,
+            a.entry_time, a.exit_time, a.total_hours
+        """
         conn = self.connect()
         cursor = conn.cursor()
+        source = self._attendance_view(cursor, since, until)
+        cursor.execute("SELECT 1 FROM sqlite_master WHERE name = 'attendance_rtree'")
+        if cursor.fetchone() is not None:
+            epoch = datetime(1970, 1, 1)
+            cursor.execute(f"""
+                SELECT {columns}
+                FROM attendance_rtree r
+                JOIN attendance a ON a.id = r.id
+                JOIN workers w ON a.worker_id = w.id
+                WHERE r.start_ts <= ? AND r.end_ts >= ?
+            """, (int((end - epoch).total_seconds()), int((start - epoch).total_seconds())))
+            results, schemas = cursor.fetchall(), []
+        else:
+            results, schemas = [], ["main"]
+        if source != "attendance":
+            cursor.execute("PRAGMA database_list")
+            schemas += [row['name'] for row in cursor.fetchall() if row['name'].startswith("archive_")]
         
-        query = """
-            SELECT a.*, w.full_name, w.personal_number 
-            FROM attendance a
-            JOIN workers w ON a.worker_id = w.id
-        """
+        for schema in schemas:
+            cursor.execute(f"""
+                SELECT {columns}
+                FROM {schema}.attendance a
+                JOIN workers w ON a.worker_id = w.id
+                WHERE a.date BETWEEN ? AND ?
+                  AND julianday(a.entry_time) <= julianday(?)
+                  AND (a.exit_time IS NULL OR julianday(a.exit_time) >= julianday(?))
+            """, (since, until, end.isoformat(), start.isoformat()))
+            # Rows of an interrupted archive_year are in both files; the live copy wins
+            seen = {row['id'] for row in results}
+            results.extend(row for row in cursor.fetchall() if row['id'] not in seen)
+        conn.close()
+        return sorted(results, key=lambda r: str(r['entry_time']))
+    
+    def get_session_times(self, start_date, end_date):
+        """(entry_time, exit_time) tuples of sessions touching the date range.
         
-        if start_date and end_date:
-            query += " WHERE a.date BETWEEN ? AND ?"
-            cursor.execute(query + " ORDER BY a.date DESC, w.full_name", (start_date, end_date))
-        else:
-            cursor.execute(query + " ORDER BY a.date DESC, w.full_name")
+        Sessions are read from the day before ``start_date`` so overnight
+        sessions are included; rows are plain tuples for speed.
+        """
+        since = (datetime.strptime(start_date, '%Y-%m-%d') - timedelta(days=1)).strftime('%Y-%m-%d')
+        conn = self.connect()
+        cursor = conn.cursor()
+        source = self._attendance_view(cursor, since, end_date)
+        cursor.row_factory = None
+        cursor.execute(f"""
+            SELECT entry_time, exit_time FROM {source}
+            WHERE date BETWEEN ? AND ?
+        """, (since, end_date))
+        results = cursor.fetchall()
+        conn.close()
+        return results
+    
+    def get_data_generation(self):
+        """Random id of this database's history, renewed when a backup is restored over it.
         
+        Change-log sequence numbers only mean the same data within one
+        generation: a restored database reuses numbers the live one had
+        already passed.
+        """
+        return self.get_setting("data_generation", "")
+    
+    def get_change_watermark(self):
+        """Return the sequence number of the latest logged change"""
+        conn = self.connect()
+        cursor = conn.cursor()
+        # sqlite_sequence survives pruning, unlike MAX(seq)
+        cursor.execute("SELECT seq FROM sqlite_sequence WHERE name = 'change_log'")
+        row = cursor.fetchone()
+        result = row[0] if row else 0
+        conn.close()
+        return result
+    
+    def get_changes_since(self, seq, limit=None):
+        """Get logged changes with a sequence number greater than ``seq``"""
+        conn = self.connect()
+        cursor = conn.cursor()
+        cursor.execute("""
+            SELECT * FROM change_log
+            WHERE seq > ?
+            ORDER BY seq
+            LIMIT ?
+        """, (seq, limit if limit else -1))
         results = cursor.fetchall()
         conn.close()
         return results
     
+    def prune_change_log(self, before_seq):
+        """Delete change log entries older than ``before_seq``"""
+        conn = self.connect()
+        cursor = conn.cursor()
+        cursor.execute("DELETE FROM change_log WHERE seq < ?", (before_seq,))
+        conn.commit()
+        conn.close()
+    
     def delete_worker(self, worker_id):
         """Delete worker and their attendance records"""
         conn = self.connect()
         cursor = conn.cursor()
+        # Archives must be attached before the transaction starts
+        self._attendance_view(cursor)
+        cursor.execute("PRAGMA database_list")
+        archives = [row['name'] for row in cursor.fetchall() if row['name'].startswith("archive_")]
+        
         cursor.execute("DELETE FROM attendance WHERE worker_id = ?", (worker_id,))
+        for archive in archives:
+            cursor.execute(f"DELETE FROM {archive}.attendance WHERE worker_id = ?", (worker_id,))
+        cursor.execute("DELETE FROM worker_shifts WHERE worker_id = ?", (worker_id,))
+        cursor.execute("DELETE FROM attendance_summary WHERE worker_id = ?", (worker_id,))
         cursor.execute("DELETE FROM workers WHERE id = ?", (worker_id,))
         conn.commit()
         conn.close()
@@ -227,43 +1502,267 @@ class Database:
         else:
             end_date = f"{year}-{month + 1:02d}-01"
         
-        cursor.execute("""
+        source = self._attendance_view(cursor, start_date, end_date)
+        cursor.execute(f"""
             SELECT COUNT(*) as days_worked, SUM(total_hours) as total_hours
-            FROM attendance
+            FROM {source}
             WHERE worker_id = ? AND date >= ? AND date < ?
         """, (worker_id, start_date, end_date))
         
         result = cursor.fetchone()
         conn.close()
         return result
+    
+    def _fill_calendar(self, cursor, start_date, end_date):
+        """Add the missing days of ``start_date``..``end_date`` to the calendar"""
+        first = datetime.strptime(start_date, '%Y-%m-%d').date()
+        last = datetime.strptime(end_date, '%Y-%m-%d').date()
+        cursor.execute("SELECT COUNT(*) FROM calendar WHERE date BETWEEN ? AND ?", (start_date, end_date))
+        if cursor.fetchone()[0] == (last - first).days + 1:
+            return
+        rows = []
+        for offset in range((last - first).days + 1):
+            day = first + timedelta(days=offset)
+            # Jalali weeks start on Saturday (0); Friday (6) is the weekend
+            weekday = (day.weekday() + 2) % 7
+            rows.append((str(day), JalaliDate(day).strftime('%Y/%m/%d'), weekday,
+                         0 if weekday == 6 else 1))
+        cursor.executemany("""
+            INSERT OR IGNORE INTO calendar (date, jalali_date, weekday, is_workday)
+            VALUES (?, ?, ?, ?)
+        """, rows)
+    
+    def set_holiday(self, jalali_date, title, is_workday=False):
+        """Mark a Jalali date ('1403/01/01') as a holiday, or back as a workday"""
+        day = JalaliDate(*map(int, digits.fa_to_en(jalali_date).split("/"))).to_gregorian()
+        conn = self.connect()
+        cursor = conn.cursor()
+        self._fill_calendar(cursor, str(day), str(day))
+        cursor.execute("UPDATE calendar SET is_workday = ?, holiday = ? WHERE date = ?",
+                       (1 if is_workday else 0, None if is_workday else title, str(day)))
+        conn.commit()
+        conn.close()
+    
+    def import_holidays(self, file_path):
+        """Import holidays from a CSV of 'jalali date, title[, is_workday]' lines.
+        
+        Lines starting with '#' are ignored. Returns (success, message).
+        """
+        try:
+            with open(file_path, encoding="utf-8-sig", newline="") as f:
+                lines = [row for row in csv.reader(f) if row and not row[0].strip().startswith("#")]
+            holidays = []
+            for row in lines:
+                jalali = digits.fa_to_en(row[0].strip()).replace("-", "/")
+                day = JalaliDate(*map(int, jalali.split("/"))).to_gregorian()
+                workday = len(row) > 2 and row[2].strip() in ("1", "true", "yes")
+                holidays.append((1 if workday else 0, None if workday else row[1].strip(), str(day)))
+        except (OSError, ValueError, IndexError) as e:
+            return False, f"خطا در خواندن فایل تعطیلات: {e}"
+        if not holidays:
+            return False, "فایل تعطیلات خالی است"
+        
+        conn = self.connect()
+        cursor = conn.cursor()
+        dates = sorted(h[2] for h in holidays)
+        self._fill_calendar(cursor, dates[0], dates[-1])
+        cursor.executemany("UPDATE calendar SET is_workday = ?, holiday = ? WHERE date = ?", holidays)
+        conn.commit()
+        conn.close()
+        return True, f"{len(holidays)} روز تعطیل ثبت شد"
+    
+    def get_holidays(self, start_date, end_date):
+        """Non-working days other than Fridays in a date range"""
+        conn = self.connect()
+        cursor = conn.cursor()
+        cursor.execute("""
+            SELECT * FROM calendar
+            WHERE date BETWEEN ? AND ? AND is_workday = 0 AND holiday IS NOT NULL
+            ORDER BY date
+        """, (start_date, end_date))
+        results = cursor.fetchall()
+        conn.close()
+        return results
+    
+    def get_absence_report(self, start_date, end_date, worker_id=None):
+        """Workdays, days present and days absent per worker in one query.
+        
+        Expected workdays come from the calendar (only from the day the
+        worker was added); a workday is an absence when the anti-join finds
+        no attendance row for it, which is a single seek on
+        idx_attendance_worker_date. Days after today are not counted.
+        """
+        end_date = min(end_date, datetime.now().strftime('%Y-%m-%d'))
+        if start_date > end_date:
+            return []
+        conn = self.connect()
+        cursor = conn.cursor()
+        self._fill_calendar(cursor, start_date, end_date)
+        conn.commit()
+        source = self._attendance_view(cursor, start_date, end_date)
+        worker_filter = "AND w.id = ?" if worker_id is not None else ""
+        params = [start_date, end_date]
+        if worker_id is not None:
+            params.append(worker_id)
+        cursor.execute(f"""
+            SELECT worker_id, full_name, personal_number, workdays,
+                   workdays - absent_days AS present_days, absent_days
+            FROM (
+                SELECT w.id AS worker_id, w.full_name, w.personal_number,
+                       COUNT(*) AS workdays,
+                       SUM(NOT EXISTS (
+                           SELECT 1 FROM {source} a WHERE a.worker_id = w.id AND a.date = c.date
+                       )) AS absent_days
+                FROM workers w
+                JOIN calendar c
+                  ON c.date BETWEEN ? AND ? AND c.is_workday = 1 AND c.date >= date(w.created_at)
+                WHERE 1 = 1 {worker_filter}
+                GROUP BY w.id
+            )
+            ORDER BY absent_days DESC, full_name
+        """, params)
+        results = cursor.fetchall()
+        conn.close()
+        return results
+    
+    def get_absent_dates(self, worker_id, start_date, end_date):
+        """Calendar rows of the past workdays on which a worker has no attendance"""
+        end_date = min(end_date, datetime.now().strftime('%Y-%m-%d'))
+        conn = self.connect()
+        cursor = conn.cursor()
+        self._fill_calendar(cursor, start_date, end_date)
+        conn.commit()
+        source = self._attendance_view(cursor, start_date, end_date)
+        cursor.execute(f"""
+            SELECT c.* FROM calendar c
+            JOIN workers w ON w.id = ?
+            WHERE c.date BETWEEN ? AND ? AND c.is_workday = 1 AND c.date >= date(w.created_at)
+              AND NOT EXISTS (
+                  SELECT 1 FROM {source} a WHERE a.worker_id = w.id AND a.date = c.date
+              )
+            ORDER BY c.date
+        """, (worker_id, start_date, end_date))
+        results = cursor.fetchall()
+        conn.close()
+        return results
+    
+    def analytics(self):
+        """Return the analytics mirror if one was built and pyarrow is installed"""
+        from utils import analytics_utils
+        if not analytics_utils.is_available():
+            return None
+        mirror = analytics_utils.AnalyticsMirror(self)
+        return mirror if mirror.exists() else None
+    
+    def get_hours_summary(self, start_date=None, end_date=None, period="month", worker_id=None):
+        """Days worked and total hours per worker and Jalali period.
+        
+        Runs on the columnar analytics mirror when one exists (after an
+        incremental refresh), otherwise directly on SQLite.
+        """
+        mirror = self.analytics()
+        if mirror is not None:
+            mirror.refresh()
+            return mirror.hours_summary(start_date, end_date, period, worker_id)
+        
+        from utils.analytics_utils import PERIOD_PREFIX
+        conn = self.connect()
+        cursor = conn.cursor()
+        source = self._attendance_view(cursor, start_date, end_date)
+        conditions, params = [], []
+        if start_date and end_date:
+            conditions.append("a.date BETWEEN ? AND ?")
+            params += [start_date, end_date]
+        if worker_id is not None:
+            conditions.append("a.worker_id = ?")
+            params.append(worker_id)
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        cursor.execute(f"""
+            SELECT a.worker_id, w.full_name, w.personal_number,
+                   substr(a.jalali_date, 1, {PERIOD_PREFIX[period]}) AS period,
+                   COUNT(*) AS days_worked,
+                   COALESCE(SUM(a.total_hours), 0) AS total_hours
+            FROM {source} a
+            JOIN workers w ON a.worker_id = w.id
+            {where}
+            GROUP BY a.worker_id, period
+            ORDER BY period, w.full_name
+        """, params)
+        results = [dict(row) for row in cursor.fetchall()]
+        conn.close()
+        return results
+    
     def update_attendance_time(self, attendance_id, column, new_time_str):
         """Update entry or exit time for an attendance record and recalculate total hours."""
+        if column not in ("entry_time", "exit_time"):
+            return False, f"ستون نامعتبر: {column}"
+        if column == "entry_time":
+            change = (attendance_id, new_time_str, None)
+        else:
+            change = (attendance_id, None, new_time_str)
+        _, success, message = self.update_attendance_times([change])[0]
+        return success, message
+    
+    def update_attendance_times(self, changes):
+        """Apply many ``(attendance_id, entry_time, exit_time)`` corrections at once.
+        
+        ``None`` leaves that time unchanged. Every row is validated first;
+        the valid ones are written with a single executemany in one
+        transaction and total_hours is recomputed in SQL. Returns a list of
+        ``(attendance_id, success, message)`` in the order of ``changes``.
+        """
+        changes = list(changes)
         conn = self.connect()
         cursor = conn.cursor()
-
+        current = {}
+        ids = [change[0] for change in changes]
+        for i in range(0, len(ids), 500):
+            chunk = ids[i:i + 500]
+            cursor.execute(f"""
+                SELECT id, entry_time, exit_time FROM attendance
+                WHERE id IN ({", ".join("?" * len(chunk))})
+            """, chunk)
+            current.update({row['id']: row for row in cursor.fetchall()})
+        
+        results, params = [], []
+        for attendance_id, entry_time, exit_time in changes:
+            row = current.get(attendance_id)
+            if row is None:
+                results.append((attendance_id, False, "رکورد یافت نشد"))
+                continue
+            try:
+                entry = datetime.fromisoformat(str(entry_time or row['entry_time']))
+                exit_value = exit_time or row['exit_time']
+                exit_ = datetime.fromisoformat(str(exit_value)) if exit_value else None
+            except ValueError as e:
+                results.append((attendance_id, False, f"زمان نامعتبر: {e}"))
+                continue
+            if exit_ is not None and exit_ <= entry:
+                results.append((attendance_id, False, "ساعت خروج باید بعد از ساعت ورود باشد"))
+                continue
+            params.append({"id": attendance_id,
+                           "entry": None if entry_time is None else str(entry_time),
+                           "exit": None if exit_time is None else str(exit_time)})
+            results.append((attendance_id, True, "زمان با موفقیت ویرایش شد."))
+        
         try:
-            cursor.execute(f"UPDATE attendance SET {column} = ? WHERE id = ?", (new_time_str, attendance_id))
-
-            # After updating, fetch the record to recalculate total_hours
-            cursor.execute("SELECT entry_time, exit_time FROM attendance WHERE id = ?", (attendance_id,))
-            record = cursor.fetchone()
-
-            if record and record['entry_time'] and record['exit_time']:
-                entry_time = datetime.fromisoformat(record['entry_time'])
-                exit_time = datetime.fromisoformat(record['exit_time'])
-                if exit_time > entry_time:
-                    total_hours = (exit_time - entry_time).total_seconds() / 3600
-                else:
-                    total_hours = 0  # Or handle as an error case
-                cursor.execute("UPDATE attendance SET total_hours = ? WHERE id = ?", (total_hours, attendance_id))
-            else:
-                # If either entry or exit is NULL, total hours is 0
-                cursor.execute("UPDATE attendance SET total_hours = 0 WHERE id = ?", (attendance_id,))
-
+            cursor.executemany("""
+                UPDATE attendance SET
+                    entry_time = COALESCE(:entry, entry_time),
+                    exit_time = COALESCE(:exit, exit_time),
+                    total_hours = CASE WHEN COALESCE(:exit, exit_time) IS NULL THEN 0 ELSE
+                        -- julianday() is only millisecond-accurate; round off the noise
+                        ROUND((julianday(COALESCE(:exit, exit_time))
+                               - julianday(COALESCE(:entry, entry_time))) * 24, 6)
+                    END
+                WHERE id = :id
+            """, params)
             conn.commit()
-            return True, "زمان با موفقیت ویرایش شد."
-        except Exception as e:
+        except sqlite3.Error as e:
             conn.rollback()
-            return False, f"خطا در ویرایش زمان: {e}"
+            failed = {p["id"] for p in params}
+            results = [(i, False, f"خطا در ویرایش زمان: {e}") if i in failed else (i, ok, msg)
+                       for i, ok, msg in results]
         finally:
-            conn.close()
\ No newline at end of file
+            conn.close()
+        return results
@@ -1,18 +1,34 @@
 import sys
 import os
+import logging
 from PyQt6.QtWidgets import QApplication
 from PyQt6.QtCore import Qt, QLocale
 from PyQt6.QtGui import QFont
 from database import Database
 from ui.login_window import LoginWindow
+from ui import admin_window, worker_window
+from ui.watchdog import EventLoopWatchdog, diagnostics_log_path
+from utils.maintenance_utils import MaintenanceScheduler
+from utils.profiling_utils import QueryProfiler, default_log_path
+
+# Reported in the diagnostics log, so stalls and view timings can be compared between releases
+APP_VERSION = "1.0.0"
 
 def main():
+    logging.basicConfig(format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    
+    # Command-line tools (e.g. "python main.py archive 1402")
+    import cli
+    if cli.is_command(sys.argv[1:]):
+        sys.exit(cli.main(sys.argv[1:]))
+    
     # Create application
     app = QApplication(sys.argv)
     
     # Set application properties
     app.setApplicationName("سیستم مدیریت حضور و غیاب")
     app.setOrganizationName("شرکت شما")
+    app.setApplicationVersion(APP_VERSION)
     
     # Set default font for Persian support
     font = QFont("B Nazanin", 12)
@@ -27,14 +43,30 @@ def main():
     
     # Initialize database
     db = Database()
+    # Per-call timings for the admin panel, slow queries into a rotating log
+    QueryProfiler(default_log_path(db.db_path)).install()
     db.init_db()
     
+    # Close sessions left open on previous days (forgotten clock-outs)
+    db.close_stale_sessions()
+    
+    # Event-loop stall detection and view timings (the "عیب‌یابی" dialog)
+    watchdog = EventLoopWatchdog(diagnostics_log_path(db.db_path))
+    watchdog.time_views(admin_window.AdminWindow, admin_window.TIMED_VIEWS)
+    watchdog.time_views(worker_window.WorkerWindow, worker_window.TIMED_VIEWS)
+    watchdog.start()
+    
     # Create and show login window
     login_window = LoginWindow()
     login_window.show()
     
     # Run application
-    sys.exit(app.exec())
+    exit_code = app.exec()
+    watchdog.stop()
+    
+    # PRAGMA optimize plus any due, time-boxed maintenance
+    MaintenanceScheduler(db).run_due()
+    sys.exit(exit_code)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
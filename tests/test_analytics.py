@@ -0,0 +1,30 @@
+"""AnalyticsMirror.refresh keeps rows that were changed and then archived."""
+from datetime import datetime
+
+import pytest
+
+pytest.importorskip("pyarrow")
+
+from utils.analytics_utils import AnalyticsMirror
+
+
+def test_row_updated_then_archived_stays_in_the_mirror(db, tmp_path):
+    db.add_worker("100", "کارمند")
+    conn = db.connect()
+    conn.execute("""
+        INSERT INTO attendance (worker_id, entry_time, exit_time, date, jalali_date, total_hours)
+        VALUES (1, ?, ?, '2021-05-05', '1400/02/15', 8)
+    """, (datetime(2021, 5, 5, 8), datetime(2021, 5, 5, 16)))
+    conn.commit()
+    conn.close()
+    mirror = AnalyticsMirror(db, str(tmp_path / "mirror"))
+    mirror.rebuild()
+
+    conn = db.connect()
+    conn.execute("UPDATE attendance SET total_hours = 9 WHERE id = 1")
+    conn.commit()
+    conn.close()
+    assert db.archive_year(1400)[0]
+    assert mirror.refresh()
+    [row] = mirror.hours_summary(period="year")
+    assert row['total_hours'] == 9
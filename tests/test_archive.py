@@ -0,0 +1,61 @@
+"""archive_year survives a crash between its archive and live commits."""
+import sqlite3
+from datetime import datetime
+
+from database import Database
+
+
+def add_session(db, day):
+    conn = db.connect()
+    conn.execute("""
+        INSERT INTO attendance (worker_id, entry_time, exit_time, date, jalali_date, total_hours)
+        VALUES (1, ?, ?, ?, '1400/02/15', 8)
+    """, (datetime(*day, 8), datetime(*day, 16), "%04d-%02d-%02d" % day))
+    conn.commit()
+    conn.close()
+
+
+class CrashOnSecondCommit(sqlite3.Connection):
+    commits = 0
+
+    def commit(self):
+        CrashOnSecondCommit.commits += 1
+        if CrashOnSecondCommit.commits == 2:
+            raise sqlite3.OperationalError("disk I/O error")
+        super().commit()
+
+
+def archived_ids(db):
+    conn = db.connect()
+    try:
+        source = db._attendance_view(conn.cursor())
+        return sorted(row['id'] for row in conn.execute(f"SELECT id FROM {source}"))
+    finally:
+        conn.close()
+
+
+def live_count(db):
+    conn = db.connect()
+    try:
+        return conn.execute("SELECT COUNT(*) FROM attendance").fetchone()[0]
+    finally:
+        conn.close()
+
+
+def test_interrupted_archive_is_read_once_and_finished_by_a_rerun(db, monkeypatch):
+    db.add_worker("100", "کارمند")
+    add_session(db, (2021, 5, 5))
+    assert db.archive_year(1400)[0]
+    # A late session of the closed year, archived by a run that dies after the archive commit
+    add_session(db, (2021, 5, 6))
+    monkeypatch.setattr(Database, "connection_factory", CrashOnSecondCommit)
+    assert not db.archive_year(1400)[0]
+    monkeypatch.setattr(Database, "connection_factory", sqlite3.Connection)
+
+    assert live_count(db) == 1
+    assert archived_ids(db) == [1, 2]
+    assert len(db.get_sessions_between("2021-05-06 12:00:00")) == 1
+
+    assert db.archive_year(1400)[0]
+    assert live_count(db) == 0
+    assert archived_ids(db) == [1, 2]
@@ -0,0 +1,148 @@
+"""AttendanceTableModel kept current from the change feed against fresh queries."""
+import random
+from datetime import date, datetime, timedelta
+
+from persiantools.jdatetime import JalaliDate
+
+from ui.attendance_model import AttendanceTableModel, SORT_COLUMNS
+from utils.query_utils import STATUS_OPEN, STATUS_CLOSED
+
+
+def execute(db, sql, params=()):
+    conn = db.connect()
+    conn.execute(sql, params)
+    conn.commit()
+    conn.close()
+
+
+def punch(db, worker_id, day, hours=None):
+    entry = datetime.combine(day, datetime.min.time()) + timedelta(hours=8)
+    execute(db, """
+        INSERT INTO attendance (worker_id, entry_time, exit_time, date, jalali_date, total_hours)
+        VALUES (?, ?, ?, ?, ?, ?)
+    """, (worker_id, entry, entry + timedelta(hours=hours) if hours else None, day.isoformat(),
+          JalaliDate(day).strftime('%Y/%m/%d'), hours))
+
+
+def shown(model):
+    return [model.record(row)['id'] for row in range(model.rowCount())]
+
+
+def query(db, worker_id, status):
+    def make_query():
+        attendance_query = db.attendance_query().between("2024-01-01", "2024-01-31").status(status)
+        return attendance_query.worker(worker_id) if worker_id else attendance_query
+    return make_query
+
+
+def expected(db, worker_id, status, sort_column):
+    return [row['id'] for row in query(db, worker_id, status)().sort(sort_column, True).fetch()]
+
+
+class Counted:
+    """Counts the COUNT queries the model runs"""
+
+    def __init__(self, db):
+        self.db = db
+        self.counts = 0
+
+    def query(self, worker_id, status):
+        def make_query():
+            attendance_query = query(self.db, worker_id, status)()
+            count = attendance_query.count
+
+            def counted():
+                self.counts += 1
+                return count()
+            attendance_query.count = counted
+            return attendance_query
+        return make_query
+
+
+def test_switching_filters_does_not_count_again(db):
+    for i in range(3):
+        db.add_worker(str(100 + i), f"کارمند {i}")
+        punch(db, i + 1, date(2024, 1, 5), 8)
+    model, counted = AttendanceTableModel(), Counted(db)
+    for worker_id in (None, 1, 2, None, 1):
+        model.set_query(counted.query(worker_id, None), key=(worker_id, None))
+    assert counted.counts == 3
+    assert shown(model) == expected(db, 1, None, "date")
+
+
+def test_changes_match_fresh_queries(db):
+    rng = random.Random(47)
+    for i in range(4):
+        db.add_worker(str(100 + i), f"کارمند {i}")
+    days = [date(2023, 12, 30) + timedelta(days=i) for i in range(5)]
+    for _ in range(40):
+        punch(db, rng.randint(1, 4), rng.choice(days), rng.choice([None, 6, 9]))
+    watermark = db.get_change_watermark()
+    model = AttendanceTableModel()
+    model.PAGE_SIZE = 7
+    filters = [(worker_id, status) for worker_id in (None, 1, 3) for status in (None, STATUS_OPEN, STATUS_CLOSED)]
+    for _ in range(150):
+        action = rng.random()
+        # Edits and deletes are of a row on screen, as in the admin panel
+        row = model.record(rng.randrange(model.rowCount())) if model.rowCount() else None
+        if action < 0.3 or row is None:
+            punch(db, rng.randint(1, 4), rng.choice(days), rng.choice([None, 6, 9]))
+        elif action < 0.5:
+            execute(db, "UPDATE attendance SET exit_time = entry_time, total_hours = ? WHERE id = ?",
+                    (rng.choice([1, 2, 3]), row['id']))
+        elif action < 0.6:
+            execute(db, "DELETE FROM attendance WHERE id = ?", (row['id'],))
+        elif action < 0.65:
+            execute(db, "UPDATE workers SET full_name = full_name || '.' WHERE id = ?", (rng.randint(1, 4),))
+        changes = db.get_changes_since(watermark)
+        if changes:
+            watermark = changes[-1]['seq']
+            model.apply_changes(changes)
+        worker_id, status = rng.choice(filters)
+        sort_column = rng.choice([0, 5])
+        model.set_query(query(db, worker_id, status), sort_column, True, key=(worker_id, status))
+        assert shown(model) == expected(db, worker_id, status, SORT_COLUMNS[sort_column])
+
+
+def test_kiosk_punches_do_not_count_again(db):
+    for i in range(3):
+        db.add_worker(str(100 + i), f"کارمند {i}")
+        punch(db, i + 1, date(2024, 1, 5), 8)
+    watermark = db.get_change_watermark()
+    model, counted = AttendanceTableModel(), Counted(db)
+    filters = [(None, None), (1, None), (None, STATUS_OPEN)]
+    for worker_id, status in filters:
+        model.set_query(counted.query(worker_id, status), key=(worker_id, status))
+    for worker_id in (1, 2, 3, 1, 2):
+        # Entry on one sync tick, exit on the next
+        for punched in (lambda: punch(db, worker_id, date(2024, 1, 6)),
+                        lambda: execute(db, """
+                            UPDATE attendance SET exit_time = entry_time, total_hours = 4
+                            WHERE worker_id = ? AND exit_time IS NULL
+                        """, (worker_id,))):
+            punched()
+            changes = db.get_changes_since(watermark)
+            watermark = changes[-1]['seq']
+            model.apply_changes(changes)
+            for shown_filter in filters:
+                model.set_query(counted.query(*shown_filter), key=shown_filter)
+                assert shown(model) == expected(db, *shown_filter, "date")
+    assert counted.counts == len(filters)
+
+
+def test_all_rows_are_cached_until_data_changes(db):
+    from utils.report_cache import ReportCache
+
+    db.add_worker("100", "کارمند")
+    punch(db, 1, date(2024, 1, 5), 8)
+    cache = ReportCache(db)
+    model = AttendanceTableModel(cache=cache)
+    model.set_query(query(db, None, None), key=(None, None))
+    first = model.all_rows()
+    assert model.all_rows() == first
+    assert (cache.hits, cache.misses) == (1, 1)
+    punch(db, 1, date(2024, 1, 6), 8)
+    assert len(model.all_rows()) == 2
+    model.set_query(query(db, None, None), 5, key=(None, None))
+    model.all_rows()
+    assert (cache.hits, cache.misses) == (1, 3)
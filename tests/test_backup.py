@@ -0,0 +1,51 @@
+"""BackupManager: the yearly archive files go with the database."""
+import os
+from datetime import datetime
+
+from utils.backup_utils import BackupManager
+
+
+def archived_db(db):
+    db.add_worker("100", "کارمند")
+    conn = db.connect()
+    conn.execute("""
+        INSERT INTO attendance (worker_id, entry_time, exit_time, date, jalali_date, total_hours)
+        VALUES (1, ?, ?, '2021-05-05', '1400/02/15', 8)
+    """, (datetime(2021, 5, 5, 8), datetime(2021, 5, 5, 16)))
+    conn.commit()
+    conn.close()
+    assert db.archive_year(1400)[0]
+    return db.get_archives()[0]['path']
+
+
+def test_archives_are_copied_once_and_restored(db, tmp_path):
+    archive = archived_db(db)
+    manager = BackupManager(db.db_path, str(tmp_path / "backups"), sleep=0)
+    result = manager.create_backup(compress=True)
+    assert result.verified, result.detail
+    assert result.archives == [str(tmp_path / "backups" / "archives" / "attendance_1400.db.gz")]
+    assert manager.create_backup(compress=True).archives == []
+
+    os.remove(archive)
+    restored = str(tmp_path / "restored.db")
+    manager.restore_backup(result.path, restored)
+    assert manager.restore_archives(restored) == [archive]
+    assert manager.verify_backup(archive, tables=("attendance",)) == (True, "1 attendance rows")
+
+
+def test_missing_archive_is_reported(db, tmp_path):
+    os.remove(archived_db(db))
+    result = BackupManager(db.db_path, str(tmp_path / "backups"), sleep=0).create_backup()
+    assert result.missing_archives and "ARCHIVES MISSING" in str(result)
+
+
+def test_rotation_keeps_archives_in_the_backup_dir(db, tmp_path):
+    # The backup directory is the database's own directory
+    archive = archived_db(db)
+    old = tmp_path / "attendance_20000101_000000.db.gz"
+    old.write_bytes(b"")
+    manager = BackupManager(db.db_path, str(tmp_path), keep=1, sleep=0)
+    result = manager.create_backup(verify=False)
+    assert manager.list_backups() == [result.path]
+    assert not old.exists()
+    assert os.path.exists(archive) and os.path.exists(db.db_path)
@@ -0,0 +1,115 @@
+"""The trigger-maintained department rollups against rebuild_department_rollups()."""
+import random
+from datetime import date, datetime, timedelta
+
+from persiantools.jdatetime import JalaliDate
+
+
+def rollups(db):
+    conn = db.connect()
+    daily = [tuple(row) for row in conn.execute("""
+        SELECT department_id, date, month, worker_days, sessions,
+               round(hours, 6), round(late_minutes, 6), round(overtime_minutes, 6)
+        FROM department_daily ORDER BY department_id, date
+    """)]
+    monthly = [tuple(row) for row in conn.execute("""
+        SELECT department_id, month, days, worker_days, sessions,
+               round(hours, 6), round(late_minutes, 6), round(overtime_minutes, 6)
+        FROM department_monthly ORDER BY department_id, month
+    """)]
+    conn.close()
+    return daily, monthly
+
+
+def assert_matches_rebuild(db):
+    maintained = rollups(db)
+    db.rebuild_department_rollups()
+    assert maintained == rollups(db)
+
+
+def execute(db, sql, params=()):
+    conn = db.connect()
+    conn.execute(sql, params)
+    conn.commit()
+    conn.close()
+
+
+def punch(db, worker_id, day, start, end):
+    """A closed session on ``day`` from ``start`` to ``end`` o'clock"""
+    entry = datetime.combine(day, datetime.min.time()) + timedelta(hours=start)
+    execute(db, """
+        INSERT INTO attendance (worker_id, entry_time, exit_time, date, jalali_date, total_hours)
+        VALUES (?, ?, ?, ?, ?, ?)
+    """, (worker_id, entry, entry + timedelta(hours=end - start), day.isoformat(),
+          JalaliDate(day).strftime('%Y/%m/%d'), end - start))
+
+
+def setup(db, workers):
+    db.add_shift("روز", "08:00", "16:00")
+    db.add_department("الف")
+    db.add_department("ب")
+    departments = [d['id'] for d in db.get_departments()]
+    worker_ids = []
+    for i in range(workers):
+        db.add_worker(str(100 + i), f"کارمند {i}")
+        worker_id = db.get_worker_by_personal_number(str(100 + i))['id']
+        db.assign_shift(worker_id, 1, "2000-01-01")
+        db.set_worker_department(worker_id, departments[i % 2])
+        worker_ids.append(worker_id)
+    return departments, worker_ids
+
+
+def test_summary_only_day_moves_with_worker(db):
+    (first, second), (worker_id,) = setup(db, 1)
+    day = date(2024, 5, 5)
+    punch(db, worker_id, day, 9, 16)
+    db.refresh_shift_summary(day.isoformat(), day.isoformat())
+    execute(db, "DELETE FROM attendance WHERE worker_id = ?", (worker_id,))
+    db.set_worker_department(worker_id, second)
+    punch(db, worker_id, day, 8, 16)
+    db.refresh_shift_summary(day.isoformat(), day.isoformat())
+
+    conn = db.connect()
+    row = conn.execute("SELECT * FROM department_daily WHERE department_id = ? AND date = ?",
+                       (second, day.isoformat())).fetchone()
+    conn.close()
+    assert row['late_minutes'] == 0
+    assert_matches_rebuild(db)
+
+
+def test_random_writes_and_moves_match_rebuild(db):
+    rng = random.Random(48)
+    departments, worker_ids = setup(db, 6)
+    days = [date(2024, 3, 18) + timedelta(days=i) for i in range(4)]
+    choices = departments + [None]
+    for _ in range(300):
+        action = rng.random()
+        worker_id = rng.choice(worker_ids)
+        day = rng.choice(days)
+        if action < 0.35:
+            start = rng.choice([7, 8, 9, 10])
+            punch(db, worker_id, day, start, start + rng.choice([2, 6, 9]))
+        elif action < 0.5:
+            execute(db, """
+                DELETE FROM attendance WHERE id = (
+                    SELECT id FROM attendance WHERE worker_id = ? ORDER BY random() LIMIT 1)
+            """, (worker_id,))
+        elif action < 0.6:
+            execute(db, """
+                UPDATE attendance SET date = ?, jalali_date = ?, total_hours = total_hours + 1 WHERE id = (
+                    SELECT id FROM attendance WHERE worker_id = ? ORDER BY random() LIMIT 1)
+            """, (day.isoformat(), JalaliDate(day).strftime('%Y/%m/%d'), worker_id))
+        elif action < 0.8:
+            db.set_worker_department(worker_id, rng.choice(choices))
+        else:
+            db.refresh_shift_summary(days[0].isoformat(), days[-1].isoformat())
+        assert_matches_rebuild(db)
+
+
+def test_changed_triggers_are_replaced_and_rollups_rebuilt(db):
+    (first, _), (worker_id,) = setup(db, 1)
+    punch(db, worker_id, date(2024, 5, 5), 9, 16)
+    execute(db, "DELETE FROM department_daily")
+    execute(db, "UPDATE settings SET value = 'old' WHERE key = 'department_triggers'")
+    db.init_db()
+    assert rollups(db)[0] == [(first, "2024-05-05", "1403/02", 1, 1, 7.0, 0.0, 0.0)]
@@ -0,0 +1,36 @@
+"""MaintenanceScheduler.run_job logs and closes even when a job fails."""
+import sqlite3
+
+import pytest
+
+from database import Database
+from utils.maintenance_utils import MaintenanceScheduler
+
+
+class TrackedConnection(sqlite3.Connection):
+    open_count = 0
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        TrackedConnection.open_count += 1
+
+    def close(self):
+        TrackedConnection.open_count -= 1
+        super().close()
+
+
+class FailingScheduler(MaintenanceScheduler):
+    def _job_broken(self, cursor, deadline):
+        raise sqlite3.DatabaseError("database disk image is malformed")
+
+
+def test_failed_job_is_logged_and_closes_its_connection(db, monkeypatch):
+    monkeypatch.setattr(Database, "connection_factory", TrackedConnection)
+    with pytest.raises(sqlite3.DatabaseError):
+        FailingScheduler(db).run_job("broken")
+    assert TrackedConnection.open_count == 0
+    conn = db.connect()
+    row = conn.execute("SELECT job, status, detail FROM maintenance_log").fetchone()
+    conn.close()
+    assert tuple(row) == ("broken", "failed", "database disk image is malformed")
+
@@ -0,0 +1,58 @@
+"""Query plans of the AttendanceQuery views (the views of utils/plan_utils.py)."""
+import pytest
+
+from database import Database
+from utils.plan_utils import VIEWS, last_week, plan_ok, seed_attendance
+from utils.query_utils import INDEXED_SORTS
+
+WORKERS, DAYS = 200, 60
+
+
+@pytest.fixture(scope="module")
+def seeded(tmp_path_factory):
+    db = Database(str(tmp_path_factory.mktemp("plans") / "attendance.db"))
+    db.init_db()
+    first = seed_attendance(db, WORKERS, DAYS)
+    return db, first, last_week(first, DAYS)
+
+
+@pytest.mark.parametrize("label, indexes, build", VIEWS, ids=[view[0] for view in VIEWS])
+def test_view_uses_its_index(seeded, label, indexes, build):
+    db, _, week = seeded
+    plan = build(db.attendance_query(), week).explain()
+    assert plan_ok(plan, indexes), plan
+
+
+@pytest.mark.parametrize("column", INDEXED_SORTS)
+def test_wide_sort_walks_the_sort_index(seeded, column):
+    db, first, week = seeded
+    index = {"entry_time": "idx_attendance_entry", "total_hours": "idx_attendance_hours"}.get(
+        column, "idx_attendance_exit")
+    key = 9 if column == "total_hours" else "2024-05-01 08:00:00"
+    for after in (False, True):
+        query = db.attendance_query().between(str(first), week[1]).sort(column, True, walk_index=True)
+        if after:
+            # Keyset paging seeks into the index
+            query.after(key, 10 ** 9)
+        plan = query.limit(200).explain()
+        assert plan[0].startswith(("SCAN a USING INDEX ", "SEARCH a USING INDEX ")), plan
+        assert index in plan[0], plan
+        assert not any("TEMP B-TREE" in step for step in plan), plan
+
+
+def test_changed_ids_are_read_by_key(seeded):
+    db, _, week = seeded
+    plan = db.attendance_query().between(*week).ids([1, 2, 3]).sort("date", True).explain()
+    assert plan[0] == "SEARCH a USING INTEGER PRIMARY KEY (rowid=?)", plan
+
+
+def test_iter_attendance_batches(seeded):
+    db, first, week = seeded
+    batches = list(db.iter_attendance_batches(week[0], week[1], batch_size=500))
+    assert [len(batch) for batch in batches[:-1]] == [500] * (len(batches) - 1)
+    rows = [row for batch in batches for row in batch]
+    assert len(rows) == 7 * WORKERS
+    assert [(row['date'], row['id']) for row in rows] == sorted((row['date'], row['id']) for row in rows)
+    assert {'full_name', 'personal_number', 'total_hours'} <= set(rows[0].keys())
+    plan = db.attendance_query().between(*week).order_by("date").order_by("id").explain()
+    assert plan_ok(plan, "idx_attendance_date"), plan
@@ -0,0 +1,32 @@
+"""ReportCache keys tell databases and restored histories apart."""
+from database import Database
+from utils.backup_utils import BackupManager
+from utils.report_cache import ReportCache
+
+
+def names_of(db):
+    return lambda: sorted(row['full_name'] for row in db.get_all_workers())
+
+
+def test_databases_sharing_a_disk_dir(db, tmp_path):
+    other = Database(str(tmp_path / "other.db"))
+    other.init_db()
+    db.add_worker("100", "علی")
+    other.add_worker("100", "مریم")
+    assert db.get_change_watermark() == other.get_change_watermark()
+    disk_dir = str(tmp_path / "cache")
+    assert ReportCache(db, disk_dir=disk_dir).get_or_compute("names", names_of(db)) == ["علی"]
+    assert ReportCache(other, disk_dir=disk_dir).get_or_compute("names", names_of(other)) == ["مریم"]
+
+
+def test_restored_database_reusing_a_watermark(db, tmp_path):
+    db.add_worker("100", "علی")
+    backup = BackupManager(db.db_path, str(tmp_path / "backups"), sleep=0).create_backup()
+    cache = ReportCache(db, disk_dir=str(tmp_path / "cache"))
+    db.add_worker("200", "مریم")
+    assert cache.get_or_compute("names", names_of(db)) == sorted(["علی", "مریم"])
+
+    BackupManager(db.db_path, str(tmp_path / "backups"), sleep=0).restore_backup(backup.path, db.db_path)
+    db.add_worker("300", "رضا")
+    # Same watermark as the cached result, different rows
+    assert cache.get_or_compute("names", names_of(db)) == sorted(["علی", "رضا"])
@@ -0,0 +1,37 @@
+"""get_sessions_between reads archived years with and without the R*Tree."""
+from datetime import datetime
+
+import pytest
+
+
+def add_session(db, day, jalali):
+    conn = db.connect()
+    conn.execute("""
+        INSERT INTO attendance (worker_id, entry_time, exit_time, date, jalali_date, total_hours)
+        VALUES (1, ?, ?, ?, ?, 8)
+    """, (datetime(*day, 8), datetime(*day, 16), "%04d-%02d-%02d" % day, jalali))
+    conn.commit()
+    conn.close()
+
+
+def drop_interval_index(db):
+    # As on a SQLite built without R*Tree
+    conn = db.connect()
+    for name in ("attendance_rtree_insert", "attendance_rtree_update", "attendance_rtree_delete"):
+        conn.execute(f"DROP TRIGGER {name}")
+    conn.execute("DROP TABLE attendance_rtree")
+    conn.commit()
+    conn.close()
+
+
+@pytest.mark.parametrize("rtree", [True, False], ids=["rtree", "no-rtree"])
+def test_archived_and_live_sessions(db, rtree):
+    db.add_worker("100", "کارمند")
+    add_session(db, (2021, 5, 5), "1400/02/15")
+    add_session(db, (2024, 5, 5), "1403/02/16")
+    assert db.archive_year(1400)[0]
+    if not rtree:
+        drop_interval_index(db)
+    assert [row['id'] for row in db.get_sessions_between("2021-05-05 12:00:00")] == [1]
+    assert [row['id'] for row in db.get_sessions_between("2024-05-05 12:00:00")] == [2]
+    assert [row['id'] for row in db.get_sessions_between("2021-05-01", "2024-06-01")] == [1, 2]
@@ -0,0 +1,57 @@
+"""close_stale_sessions: exit time format and the workers' own shifts."""
+from datetime import datetime, timedelta
+
+from persiantools.jdatetime import JalaliDate
+
+
+def open_session(db, worker_id, entry):
+    conn = db.connect()
+    cursor = conn.execute("""
+        INSERT INTO attendance (worker_id, entry_time, date, jalali_date) VALUES (?, ?, ?, ?)
+    """, (worker_id, entry, entry.strftime('%Y-%m-%d'), JalaliDate(entry.date()).strftime('%Y/%m/%d')))
+    conn.commit()
+    conn.close()
+    return cursor.lastrowid
+
+
+def session(db, attendance_id):
+    conn = db.connect()
+    row = conn.execute("SELECT * FROM attendance WHERE id = ?", (attendance_id,)).fetchone()
+    conn.close()
+    return row
+
+
+def test_closed_at_shift_end_in_the_stored_time_format(db):
+    db.add_worker("100", "کارمند")
+    entry = datetime.combine(datetime.now().date() - timedelta(days=3), datetime.min.time()) + timedelta(hours=8)
+    attendance_id = open_session(db, 1, entry)
+    assert db.close_stale_sessions("shift_end", shift_end="17:00")[0] == 1
+    row = session(db, attendance_id)
+    assert row['exit_time'] == entry.strftime('%Y-%m-%d') + " 17:00:00"
+    assert row['total_hours'] == 9
+    assert datetime.fromisoformat(row['exit_time']) > entry
+
+
+def test_running_overnight_shift_is_left_open(db, monkeypatch):
+    import database
+
+    class Clock(datetime):
+        @classmethod
+        def now(cls, tz=None):
+            return datetime(2024, 5, 6, 3, 0)
+
+    monkeypatch.setattr(database, "datetime", Clock)
+    for number in ("100", "101", "102"):
+        db.add_worker(number, f"کارمند {number}")
+    db.add_shift("شب", "22:00", "06:00")
+    db.add_shift("روز", "08:00", "16:00")
+    db.assign_shift(1, 1, "2024-01-01")
+    db.assign_shift(2, 2, "2024-01-01")
+    night = open_session(db, 1, datetime(2024, 5, 5, 22, 5))
+    day = open_session(db, 2, datetime(2024, 5, 5, 8, 0))
+    late = open_session(db, 3, datetime(2024, 5, 5, 20, 0))
+    assert db.close_stale_sessions("shift_end", shift_end="17:00")[0] == 2
+    assert session(db, night)['exit_time'] is None
+    assert session(db, day)['exit_time'] == "2024-05-05 16:00:00"
+    # No shift assigned and in after the default shift end: closed at entry
+    assert session(db, late)['total_hours'] == 0
@@ -0,0 +1,60 @@
+"""Site-to-central sync batches: first snapshots and archived rows."""
+import sqlite3
+from datetime import datetime
+
+from utils.sync_utils import apply_batch, export_batch
+
+
+def add_session(db, day, jalali, hours=8):
+    conn = db.connect()
+    conn.execute("""
+        INSERT INTO attendance (worker_id, entry_time, exit_time, date, jalali_date, total_hours)
+        VALUES (1, ?, ?, ?, ?, ?)
+    """, (datetime(*day, 8), datetime(*day, 8 + hours), "%04d-%02d-%02d" % day, jalali, hours))
+    conn.commit()
+    conn.close()
+
+
+def central_hours(path):
+    conn = sqlite3.connect(path)
+    try:
+        return conn.execute("SELECT attendance_id, total_hours FROM attendance ORDER BY attendance_id").fetchall()
+    finally:
+        conn.close()
+
+
+def test_snapshot_of_a_database_without_logged_changes(db, tmp_path):
+    db.add_worker("100", "کارمند")
+    add_session(db, (2024, 5, 5), "1403/02/16")
+    # Rows written before the change log existed: the watermark is 0
+    conn = db.connect()
+    conn.execute("DELETE FROM change_log")
+    conn.execute("DELETE FROM sqlite_sequence WHERE name = 'change_log'")
+    conn.commit()
+    conn.close()
+    assert db.get_change_watermark() == 0
+
+    central = str(tmp_path / "central.db")
+    applied, message = apply_batch(central, export_batch(db, "s1", str(tmp_path / "out")))
+    assert applied, message
+    assert central_hours(central) == [(1, 8)]
+
+    db.add_worker("200", "کارمند دوم")
+    applied, message = apply_batch(central, export_batch(db, "s1", str(tmp_path / "out")))
+    assert applied, message
+
+
+def test_row_updated_then_archived_is_not_deleted(db, tmp_path):
+    db.add_worker("100", "کارمند")
+    add_session(db, (2021, 5, 5), "1400/02/15")
+    central = str(tmp_path / "central.db")
+    assert apply_batch(central, export_batch(db, "s1", str(tmp_path / "out")))[0]
+
+    conn = db.connect()
+    conn.execute("UPDATE attendance SET total_hours = 9 WHERE id = 1")
+    conn.commit()
+    conn.close()
+    assert db.archive_year(1400)[0]
+    applied, message = apply_batch(central, export_batch(db, "s1", str(tmp_path / "out")))
+    assert applied, message
+    assert central_hours(central) == [(1, 9)]
@@ -0,0 +1,64 @@
+"""Timed views keep working as slots of signals that pass arguments."""
+import os
+import sys
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+import pytest
+from PyQt6.QtWidgets import QApplication, QMessageBox, QPushButton
+
+from ui import admin_window, worker_window
+from ui.watchdog import EventLoopWatchdog
+
+# Buttons whose clicked(bool) reaches a timed view
+TIMED_BUTTONS = ("نمایش", "محاسبه", "جستجو", "تولید گزارش", "نمایش سوابق بیشتر")
+
+
+@pytest.fixture
+def watchdog(db, tmp_path, monkeypatch):
+    app = QApplication.instance() or QApplication([])
+    # Windows open Database() in the working directory
+    monkeypatch.chdir(tmp_path)
+    db.add_worker("1234", "علی رضایی")
+    for name in ("information", "warning", "critical"):
+        monkeypatch.setattr(QMessageBox, name, lambda *args, **kwargs: None)
+    # An exception in a slot would otherwise abort the process
+    errors = []
+    monkeypatch.setattr(sys, "excepthook", lambda *info: errors.append(info))
+    watchdog = EventLoopWatchdog()
+    watchdog.time_views(admin_window.AdminWindow, admin_window.TIMED_VIEWS)
+    watchdog.time_views(worker_window.WorkerWindow, worker_window.TIMED_VIEWS)
+    watchdog.start()
+    watchdog.errors = errors
+    yield watchdog
+    watchdog.stop()
+    app.processEvents()
+
+
+def click_timed_buttons(window):
+    for button in window.findChildren(QPushButton):
+        if button.text() in TIMED_BUTTONS:
+            button.click()
+
+
+def test_admin_buttons_reach_timed_views(watchdog):
+    window = admin_window.AdminWindow()
+    click_timed_buttons(window)
+    window.status_filter.setCurrentIndex(1)
+    window.close()
+    window.deleteLater()
+    assert watchdog.errors == []
+    views = dict(watchdog.view_stats())
+    for name in ("generate_department_dashboard", "generate_heatmap", "generate_absence_report",
+                 "search_sessions_between", "filter_attendance"):
+        assert views[f"AdminWindow.{name}"].count >= 1, name
+
+
+def test_worker_more_button_reaches_timed_view(watchdog, db):
+    window = worker_window.WorkerWindow(dict(db.get_worker_by_personal_number("1234")))
+    calls = watchdog.views["WorkerWindow.load_more_history"].count
+    window.more_button.click()
+    window.close()
+    window.deleteLater()
+    assert watchdog.errors == []
+    assert watchdog.views["WorkerWindow.load_more_history"].count == calls + 1
@@ -0,0 +1,45 @@
+"""WorkerPicker never reports a worker its text no longer names."""
+import os
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+import pytest
+from PyQt6.QtWidgets import QApplication
+
+from ui.widgets import WorkerPicker
+
+
+@pytest.fixture
+def picker(db):
+    app = QApplication.instance() or QApplication([])
+    db.add_worker("1234", "علی رضایی")
+    db.add_worker("5678", "مریم احمدی")
+    picker = WorkerPicker(db)
+    picker.changes = []
+    picker.workerChanged.connect(picker.changes.append)
+    yield picker
+    picker.deleteLater()
+    app.processEvents()
+
+
+def type_text(picker, text):
+    picker.search_input.setText(text)
+    picker.search_input.textEdited.emit(text)
+    picker._search()
+
+
+def test_edit_clears_the_chosen_worker(picker, db):
+    picker.set_worker(db.get_worker_by_personal_number("1234"))
+    assert picker.get_worker_id() == 1
+    type_text(picker, "مریم")
+    assert picker.get_worker_id() is None
+    assert picker.get_worker_name() == ""
+    assert picker.changes == [1, None]
+
+
+def test_full_personal_number_resolves(picker):
+    type_text(picker, "۵۶۷۸")
+    assert picker.get_worker_id() == 2
+    type_text(picker, "۵۶۷")
+    assert picker.get_worker_id() is None
+    assert picker.changes == [2, None]
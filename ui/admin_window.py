@@ -1,28 +1,103 @@
 from PyQt6.QtWidgets import (QMainWindow, QWidget, QVBoxLayout, QHBoxLayout,
                             QPushButton, QLabel, QMessageBox, QTableWidget,
-                            QTableWidgetItem, QHeaderView, QTabWidget,
+                            QTableWidgetItem, QTableView, QHeaderView, QTabWidget,
                             QComboBox, QDateEdit, QLineEdit, QGroupBox,
-                            QFileDialog)
-from PyQt6.QtCore import Qt, QDate
+                            QFileDialog, QProgressDialog, QSpinBox, QTimeEdit)
+from PyQt6.QtCore import Qt, QDate, QTime, QTimer, QThread, pyqtSignal
+from PyQt6.QtGui import QColor
 from database import Database
 from .styles import MAIN_STYLE
-from .dialogs import AddWorkerDialog, EditWorkerDialog, EditAttendanceDialog
-from utils.persian_utils import to_persian_number, to_english_number, gregorian_to_jalali, jalali_to_gregorian
+from .dialogs import (AddWorkerDialog, EditWorkerDialog, EditAttendanceDialog, BulkEditAttendanceDialog,
+                      DiagnosticsDialog)
+from .watchdog import active_watchdog
+from utils.persian_utils import (to_persian_number, to_english_number, gregorian_to_jalali,
+                                 jalali_to_gregorian, jalali_period_range, get_persian_month_name)
 from utils.export_utils import ExportManager
+from utils.columnar_utils import (ATTENDANCE_COLUMNS, STATUS_WORKING, STATUS_COMPLETED,
+                                  format_attendance_rows, format_jalali_dates, format_times,
+                                  persian_digits, to_epoch_seconds, translate_column)
+from utils.occupancy_utils import OccupancyTracker, HOUR_LABELS, hourly_occupancy, weekday_profile
+from utils.shift_utils import SHIFT_REPORT_COLUMNS, format_shift_report
+from utils.backup_utils import BackupManager
+from utils.bulk_report_utils import BulkReportJob
+from utils.report_cache import ReportCache
+from utils.query_utils import STATUS_OPEN, STATUS_CLOSED
+from utils.profiling_utils import active_profiler, default_log_path, read_json_log
 from persiantools.jdatetime import JalaliDate
-from .widgets import JalaliDatePicker
+from .widgets import JalaliDatePicker, WorkerPicker
+from .attendance_model import AttendanceTableModel
 import datetime
+import threading
+
+SYNC_INTERVAL_MS = 2000
+
+# Methods that fill a view, timed by the EventLoopWatchdog (exports and
+# printing are left out: their time is mostly spent in file and print dialogs)
+TIMED_VIEWS = ("init_ui", "load_workers", "load_all_attendance", "filter_attendance", "sort_attendance",
+               "sync_changes", "display_occupancy", "search_sessions_between", "load_shifts",
+               "generate_shift_report", "load_departments", "generate_department_dashboard",
+               "generate_monthly_report", "generate_heatmap", "generate_absence_report", "load_profile")
+
+ABSENCE_COLUMNS = ["کارمند", "شماره پرسنلی", "روزهای کاری", "روزهای حضور", "روزهای غیبت"]
+
+DEPARTMENT_COLUMNS = ["واحد", "اعضا", "نفر-روز حضور", "ساعات کار", "تاخیر (دقیقه)", "اضافه‌کار (دقیقه)"]
+
+# Columns of the per-method and per-statement timing tables (milliseconds)
+PROFILE_COLUMNS = ["تعداد", "میانگین", "p50", "p95", "p99", "بیشینه", "ردیف‌ها", "خطا", "انتظار قفل"]
+
+SLOW_QUERY_COLUMNS = ["زمان", "مدت (ms)", "متد", "دستور SQL", "طرح اجرا"]
+
+class BackupThread(QThread):
+    done = pyqtSignal(object, str)
+    
+    def __init__(self, manager, parent=None):
+        super().__init__(parent)
+        self.manager = manager
+        
+    def run(self):
+        try:
+            self.done.emit(self.manager.create_backup(compress=True), "")
+        except Exception as e:
+            self.done.emit(None, str(e))
+
+class BulkReportThread(QThread):
+    progress = pyqtSignal(int, int)
+    done = pyqtSignal(object, str)
+    
+    def __init__(self, job, out_path, parent=None):
+        super().__init__(parent)
+        self.job = job
+        self.out_path = out_path
+        self.cancel_event = threading.Event()
+        
+    def run(self):
+        try:
+            result = self.job.run(self.out_path, progress=self.progress.emit, cancel=self.cancel_event)
+            self.done.emit(result, "")
+        except Exception as e:
+            self.done.emit(None, str(e))
 
 class AdminWindow(QMainWindow):
     def __init__(self):
         super().__init__()
         self.db = Database()
+        # Repeated report renders (preview, export, print) reuse query results
+        self.report_cache = ReportCache(self.db)
+        self.report_cache.install()
         self.export_manager = ExportManager()
-        self._is_loading = False
+        self.sort_column = None
+        self.sort_descending = False
+        self.data_version = self.db.get_data_version()
+        self.change_watermark = self.db.get_change_watermark()
         self.init_ui()
         self.load_workers()
         self.load_all_attendance()
         
+        # Pick up changes made here and by other kiosk processes
+        self.sync_timer = QTimer(self)
+        self.sync_timer.timeout.connect(self.sync_changes)
+        self.sync_timer.start(SYNC_INTERVAL_MS)
+        
     def init_ui(self):
         self.setWindowTitle("پنل مدیریت")
         self.setMinimumSize(1000, 700)
@@ -46,6 +121,14 @@ class AdminWindow(QMainWindow):
         
         header_layout.addStretch()
         
+        self.backup_button = QPushButton("پشتیبان‌گیری")
+        self.backup_button.clicked.connect(self.create_backup)
+        header_layout.addWidget(self.backup_button)
+        
+        diagnostics_button = QPushButton("عیب‌یابی")
+        diagnostics_button.clicked.connect(self.show_diagnostics)
+        header_layout.addWidget(diagnostics_button)
+        
         logout_button = QPushButton("خروج")
         logout_button.clicked.connect(self.logout)
         header_layout.addWidget(logout_button)
@@ -64,11 +147,33 @@ class AdminWindow(QMainWindow):
         self.init_attendance_tab()
         self.tabs.addTab(self.attendance_tab, "گزارش حضور و غیاب")
         
+        # Occupancy tab
+        self.occupancy_tab = QWidget()
+        self.init_occupancy_tab()
+        self.tabs.addTab(self.occupancy_tab, "حاضرین در محل")
+        
         # Reports tab
         self.reports_tab = QWidget()
         self.init_reports_tab()
         self.tabs.addTab(self.reports_tab, "گزارشات پیشرفته")
         
+        # Shifts tab
+        self.shifts_tab = QWidget()
+        self.init_shifts_tab()
+        self.tabs.addTab(self.shifts_tab, "شیفت و اضافه‌کار")
+        
+        # Departments tab
+        self.departments_tab = QWidget()
+        self.init_departments_tab()
+        self.tabs.addTab(self.departments_tab, "واحدها")
+        
+        # Query timings tab
+        self.profile_tab = QWidget()
+        self.init_profile_tab()
+        self.tabs.addTab(self.profile_tab, "کارایی پایگاه داده")
+        self.tabs.currentChanged.connect(
+            lambda index: self.load_profile() if self.tabs.widget(index) is self.profile_tab else None)
+        
     def init_workers_tab(self):
         layout = QVBoxLayout()
         self.workers_tab.setLayout(layout)
@@ -117,11 +222,25 @@ class AdminWindow(QMainWindow):
         
         # Worker filter
         filter_layout.addWidget(QLabel("کارمند:"))
-        self.worker_filter = QComboBox()
-        self.worker_filter.addItem("همه کارمندان", None)
-        self.worker_filter.currentIndexChanged.connect(self.filter_attendance)
+        self.worker_filter = WorkerPicker(self.db, "همه کارمندان (برای جستجو تایپ کنید)")
+        self.worker_filter.workerChanged.connect(self.filter_attendance)
         filter_layout.addWidget(self.worker_filter)
         
+        # Status filter
+        filter_layout.addWidget(QLabel("وضعیت:"))
+        self.status_filter = QComboBox()
+        self.status_filter.addItem("همه", None)
+        self.status_filter.addItem(STATUS_WORKING, STATUS_OPEN)
+        self.status_filter.addItem(STATUS_COMPLETED, STATUS_CLOSED)
+        self.status_filter.currentIndexChanged.connect(self.filter_attendance)
+        filter_layout.addWidget(self.status_filter)
+        
+        # Department filter (includes sub-departments); filled by load_departments
+        filter_layout.addWidget(QLabel("واحد:"))
+        self.department_filter = QComboBox()
+        self.department_filter.currentIndexChanged.connect(self.filter_attendance)
+        filter_layout.addWidget(self.department_filter)
+        
         # Date filter
         filter_layout.addWidget(QLabel("از تاریخ:"))
         self.start_date = JalaliDatePicker()
@@ -152,6 +271,10 @@ class AdminWindow(QMainWindow):
         edit_attendance_button.clicked.connect(self.edit_attendance_record)
         export_layout.addWidget(edit_attendance_button)
         
+        bulk_edit_button = QPushButton("ویرایش گروهی")
+        bulk_edit_button.clicked.connect(self.bulk_edit_attendance)
+        export_layout.addWidget(bulk_edit_button)
+        
         excel_button = QPushButton("خروجی Excel")
         excel_button.clicked.connect(lambda: self.export_attendance('excel'))
         export_layout.addWidget(excel_button)
@@ -170,20 +293,121 @@ class AdminWindow(QMainWindow):
         
         export_layout.addStretch()
         
-        # Attendance table
-        self.attendance_table = QTableWidget()
-        self.attendance_table.setColumnCount(7)
-        self.attendance_table.setHorizontalHeaderLabels([
-            "تاریخ", "کارمند", "شماره پرسنلی", "ساعت ورود", 
-            "ساعت خروج", "مدت حضور", "وضعیت"
-        ])
+        # Attendance table; rows are paged in from the database as they are shown
+        self.attendance_model = AttendanceTableModel(self, cache=self.report_cache)
+        self.attendance_table = QTableView()
+        self.attendance_table.setModel(self.attendance_model)
         
         header = self.attendance_table.horizontalHeader()
         header.setSectionResizeMode(QHeaderView.ResizeMode.Stretch)
+        header.setSortIndicatorShown(True)
+        header.setSortIndicator(-1, Qt.SortOrder.AscendingOrder)
+        header.sectionClicked.connect(self.sort_attendance)
         
         layout.addWidget(self.attendance_table)
-        self.attendance_table.setEditTriggers(QTableWidget.EditTrigger.NoEditTriggers)
+        self.attendance_table.setEditTriggers(QTableView.EditTrigger.NoEditTriggers)
+        self.attendance_table.setSelectionBehavior(QTableView.SelectionBehavior.SelectRows)
+        self.attendance_table.setSelectionMode(QTableView.SelectionMode.ExtendedSelection)
+        
+    def init_occupancy_tab(self):
+        layout = QVBoxLayout()
+        self.occupancy_tab.setLayout(layout)
+        
+        self.headcount_label = QLabel()
+        self.headcount_label.setObjectName("titleLabel")
+        self.headcount_label.setAlignment(Qt.AlignmentFlag.AlignCenter)
+        layout.addWidget(self.headcount_label)
         
+        self.occupancy_table = QTableWidget()
+        self.occupancy_table.setColumnCount(4)
+        self.occupancy_table.setHorizontalHeaderLabels([
+            "کارمند", "شماره پرسنلی", "تاریخ ورود", "ساعت ورود"
+        ])
+        header = self.occupancy_table.horizontalHeader()
+        header.setSectionResizeMode(QHeaderView.ResizeMode.Stretch)
+        self.occupancy_table.setEditTriggers(QTableWidget.EditTrigger.NoEditTriggers)
+        layout.addWidget(self.occupancy_table)
+        
+        # Who was inside at a past time or during a period
+        inside_group = QGroupBox("حاضرین در بازه زمانی")
+        inside_layout = QHBoxLayout()
+        inside_group.setLayout(inside_layout)
+        
+        inside_layout.addWidget(QLabel("تاریخ:"))
+        self.inside_date = JalaliDatePicker()
+        self.inside_date.set_date(JalaliDate.today())
+        inside_layout.addWidget(self.inside_date)
+        
+        inside_layout.addWidget(QLabel("از ساعت:"))
+        self.inside_from = QTimeEdit(QTime(14, 0))
+        self.inside_from.setDisplayFormat("HH:mm")
+        inside_layout.addWidget(self.inside_from)
+        
+        inside_layout.addWidget(QLabel("تا ساعت:"))
+        self.inside_to = QTimeEdit(QTime(15, 30))
+        self.inside_to.setDisplayFormat("HH:mm")
+        inside_layout.addWidget(self.inside_to)
+        
+        inside_button = QPushButton("جستجو")
+        inside_button.clicked.connect(self.search_sessions_between)
+        inside_layout.addWidget(inside_button)
+        
+        self.inside_count_label = QLabel()
+        inside_layout.addWidget(self.inside_count_label)
+        
+        inside_layout.addStretch()
+        layout.addWidget(inside_group)
+        
+        self.inside_table = QTableWidget()
+        self.inside_table.setColumnCount(len(ATTENDANCE_COLUMNS))
+        self.inside_table.setHorizontalHeaderLabels(ATTENDANCE_COLUMNS)
+        self.inside_table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Stretch)
+        self.inside_table.setEditTriggers(QTableWidget.EditTrigger.NoEditTriggers)
+        layout.addWidget(self.inside_table)
+        
+        # Only open sessions are loaded; punches are applied every second
+        self.occupancy = OccupancyTracker(self.db)
+        self.occupancy.load()
+        self.display_occupancy()
+        self.occupancy_timer = QTimer(self)
+        self.occupancy_timer.timeout.connect(self.refresh_occupancy)
+        self.occupancy_timer.start(1000)
+        
+    def refresh_occupancy(self):
+        if self.occupancy.refresh():
+            self.display_occupancy()
+    
+    def display_occupancy(self):
+        sessions = self.occupancy.snapshot()
+        self.headcount_label.setText(
+            f"تعداد حاضرین: {persian_digits(self.occupancy.headcount)} نفر"
+        )
+        dates = translate_column([r['jalali_date'] for r in sessions])
+        entry_times = format_times(to_epoch_seconds([r['entry_time'] for r in sessions]))
+        
+        self.occupancy_table.setRowCount(len(sessions))
+        for row, record in enumerate(sessions):
+            self.occupancy_table.setItem(row, 0, QTableWidgetItem(record['full_name']))
+            self.occupancy_table.setItem(row, 1, QTableWidgetItem(record['personal_number']))
+            self.occupancy_table.setItem(row, 2, QTableWidgetItem(dates[row]))
+            self.occupancy_table.setItem(row, 3, QTableWidgetItem(entry_times[row]))
+    
+    def search_sessions_between(self):
+        day = jalali_to_gregorian(self.inside_date.get_date())
+        start = datetime.datetime.combine(day, self.inside_from.time().toPyTime())
+        end = datetime.datetime.combine(day, self.inside_to.time().toPyTime())
+        if end < start:
+            # e.g. 22:00 - 02:00 runs into the next day
+            end += datetime.timedelta(days=1)
+        records = self.db.get_sessions_between(start, end)
+        rows = format_attendance_rows(records)
+        people = len({r['worker_id'] for r in records})
+        self.inside_count_label.setText(f"{persian_digits(people)} نفر")
+        self.inside_table.setRowCount(len(rows))
+        for row, values in enumerate(rows):
+            for column, value in enumerate(values):
+                self.inside_table.setItem(row, column, QTableWidgetItem(value))
+    
     def init_reports_tab(self):
         layout = QVBoxLayout()
         self.reports_tab.setLayout(layout)
@@ -194,7 +418,7 @@ class AdminWindow(QMainWindow):
         monthly_group.setLayout(monthly_layout)
         
         monthly_layout.addWidget(QLabel("کارمند:"))
-        self.monthly_worker_combo = QComboBox()
+        self.monthly_worker_combo = WorkerPicker(self.db)
         monthly_layout.addWidget(self.monthly_worker_combo)
         
         monthly_layout.addWidget(QLabel("سال:"))
@@ -218,10 +442,97 @@ class AdminWindow(QMainWindow):
         generate_button.clicked.connect(self.generate_monthly_report)
         monthly_layout.addWidget(generate_button)
         
+        self.bulk_report_button = QPushButton("گزارش همه کارمندان (zip)")
+        self.bulk_report_button.clicked.connect(self.generate_bulk_reports)
+        monthly_layout.addWidget(self.bulk_report_button)
+        
         monthly_layout.addStretch()
         
         layout.addWidget(monthly_group)
         
+        # Hourly occupancy heatmap
+        heatmap_group = QGroupBox("نقشه حضور ساعتی")
+        heatmap_layout = QHBoxLayout()
+        heatmap_group.setLayout(heatmap_layout)
+        
+        heatmap_layout.addWidget(QLabel("از تاریخ:"))
+        self.heatmap_start = JalaliDatePicker()
+        self.heatmap_start.set_date(gregorian_to_jalali(datetime.date.today() - datetime.timedelta(days=30)))
+        heatmap_layout.addWidget(self.heatmap_start)
+        
+        heatmap_layout.addWidget(QLabel("تا تاریخ:"))
+        self.heatmap_end = JalaliDatePicker()
+        self.heatmap_end.set_date(JalaliDate.today())
+        heatmap_layout.addWidget(self.heatmap_end)
+        
+        self.heatmap_mode = QComboBox()
+        self.heatmap_mode.addItem("هر روز", "day")
+        self.heatmap_mode.addItem("روزهای هفته", "weekday")
+        heatmap_layout.addWidget(self.heatmap_mode)
+        
+        heatmap_button = QPushButton("نمایش")
+        heatmap_button.clicked.connect(self.generate_heatmap)
+        heatmap_layout.addWidget(heatmap_button)
+        
+        heatmap_export_button = QPushButton("خروجی Excel")
+        heatmap_export_button.clicked.connect(self.export_heatmap)
+        heatmap_layout.addWidget(heatmap_export_button)
+        
+        heatmap_layout.addStretch()
+        
+        layout.addWidget(heatmap_group)
+        
+        # Absences against the workday calendar
+        absence_group = QGroupBox("گزارش غیبت")
+        absence_layout = QHBoxLayout()
+        absence_group.setLayout(absence_layout)
+        
+        absence_layout.addWidget(QLabel("سال:"))
+        self.absence_year_combo = QComboBox()
+        for year in range(current_jalali.year - 2, current_jalali.year + 1):
+            self.absence_year_combo.addItem(to_persian_number(str(year)), year)
+        self.absence_year_combo.setCurrentIndex(2)
+        absence_layout.addWidget(self.absence_year_combo)
+        
+        absence_layout.addWidget(QLabel("ماه:"))
+        self.absence_month_combo = QComboBox()
+        self.absence_month_combo.addItem("کل سال", None)
+        for i, month in enumerate(months, 1):
+            self.absence_month_combo.addItem(month, i)
+        self.absence_month_combo.setCurrentIndex(current_jalali.month)
+        absence_layout.addWidget(self.absence_month_combo)
+        
+        absence_button = QPushButton("محاسبه")
+        absence_button.clicked.connect(self.generate_absence_report)
+        absence_layout.addWidget(absence_button)
+        
+        absence_export_button = QPushButton("خروجی Excel")
+        absence_export_button.clicked.connect(self.export_absence_report)
+        absence_layout.addWidget(absence_export_button)
+        
+        holidays_button = QPushButton("ورود تعطیلات رسمی")
+        holidays_button.clicked.connect(self.import_holidays)
+        absence_layout.addWidget(holidays_button)
+        
+        absence_layout.addStretch()
+        layout.addWidget(absence_group)
+        
+        self.absence_table = QTableWidget()
+        self.absence_table.setColumnCount(len(ABSENCE_COLUMNS))
+        self.absence_table.setHorizontalHeaderLabels(ABSENCE_COLUMNS)
+        self.absence_table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Stretch)
+        self.absence_table.setEditTriggers(QTableWidget.EditTrigger.NoEditTriggers)
+        layout.addWidget(self.absence_table)
+        self.absence_rows = []
+        
+        self.heatmap_table = QTableWidget()
+        self.heatmap_table.setColumnCount(len(HOUR_LABELS))
+        self.heatmap_table.setHorizontalHeaderLabels([to_persian_number(h) for h in HOUR_LABELS])
+        self.heatmap_table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Stretch)
+        self.heatmap_table.setEditTriggers(QTableWidget.EditTrigger.NoEditTriggers)
+        layout.addWidget(self.heatmap_table)
+        self.heatmap = None
+        
         # Report display
         self.report_display = QLabel()
         self.report_display.setStyleSheet("""
@@ -236,121 +547,495 @@ class AdminWindow(QMainWindow):
         self.report_display.setAlignment(Qt.AlignmentFlag.AlignTop)
         layout.addWidget(self.report_display)
         
+    def init_shifts_tab(self):
+        layout = QVBoxLayout()
+        self.shifts_tab.setLayout(layout)
+        
+        # Shift definitions
+        define_group = QGroupBox("تعریف شیفت")
+        define_layout = QHBoxLayout()
+        define_group.setLayout(define_layout)
+        
+        define_layout.addWidget(QLabel("نام:"))
+        self.shift_name_input = QLineEdit()
+        define_layout.addWidget(self.shift_name_input)
+        
+        define_layout.addWidget(QLabel("شروع:"))
+        self.shift_start_input = QLineEdit("08:00")
+        define_layout.addWidget(self.shift_start_input)
+        
+        define_layout.addWidget(QLabel("پایان:"))
+        self.shift_end_input = QLineEdit("16:00")
+        define_layout.addWidget(self.shift_end_input)
+        
+        define_layout.addWidget(QLabel("استراحت (دقیقه):"))
+        self.shift_break_input = QSpinBox()
+        self.shift_break_input.setRange(0, 240)
+        define_layout.addWidget(self.shift_break_input)
+        
+        define_layout.addWidget(QLabel("تاخیر مجاز (دقیقه):"))
+        self.shift_grace_input = QSpinBox()
+        self.shift_grace_input.setRange(0, 120)
+        define_layout.addWidget(self.shift_grace_input)
+        
+        add_shift_button = QPushButton("افزودن شیفت")
+        add_shift_button.clicked.connect(self.add_shift)
+        define_layout.addWidget(add_shift_button)
+        
+        layout.addWidget(define_group)
+        
+        # Assignments
+        assign_group = QGroupBox("تعیین شیفت کارمند")
+        assign_layout = QHBoxLayout()
+        assign_group.setLayout(assign_layout)
+        
+        assign_layout.addWidget(QLabel("کارمند:"))
+        self.shift_worker_picker = WorkerPicker(self.db)
+        assign_layout.addWidget(self.shift_worker_picker)
+        
+        assign_layout.addWidget(QLabel("شیفت:"))
+        self.shift_combo = QComboBox()
+        assign_layout.addWidget(self.shift_combo)
+        
+        assign_layout.addWidget(QLabel("از تاریخ:"))
+        self.shift_valid_from = JalaliDatePicker()
+        self.shift_valid_from.set_date(JalaliDate.today())
+        assign_layout.addWidget(self.shift_valid_from)
+        
+        assign_button = QPushButton("ثبت")
+        assign_button.clicked.connect(self.assign_shift)
+        assign_layout.addWidget(assign_button)
+        
+        assign_layout.addStretch()
+        layout.addWidget(assign_group)
+        
+        # Lateness / overtime report
+        report_group = QGroupBox("گزارش تاخیر و اضافه‌کار")
+        report_layout = QHBoxLayout()
+        report_group.setLayout(report_layout)
+        
+        report_layout.addWidget(QLabel("از تاریخ:"))
+        self.shift_report_start = JalaliDatePicker()
+        today = JalaliDate.today()
+        self.shift_report_start.set_date(JalaliDate(today.year, today.month, 1))
+        report_layout.addWidget(self.shift_report_start)
+        
+        report_layout.addWidget(QLabel("تا تاریخ:"))
+        self.shift_report_end = JalaliDatePicker()
+        self.shift_report_end.set_date(today)
+        report_layout.addWidget(self.shift_report_end)
+        
+        shift_report_button = QPushButton("محاسبه")
+        shift_report_button.clicked.connect(self.generate_shift_report)
+        report_layout.addWidget(shift_report_button)
+        
+        shift_excel_button = QPushButton("خروجی Excel")
+        shift_excel_button.clicked.connect(lambda: self.export_shift_report('excel'))
+        report_layout.addWidget(shift_excel_button)
+        
+        shift_csv_button = QPushButton("خروجی CSV")
+        shift_csv_button.clicked.connect(lambda: self.export_shift_report('csv'))
+        report_layout.addWidget(shift_csv_button)
+        
+        report_layout.addStretch()
+        layout.addWidget(report_group)
+        
+        self.shift_report_table = QTableWidget()
+        self.shift_report_table.setColumnCount(len(SHIFT_REPORT_COLUMNS))
+        self.shift_report_table.setHorizontalHeaderLabels(SHIFT_REPORT_COLUMNS)
+        self.shift_report_table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Stretch)
+        self.shift_report_table.setEditTriggers(QTableWidget.EditTrigger.NoEditTriggers)
+        layout.addWidget(self.shift_report_table)
+        
+        self.shift_report_rows = []
+        self.load_shifts()
+        
+    def load_shifts(self):
+        self.shift_combo.clear()
+        for shift in self.db.get_shifts():
+            label = f"{shift['name']} ({shift['start_time']} - {shift['end_time']})"
+            self.shift_combo.addItem(to_persian_number(label), shift['id'])
+    
+    def add_shift(self):
+        name = self.shift_name_input.text().strip()
+        if not name:
+            QMessageBox.warning(self, "خطا", "لطفاً نام شیفت را وارد کنید")
+            return
+        success, message = self.db.add_shift(
+            name,
+            to_english_number(self.shift_start_input.text().strip()),
+            to_english_number(self.shift_end_input.text().strip()),
+            self.shift_break_input.value(),
+            self.shift_grace_input.value(),
+        )
+        if success:
+            self.shift_name_input.clear()
+            self.load_shifts()
+            QMessageBox.information(self, "موفق", message)
+        else:
+            QMessageBox.warning(self, "خطا", message)
+    
+    def assign_shift(self):
+        worker_id = self.shift_worker_picker.get_worker_id()
+        shift_id = self.shift_combo.currentData()
+        if not worker_id or not shift_id:
+            QMessageBox.warning(self, "خطا", "لطفاً کارمند و شیفت را انتخاب کنید")
+            return
+        valid_from = str(jalali_to_gregorian(self.shift_valid_from.get_date()))
+        success, message = self.db.assign_shift(worker_id, shift_id, valid_from)
+        QMessageBox.information(self, "موفق", message)
+    
+    def generate_shift_report(self):
+        start = str(jalali_to_gregorian(self.shift_report_start.get_date()))
+        end = str(jalali_to_gregorian(self.shift_report_end.get_date()))
+        if start > end:
+            QMessageBox.warning(self, "خطا", "تاریخ شروع باید قبل از تاریخ پایان باشد")
+            return
+        self.shift_report_rows = format_shift_report(self.db.get_shift_summary(start, end))
+        self.shift_report_table.setRowCount(len(self.shift_report_rows))
+        for row, values in enumerate(self.shift_report_rows):
+            for column, value in enumerate(values):
+                self.shift_report_table.setItem(row, column, QTableWidgetItem(value))
+    
+    def export_shift_report(self, format_type):
+        if not self.shift_report_rows:
+            QMessageBox.warning(self, "خطا", "داده‌ای برای خروجی وجود ندارد")
+            return
+        default_name = f"گزارش_شیفت_{JalaliDate.today().strftime('%Y_%m_%d')}"
+        if format_type == 'excel':
+            file_path, _ = QFileDialog.getSaveFileName(
+                self, "ذخیره فایل Excel", default_name, "Excel Files (*.xlsx)"
+            )
+            if file_path and self.export_manager.export_to_excel(
+                    self.shift_report_rows, SHIFT_REPORT_COLUMNS, file_path):
+                QMessageBox.information(self, "موفق", "فایل Excel با موفقیت ذخیره شد")
+        else:
+            file_path, _ = QFileDialog.getSaveFileName(
+                self, "ذخیره فایل CSV", default_name, "CSV Files (*.csv)"
+            )
+            if file_path and self.export_manager.export_to_csv(
+                    self.shift_report_rows, SHIFT_REPORT_COLUMNS, file_path):
+                QMessageBox.information(self, "موفق", "فایل CSV با موفقیت ذخیره شد")
+    
+    def init_departments_tab(self):
+        layout = QVBoxLayout()
+        self.departments_tab.setLayout(layout)
+        
+        # Department tree
+        define_group = QGroupBox("تعریف واحد")
+        define_layout = QHBoxLayout()
+        define_group.setLayout(define_layout)
+        
+        define_layout.addWidget(QLabel("نام:"))
+        self.department_name_input = QLineEdit()
+        define_layout.addWidget(self.department_name_input)
+        
+        define_layout.addWidget(QLabel("زیرمجموعه:"))
+        self.department_parent_combo = QComboBox()
+        define_layout.addWidget(self.department_parent_combo)
+        
+        add_department_button = QPushButton("افزودن واحد")
+        add_department_button.clicked.connect(self.add_department)
+        define_layout.addWidget(add_department_button)
+        
+        delete_department_button = QPushButton("حذف واحد انتخاب‌شده")
+        delete_department_button.setObjectName("dangerButton")
+        delete_department_button.clicked.connect(self.delete_department)
+        define_layout.addWidget(delete_department_button)
+        
+        define_layout.addStretch()
+        layout.addWidget(define_group)
+        
+        # Membership
+        member_group = QGroupBox("واحد کارمند")
+        member_layout = QHBoxLayout()
+        member_group.setLayout(member_layout)
+        
+        member_layout.addWidget(QLabel("کارمند:"))
+        self.department_worker_picker = WorkerPicker(self.db)
+        member_layout.addWidget(self.department_worker_picker)
+        
+        member_layout.addWidget(QLabel("واحد:"))
+        self.department_member_combo = QComboBox()
+        member_layout.addWidget(self.department_member_combo)
+        
+        member_button = QPushButton("ثبت")
+        member_button.clicked.connect(self.set_worker_department)
+        member_layout.addWidget(member_button)
+        
+        member_layout.addStretch()
+        layout.addWidget(member_group)
+        
+        # Dashboard from the monthly rollups
+        dashboard_group = QGroupBox("داشبورد واحدها")
+        dashboard_layout = QHBoxLayout()
+        dashboard_group.setLayout(dashboard_layout)
+        
+        current_jalali = JalaliDate.today()
+        dashboard_layout.addWidget(QLabel("سال:"))
+        self.department_year_combo = QComboBox()
+        for year in range(current_jalali.year - 2, current_jalali.year + 1):
+            self.department_year_combo.addItem(to_persian_number(str(year)), year)
+        self.department_year_combo.setCurrentIndex(2)
+        dashboard_layout.addWidget(self.department_year_combo)
+        
+        dashboard_layout.addWidget(QLabel("ماه:"))
+        self.department_month_combo = QComboBox()
+        self.department_month_combo.addItem("کل سال", None)
+        for month in range(1, 13):
+            self.department_month_combo.addItem(get_persian_month_name(month), month)
+        self.department_month_combo.setCurrentIndex(current_jalali.month)
+        dashboard_layout.addWidget(self.department_month_combo)
+        
+        dashboard_button = QPushButton("نمایش")
+        dashboard_button.clicked.connect(self.generate_department_dashboard)
+        dashboard_layout.addWidget(dashboard_button)
+        
+        dashboard_export_button = QPushButton("خروجی Excel")
+        dashboard_export_button.clicked.connect(self.export_department_dashboard)
+        dashboard_layout.addWidget(dashboard_export_button)
+        
+        dashboard_layout.addStretch()
+        layout.addWidget(dashboard_group)
+        
+        self.department_table = QTableWidget()
+        self.department_table.setColumnCount(len(DEPARTMENT_COLUMNS))
+        self.department_table.setHorizontalHeaderLabels(DEPARTMENT_COLUMNS)
+        self.department_table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Stretch)
+        self.department_table.setEditTriggers(QTableWidget.EditTrigger.NoEditTriggers)
+        self.department_table.setSelectionBehavior(QTableWidget.SelectionBehavior.SelectRows)
+        layout.addWidget(self.department_table)
+        
+        self.department_dashboard = []
+        self.department_rows = []
+        self.load_departments()
+        
+    def load_departments(self):
+        departments = self.db.get_departments()
+        for combo, empty in ((self.department_parent_combo, "— سطح اول —"),
+                             (self.department_member_combo, "بدون واحد"),
+                             (self.department_filter, "همه واحدها")):
+            selected = combo.currentData()
+            combo.blockSignals(True)
+            combo.clear()
+            combo.addItem(empty, None)
+            for department in departments:
+                combo.addItem("    " * department['depth'] + department['name'], department['id'])
+            combo.setCurrentIndex(max(combo.findData(selected), 0))
+            combo.blockSignals(False)
+    
+    def add_department(self):
+        name = self.department_name_input.text().strip()
+        if not name:
+            QMessageBox.warning(self, "خطا", "لطفاً نام واحد را وارد کنید")
+            return
+        success, message = self.db.add_department(name, self.department_parent_combo.currentData())
+        if success:
+            self.department_name_input.clear()
+            self.load_departments()
+            self.generate_department_dashboard()
+            QMessageBox.information(self, "موفق", message)
+        else:
+            QMessageBox.warning(self, "خطا", message)
+    
+    def delete_department(self):
+        row = self.department_table.currentRow()
+        if row < 0:
+            QMessageBox.warning(self, "خطا", "لطفاً یک واحد را از جدول انتخاب کنید")
+            return
+        department = self.department_dashboard[row]
+        reply = QMessageBox.question(
+            self, "تأیید حذف",
+            f"آیا از حذف واحد {department['name']} اطمینان دارید؟ اعضای آن بدون واحد می‌شوند.",
+            QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No
+        )
+        if reply != QMessageBox.StandardButton.Yes:
+            return
+        success, message = self.db.delete_department(department['id'])
+        if success:
+            self.load_departments()
+            self.generate_department_dashboard()
+            QMessageBox.information(self, "موفق", message)
+        else:
+            QMessageBox.warning(self, "خطا", message)
+    
+    def set_worker_department(self):
+        worker_id = self.department_worker_picker.get_worker_id()
+        if not worker_id:
+            QMessageBox.warning(self, "خطا", "لطفاً یک کارمند را انتخاب کنید")
+            return
+        success, message = self.db.set_worker_department(worker_id, self.department_member_combo.currentData())
+        self.generate_department_dashboard()
+        QMessageBox.information(self, "موفق", message)
+    
+    def generate_department_dashboard(self):
+        self.department_dashboard = self.db.get_department_dashboard(
+            self.department_year_combo.currentData(), self.department_month_combo.currentData())
+        self.department_rows = [
+            ["    " * d['depth'] + d['name'], to_persian_number(d['members']),
+             to_persian_number(d['worker_days']), to_persian_number(f"{d['hours']:.1f}"),
+             to_persian_number(f"{d['late_minutes']:.0f}"), to_persian_number(f"{d['overtime_minutes']:.0f}")]
+            for d in self.department_dashboard
+        ]
+        self.department_table.setRowCount(len(self.department_rows))
+        for row, values in enumerate(self.department_rows):
+            for column, value in enumerate(values):
+                self.department_table.setItem(row, column, QTableWidgetItem(value))
+    
+    def export_department_dashboard(self):
+        if not self.department_rows:
+            QMessageBox.warning(self, "خطا", "داده‌ای برای خروجی وجود ندارد")
+            return
+        file_path, _ = QFileDialog.getSaveFileName(
+            self, "ذخیره فایل Excel", f"گزارش_واحدها_{JalaliDate.today().strftime('%Y_%m_%d')}",
+            "Excel Files (*.xlsx)"
+        )
+        if file_path and self.export_manager.export_to_excel(self.department_rows, DEPARTMENT_COLUMNS, file_path):
+            QMessageBox.information(self, "موفق", "فایل Excel با موفقیت ذخیره شد")
+    
+    def init_profile_tab(self):
+        layout = QVBoxLayout()
+        self.profile_tab.setLayout(layout)
+        
+        controls_layout = QHBoxLayout()
+        self.profile_label = QLabel()
+        controls_layout.addWidget(self.profile_label)
+        controls_layout.addStretch()
+        
+        refresh_button = QPushButton("به‌روزرسانی")
+        refresh_button.clicked.connect(self.load_profile)
+        controls_layout.addWidget(refresh_button)
+        
+        reset_button = QPushButton("صفر کردن آمار")
+        reset_button.clicked.connect(self.reset_profile)
+        controls_layout.addWidget(reset_button)
+        layout.addLayout(controls_layout)
+        
+        # One table per level: Database methods, the SQL they ran, the slow log
+        self.profile_tables = {}
+        for key, title, columns in (("methods", "متدها (میلی‌ثانیه، ردیف‌های برگشتی)", ["متد"] + PROFILE_COLUMNS),
+                                    ("statements", "دستورات SQL (میلی‌ثانیه، ردیف‌های تغییریافته)",
+                                     ["دستور"] + PROFILE_COLUMNS),
+                                    ("slow", "پرس‌وجوهای کند", SLOW_QUERY_COLUMNS)):
+            group = QGroupBox(title)
+            group_layout = QVBoxLayout()
+            group.setLayout(group_layout)
+            table = QTableWidget()
+            table.setColumnCount(len(columns))
+            table.setHorizontalHeaderLabels(columns)
+            table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeMode.ResizeToContents)
+            table.horizontalHeader().setStretchLastSection(True)
+            table.setEditTriggers(QTableWidget.EditTrigger.NoEditTriggers)
+            group_layout.addWidget(table)
+            layout.addWidget(group)
+            self.profile_tables[key] = table
+    
+    def load_profile(self):
+        profiler = active_profiler()
+        if profiler is None:
+            self.profile_label.setText("ثبت زمان پرس‌وجوها فعال نیست")
+            return
+        since = datetime.datetime.fromtimestamp(profiler.started)
+        started = to_persian_number(gregorian_to_jalali(since).strftime('%Y/%m/%d %H:%M'))
+        self.profile_label.setText(
+            f"آمار از {started} — آستانه کندی {to_persian_number(f'{profiler.slow_ms:g}')} میلی‌ثانیه")
+        
+        def stats_row(name, s):
+            return [name] + [to_persian_number(value) for value in (
+                s['calls'], f"{s['mean_ms']:.2f}", f"{s['p50_ms']:.2f}", f"{s['p95_ms']:.2f}",
+                f"{s['p99_ms']:.2f}", f"{s['max_ms']:.2f}", s['rows'], s['errors'], s['lock_waits'])]
+        
+        def slow_time(text):
+            logged = gregorian_to_jalali(datetime.datetime.fromisoformat(text))
+            return to_persian_number(logged.strftime('%Y/%m/%d %H:%M:%S'))
+        
+        entries = read_json_log(profiler.log_path or default_log_path(self.db.db_path), 100)
+        tables = {
+            "methods": [stats_row(name, s) for name, s in profiler.method_stats()],
+            "statements": [stats_row(sql, s) for sql, s in profiler.statement_stats(100)],
+            "slow": [[slow_time(entry['time']), to_persian_number(f"{entry['ms']:.1f}"), entry['method'],
+                      " ".join((entry['sql'] or "-").split()), " | ".join(entry.get('plan', []))]
+                     for entry in reversed(entries)],
+        }
+        for key, rows in tables.items():
+            table = self.profile_tables[key]
+            table.setRowCount(len(rows))
+            for row, values in enumerate(rows):
+                for column, value in enumerate(values):
+                    item = QTableWidgetItem(str(value))
+                    item.setToolTip(str(value))
+                    table.setItem(row, column, item)
+    
+    def reset_profile(self):
+        profiler = active_profiler()
+        if profiler is not None:
+            profiler.reset()
+        self.load_profile()
+    
     def load_workers(self):
         workers = self.db.get_all_workers()
         self.workers_table.setRowCount(len(workers))
         
-        # Update combo boxes
-        self.worker_filter.clear()
-        self.worker_filter.addItem("همه کارمندان", None)
-        self.monthly_worker_combo.clear()
+        # Convert created_at to Jalali for the whole column at once
+        created_dates = format_jalali_dates(to_epoch_seconds([w['created_at'] for w in workers]))
         
         for row, worker in enumerate(workers):
             self.workers_table.setItem(row, 0, QTableWidgetItem(worker['personal_number']))
             self.workers_table.setItem(row, 1, QTableWidgetItem(worker['full_name']))
             self.workers_table.setItem(row, 2, QTableWidgetItem(worker['phone'] or '-'))
-            
-            # Convert created_at to Jalali
-            # Handle the created_at string properly
-            created_date = datetime.datetime.strptime(worker['created_at'].split('.')[0], '%Y-%m-%d %H:%M:%S')
-            jalali_date = gregorian_to_jalali(created_date)
-            self.workers_table.setItem(row, 3, QTableWidgetItem(
-                to_persian_number(jalali_date.strftime('%Y/%m/%d'))
-            ))
-            
-            # Add to combo boxes
-            self.worker_filter.addItem(worker['full_name'], worker['id'])
-            self.monthly_worker_combo.addItem(worker['full_name'], worker['id'])
+            self.workers_table.setItem(row, 3, QTableWidgetItem(created_dates[row]))
         
         # Store worker data for later use
         self.workers_table.workers_data = workers
     
     def load_all_attendance(self):
-        start_jalali = self.start_date.get_date()
-        end_jalali = self.end_date.get_date()
-        start_date = jalali_to_gregorian(start_jalali)
-        end_date = jalali_to_gregorian(end_jalali)
-        
-        self.current_attendance_records = self.db.get_all_attendance(str(start_date), str(end_date))
-        self.display_attendance_records(self.current_attendance_records)
+        self.filter_attendance()
+    
+    def sync_changes(self):
+        """Apply the rows changed since the last sync from the change feed"""
+        data_version = self.db.get_data_version()
+        if data_version == self.data_version:
+            return
+        self.data_version = data_version
         
-    def display_attendance_records(self, records):
-        self._is_loading = True
-        self.attendance_table.setRowCount(len(records))
+        changes = self.db.get_changes_since(self.change_watermark)
+        if not changes:
+            return
+        self.change_watermark = changes[-1]['seq']
         
-        for row, record in enumerate(records):
-            # Store record ID
-            self.attendance_table.setVerticalHeaderItem(row, QTableWidgetItem(str(record['id'])))
-
-            # Date
-            date_item = QTableWidgetItem(to_persian_number(record['jalali_date']))
-            date_item.setFlags(date_item.flags() & ~Qt.ItemFlag.ItemIsEditable)
-            self.attendance_table.setItem(row, 0, date_item)
-            
-            # Worker name
-            name_item = QTableWidgetItem(record['full_name'])
-            name_item.setFlags(name_item.flags() & ~Qt.ItemFlag.ItemIsEditable)
-            self.attendance_table.setItem(row, 1, name_item)
-            
-            # Personal number
-            personal_num_item = QTableWidgetItem(record['personal_number'])
-            personal_num_item.setFlags(personal_num_item.flags() & ~Qt.ItemFlag.ItemIsEditable)
-            self.attendance_table.setItem(row, 2, personal_num_item)
-            
-            # Entry time
-            entry_time_str = ""
-            if record['entry_time']:
-                entry_dt = datetime.datetime.fromisoformat(record['entry_time'])
-                entry_time_str = entry_dt.strftime('%H:%M:%S')
-            self.attendance_table.setItem(row, 3, QTableWidgetItem(to_persian_number(entry_time_str)))
-            
-            # Exit time
-            exit_time_str = ""
-            if record['exit_time']:
-                exit_dt = datetime.datetime.fromisoformat(record['exit_time'])
-                exit_time_str = exit_dt.strftime('%H:%M:%S')
-            self.attendance_table.setItem(row, 4, QTableWidgetItem(to_persian_number(exit_time_str)))
-
-            # Total hours
-            total_hours_str = "-"
-            if record['total_hours'] and record['total_hours'] > 0:
-                total_hours_str = f"{record['total_hours']:.2f} ساعت"
-            total_hours_item = QTableWidgetItem(to_persian_number(total_hours_str))
-            total_hours_item.setFlags(total_hours_item.flags() & ~Qt.ItemFlag.ItemIsEditable)
-            self.attendance_table.setItem(row, 5, total_hours_item)
-            
-            # Status
-            status_str = "در حال کار"
-            if record['exit_time']:
-                status_str = "تکمیل شده"
-            status_item = QTableWidgetItem(status_str)
-            status_item.setFlags(status_item.flags() & ~Qt.ItemFlag.ItemIsEditable)
-            self.attendance_table.setItem(row, 6, status_item)
-        self._is_loading = False
+        if any(c['table_name'] == 'workers' for c in changes):
+            self.load_workers()
+        self.attendance_model.apply_changes(changes)
     
     def filter_attendance(self):
-        worker_id = self.worker_filter.currentData()
-        start_jalali = self.start_date.get_date()
-        end_jalali = self.end_date.get_date()
-        start_date = jalali_to_gregorian(start_jalali)
-        end_date = jalali_to_gregorian(end_jalali)
-        
-        if worker_id:
-            db_records = self.db.get_worker_attendance(worker_id, str(start_date), str(end_date))
-            worker_info = next((w for w in self.workers_table.workers_data if w['id'] == worker_id), None)
-            
-            records = []
-            if worker_info:
-                for record in db_records:
-                    mutable_record = dict(record)
-                    mutable_record['full_name'] = worker_info['full_name']
-                    mutable_record['personal_number'] = worker_info['personal_number']
-                    records.append(mutable_record)
+        start_date = str(jalali_to_gregorian(self.start_date.get_date()))
+        end_date = str(jalali_to_gregorian(self.end_date.get_date()))
+        worker_id = self.worker_filter.get_worker_id()
+        status = self.status_filter.currentData()
+        department_id = self.department_filter.currentData()
+        # A cached filter is only reused once it has the latest changes
+        self.sync_changes()
+        
+        def make_query():
+            query = self.db.attendance_query().between(start_date, end_date).status(status)
+            if department_id:
+                query.department(department_id)
+            return query.worker(worker_id) if worker_id else query
+        
+        # The default order is newest first
+        descending = self.sort_descending if self.sort_column is not None else True
+        self.attendance_model.set_query(make_query, self.sort_column, descending,
+                                        key=(start_date, end_date, worker_id, status, department_id))
+    
+    def sort_attendance(self, column):
+        if self.sort_column == column:
+            self.sort_descending = not self.sort_descending
         else:
-            self.current_attendance_records = self.db.get_all_attendance(str(start_date), str(end_date))
-            records = self.current_attendance_records
-        
-        self.display_attendance_records(records)
+            self.sort_column = column
+            self.sort_descending = False
+        order = Qt.SortOrder.DescendingOrder if self.sort_descending else Qt.SortOrder.AscendingOrder
+        self.attendance_table.horizontalHeader().setSortIndicator(column, order)
+        self.filter_attendance()
     
     def add_worker(self):
         dialog = AddWorkerDialog(self)
@@ -358,7 +1043,7 @@ class AdminWindow(QMainWindow):
             data = dialog.get_data()
             if self.db.add_worker(data['personal_number'], data['full_name'], data['phone']):
                 QMessageBox.information(self, "موفق", "کارمند جدید با موفقیت اضافه شد")
-                self.load_workers()
+                self.sync_changes()
             else:
                 QMessageBox.critical(self, "خطا", "این شماره پرسنلی قبلاً ثبت شده است")
     
@@ -371,8 +1056,7 @@ class AdminWindow(QMainWindow):
         worker_data = self.workers_table.workers_data[current_row]
         dialog = EditWorkerDialog(worker_data, self)
         if dialog.exec():
-            # Reload workers
-            self.load_workers()
+            self.sync_changes()
     
     def delete_worker(self):
         current_row = self.workers_table.currentRow()
@@ -390,11 +1074,10 @@ class AdminWindow(QMainWindow):
         if reply == QMessageBox.StandardButton.Yes:
             self.db.delete_worker(worker_data['id'])
             QMessageBox.information(self, "موفق", "کارمند با موفقیت حذف شد")
-            self.load_workers()
-            self.load_all_attendance()
+            self.sync_changes()
     
     def generate_monthly_report(self):
-        worker_id = self.monthly_worker_combo.currentData()
+        worker_id = self.monthly_worker_combo.get_worker_id()
         if not worker_id:
             QMessageBox.warning(self, "خطا", "لطفاً یک کارمند را انتخاب کنید")
             return
@@ -422,9 +1105,12 @@ class AdminWindow(QMainWindow):
         # Calculate statistics
         total_days = len(records)
         total_hours = sum(r['total_hours'] for r in records if r['total_hours'])
+        absence = self.db.get_absence_report(*jalali_period_range(year, month), worker_id=worker_id)
+        workdays = absence[0]['workdays'] if absence else 0
+        absent_days = absence[0]['absent_days'] if absence else 0
         
         # Generate report text
-        worker_name = self.monthly_worker_combo.currentText()
+        worker_name = self.monthly_worker_combo.get_worker_name()
         month_name = self.month_combo.currentText()
         
         report_text = f"""
@@ -434,21 +1120,133 @@ class AdminWindow(QMainWindow):
         <p><b>ماه:</b> {month_name}</p>
         <hr>
         <p><b>تعداد روزهای حضور:</b> {to_persian_number(str(total_days))} روز</p>
+        <p><b>روزهای کاری ماه:</b> {to_persian_number(str(workdays))} روز</p>
+        <p><b>روزهای غیبت:</b> {to_persian_number(str(absent_days))} روز</p>
         <p><b>مجموع ساعات کاری:</b> {to_persian_number(f"{total_hours:.2f}")} ساعت</p>
         <p><b>میانگین ساعات کاری روزانه:</b> {to_persian_number(f"{total_hours/total_days:.2f}" if total_days > 0 else "0")} ساعت</p>
         """
         
         self.report_display.setText(report_text)
     
+    def generate_heatmap(self):
+        start = str(jalali_to_gregorian(self.heatmap_start.get_date()))
+        end = str(jalali_to_gregorian(self.heatmap_end.get_date()))
+        if start > end:
+            QMessageBox.warning(self, "خطا", "تاریخ شروع باید قبل از تاریخ پایان باشد")
+            return
+        days, matrix = hourly_occupancy(self.db.get_session_times(start, end), start, end)
+        if self.heatmap_mode.currentData() == "weekday":
+            labels = ["شنبه", "یکشنبه", "دوشنبه", "سه‌شنبه", "چهارشنبه", "پنج‌شنبه", "جمعه"]
+            matrix = weekday_profile(days, matrix)
+        else:
+            labels = [to_persian_number(gregorian_to_jalali(datetime.date.fromisoformat(d)).strftime('%Y/%m/%d'))
+                      for d in days]
+        self.heatmap = (labels, matrix)
+        
+        peak = max(int(matrix.max()), 1) if matrix.size else 1
+        self.heatmap_table.setRowCount(len(labels))
+        self.heatmap_table.setVerticalHeaderLabels(labels)
+        for row, values in enumerate(matrix.tolist()):
+            for column, value in enumerate(values):
+                item = QTableWidgetItem(to_persian_number(str(value)) if value else "")
+                item.setTextAlignment(Qt.AlignmentFlag.AlignCenter)
+                # White (empty) to blue (busiest hour of the range)
+                shade = value / peak
+                item.setBackground(QColor(int(255 - 230 * shade), int(255 - 137 * shade), int(255 - 45 * shade)))
+                if shade > 0.6:
+                    item.setForeground(QColor("white"))
+                self.heatmap_table.setItem(row, column, item)
+    
+    def generate_absence_report(self):
+        start, end = jalali_period_range(self.absence_year_combo.currentData(),
+                                         self.absence_month_combo.currentData())
+        report = self.db.get_absence_report(start, end)
+        self.absence_rows = [
+            [r['full_name'], to_persian_number(r['personal_number']), to_persian_number(r['workdays']),
+             to_persian_number(r['present_days']), to_persian_number(r['absent_days'])]
+            for r in report
+        ]
+        self.absence_table.setRowCount(len(self.absence_rows))
+        for row, values in enumerate(self.absence_rows):
+            for column, value in enumerate(values):
+                self.absence_table.setItem(row, column, QTableWidgetItem(value))
+    
+    def export_absence_report(self):
+        if not self.absence_rows:
+            QMessageBox.warning(self, "خطا", "داده‌ای برای خروجی وجود ندارد")
+            return
+        file_path, _ = QFileDialog.getSaveFileName(
+            self, "ذخیره فایل Excel", f"گزارش_غیبت_{JalaliDate.today().strftime('%Y_%m_%d')}",
+            "Excel Files (*.xlsx)"
+        )
+        if file_path and self.export_manager.export_to_excel(self.absence_rows, ABSENCE_COLUMNS, file_path):
+            QMessageBox.information(self, "موفق", "فایل Excel با موفقیت ذخیره شد")
+    
+    def import_holidays(self):
+        file_path, _ = QFileDialog.getOpenFileName(
+            self, "فایل تعطیلات (تاریخ شمسی، عنوان)", "", "CSV Files (*.csv *.txt)"
+        )
+        if not file_path:
+            return
+        success, message = self.db.import_holidays(file_path)
+        if success:
+            QMessageBox.information(self, "موفق", message)
+        else:
+            QMessageBox.warning(self, "خطا", message)
+    
+    def export_heatmap(self):
+        if self.heatmap is None:
+            QMessageBox.warning(self, "خطا", "ابتدا نقشه حضور را نمایش دهید")
+            return
+        file_path, _ = QFileDialog.getSaveFileName(
+            self, "ذخیره فایل Excel", f"نقشه_حضور_{JalaliDate.today().strftime('%Y_%m_%d')}",
+            "Excel Files (*.xlsx)"
+        )
+        if file_path:
+            labels, matrix = self.heatmap
+            if self.export_manager.export_heatmap_to_excel(labels, HOUR_LABELS, matrix, file_path, "ساعت"):
+                QMessageBox.information(self, "موفق", "فایل Excel با موفقیت ذخیره شد")
+    
+    def generate_bulk_reports(self):
+        year = self.year_combo.currentData()
+        month = self.month_combo.currentData()
+        file_path, selected_filter = QFileDialog.getSaveFileName(
+            self, "ذخیره گزارش‌ها", f"گزارش_ماهانه_{year}_{month:02d}.zip",
+            "PDF (*.zip);;Excel (*.zip)"
+        )
+        if not file_path:
+            return
+        
+        fmt = "excel" if selected_filter.startswith("Excel") else "pdf"
+        self.bulk_report_button.setEnabled(False)
+        self.bulk_report_thread = BulkReportThread(BulkReportJob(self.db, year, month, fmt), file_path, self)
+        self.bulk_report_progress = QProgressDialog("در حال تولید گزارش‌ها...", "لغو", 0, 0, self)
+        self.bulk_report_progress.setWindowModality(Qt.WindowModality.WindowModal)
+        self.bulk_report_progress.canceled.connect(self.bulk_report_thread.cancel_event.set)
+        self.bulk_report_thread.progress.connect(self.on_bulk_report_progress)
+        self.bulk_report_thread.done.connect(self.on_bulk_report_done)
+        self.bulk_report_thread.start()
+    
+    def on_bulk_report_progress(self, done, total):
+        self.bulk_report_progress.setMaximum(total)
+        self.bulk_report_progress.setValue(done)
+    
+    def on_bulk_report_done(self, result, error):
+        self.bulk_report_button.setEnabled(True)
+        self.bulk_report_progress.reset()
+        if error:
+            QMessageBox.critical(self, "خطا", f"خطا در تولید گزارش‌ها: {error}")
+        elif result.cancelled:
+            QMessageBox.information(self, "لغو شد", "تولید گزارش‌ها لغو شد")
+        elif result.failed:
+            QMessageBox.critical(self, "خطا", f"{persian_digits(str(len(result.failed)))} گزارش ساخته نشد:\n"
+                                 + "\n".join(result.failed[:10]))
+        else:
+            QMessageBox.information(self, "موفق", f"{persian_digits(str(result.generated))} گزارش ذخیره شد:\n{result.path}")
+    
     def export_attendance(self, format_type):
-        # Get current attendance data
-        data = []
-        for row in range(self.attendance_table.rowCount()):
-            row_data = []
-            for col in range(self.attendance_table.columnCount()):
-                item = self.attendance_table.item(row, col)
-                row_data.append(item.text() if item else '')
-            data.append(row_data)
+        # The whole filtered range in the table's order, not just the loaded pages
+        data = self.attendance_model.all_rows()
         
         if not data:
             QMessageBox.warning(self, "خطا", "داده‌ای برای خروجی وجود ندارد")
@@ -462,8 +1260,7 @@ class AdminWindow(QMainWindow):
                 self, "ذخیره فایل Excel", default_name, "Excel Files (*.xlsx)"
             )
             if file_path:
-                columns = ["تاریخ", "کارمند", "شماره پرسنلی", "ساعت ورود", 
-                          "ساعت خروج", "مدت حضور", "وضعیت"]
+                columns = ATTENDANCE_COLUMNS
                 if self.export_manager.export_to_excel(data, columns, file_path):
                     QMessageBox.information(self, "موفق", "فایل Excel با موفقیت ذخیره شد")
         
@@ -472,8 +1269,7 @@ class AdminWindow(QMainWindow):
                 self, "ذخیره فایل PDF", default_name, "PDF Files (*.pdf)"
             )
             if file_path:
-                columns = ["تاریخ", "کارمند", "شماره پرسنلی", "ساعت ورود", 
-                          "ساعت خروج", "مدت حضور", "وضعیت"]
+                columns = ATTENDANCE_COLUMNS
                 if self.export_manager.export_to_pdf(data, columns, file_path, "گزارش حضور و غیاب"):
                     QMessageBox.information(self, "موفق", "فایل PDF با موفقیت ذخیره شد")
         
@@ -482,31 +1278,48 @@ class AdminWindow(QMainWindow):
                 self, "ذخیره فایل CSV", default_name, "CSV Files (*.csv)"
             )
             if file_path:
-                columns = ["تاریخ", "کارمند", "شماره پرسنلی", "ساعت ورود", 
-                          "ساعت خروج", "مدت حضور", "وضعیت"]
+                columns = ATTENDANCE_COLUMNS
                 if self.export_manager.export_to_csv(data, columns, file_path):
                     QMessageBox.information(self, "موفق", "فایل CSV با موفقیت ذخیره شد")
     
     def print_attendance(self):
-        # Get current attendance data
-        data = []
-        for row in range(self.attendance_table.rowCount()):
-            row_data = []
-            for col in range(self.attendance_table.columnCount()):
-                item = self.attendance_table.item(row, col)
-                row_data.append(item.text() if item else '')
-            data.append(row_data)
+        data = self.attendance_model.all_rows()
         
         if not data:
             QMessageBox.warning(self, "خطا", "داده‌ای برای چاپ وجود ندارد")
             return
         
-        columns = ["تاریخ", "کارمند", "شماره پرسنلی", "ساعت ورود", 
-                  "ساعت خروج", "مدت حضور", "وضعیت"]
+        columns = ATTENDANCE_COLUMNS
         
         if self.export_manager.print_data(data, columns, "گزارش حضور و غیاب", self):
             QMessageBox.information(self, "موفق", "چاپ با موفقیت انجام شد")
     
+    def show_diagnostics(self):
+        watchdog = active_watchdog()
+        if watchdog is None:
+            QMessageBox.warning(self, "خطا", "پایش حلقه رویداد فعال نیست")
+            return
+        DiagnosticsDialog(watchdog, self).exec()
+    
+    def create_backup(self):
+        # The stepped backup sleeps between steps; keep it off the GUI thread
+        self.backup_button.setEnabled(False)
+        self.backup_thread = BackupThread(BackupManager(self.db.db_path), self)
+        self.backup_thread.done.connect(self.on_backup_done)
+        self.backup_thread.start()
+    
+    def on_backup_done(self, result, error):
+        self.backup_button.setEnabled(True)
+        if error:
+            QMessageBox.critical(self, "خطا", f"خطا در پشتیبان‌گیری: {error}")
+        elif result.verified is False:
+            QMessageBox.critical(self, "خطا", f"پشتیبان معتبر نیست: {result.detail}")
+        elif result.missing_archives:
+            QMessageBox.warning(self, "هشدار", f"پشتیبان ذخیره شد:\n{result.path}\n"
+                                "فایل‌های بایگانی زیر یافت نشدند:\n" + "\n".join(result.missing_archives))
+        else:
+            QMessageBox.information(self, "موفق", f"پشتیبان ذخیره شد:\n{result.path}")
+    
     def logout(self):
         from .login_window import LoginWindow
         self.login_window = LoginWindow()
@@ -514,15 +1327,13 @@ class AdminWindow(QMainWindow):
         self.close()
 
     def edit_attendance_record(self):
-        current_row = self.attendance_table.currentRow()
+        current_row = self.attendance_table.currentIndex().row()
         if current_row < 0:
             QMessageBox.warning(self, "خطا", "لطفاً یک رکورد را برای ویرایش انتخاب کنید.")
             return
 
-        record_id = int(self.attendance_table.verticalHeaderItem(current_row).text())
-        
         # Find the full record data
-        record_data = next((r for r in self.current_attendance_records if r['id'] == record_id), None)
+        record_data = self.attendance_model.record(current_row)
 
         if not record_data:
             QMessageBox.critical(self, "خطا", "رکورد مورد نظر یافت نشد.")
@@ -530,4 +1341,16 @@ class AdminWindow(QMainWindow):
 
         dialog = EditAttendanceDialog(record_data, self)
         if dialog.exec():
-            self.filter_attendance()
\ No newline at end of file
+            self.sync_changes()
+    
+    def bulk_edit_attendance(self):
+        rows = sorted({index.row() for index in self.attendance_table.selectionModel().selectedRows()})
+        if not rows:
+            QMessageBox.warning(self, "خطا", "لطفاً رکوردهای مورد نظر را انتخاب کنید.")
+            return
+        
+        records = [self.attendance_model.record(row) for row in rows]
+        dialog = BulkEditAttendanceDialog([r for r in records if r], self)
+        dialog.exec()
+        # Some rows may have been saved even if others failed
+        self.sync_changes()
@@ -0,0 +1,278 @@
+from collections import OrderedDict
+
+from PyQt6.QtCore import Qt, QAbstractTableModel, QModelIndex
+
+from utils.columnar_utils import ATTENDANCE_COLUMNS, format_attendance_rows
+
+# SORT_EXPRESSIONS key of each ATTENDANCE_COLUMNS column
+SORT_COLUMNS = ["date", "full_name", "personal_number", "entry_time", "exit_time",
+                "total_hours", "status"]
+
+
+class FilterState:
+    """Row count, cached pages and known row membership of one filter"""
+
+    def __init__(self, factory):
+        self.factory = factory
+        self.count = None
+        self.walk_index = False
+        self.sort = None
+        self.pages = OrderedDict()
+        # Whether each attendance id seen in the change feed matches the filter
+        self.members = {}
+
+    def cached_rows(self):
+        """{attendance id: (page number, offset)} of the rows in the cached pages"""
+        return {record['id']: (number, offset)
+                for number, (records, _) in self.pages.items()
+                for offset, record in enumerate(records)}
+
+
+class AttendanceTableModel(QAbstractTableModel):
+    """Attendance rows loaded a page at a time, sorted by the database.
+
+    Only the row count is queried up front. Pages of PAGE_SIZE rows are
+    fetched when the view paints them, continuing from the previous page's
+    last (sort key, id) when it is cached (keyset paging) and with an
+    OFFSET after a jump. At most MAX_PAGES pages are kept per filter, so
+    memory does not grow with the size of the range. Sorting re-queries
+    with the new ORDER BY instead of sorting rows in the GUI thread.
+
+    The count and pages of the last MAX_FILTERS filters are kept, so
+    switching between workers or statuses does not count again, and
+    ``apply_changes`` keeps them current from the change feed.
+    """
+
+    PAGE_SIZE = 200
+    MAX_PAGES = 25
+    MAX_FILTERS = 8
+    # Change batches larger than this (an archive run, an import) are not
+    # applied row by row: the filters are dropped and the shown one counted again
+    MAX_CHANGES = 2000
+    # Walk the sort column's index instead of sorting the rows once they are
+    # this many and at least this share of the table (entry and exit times
+    # follow the date, so walking their index to a narrow range skips a lot)
+    WALK_INDEX_ROWS = 20000
+    WALK_INDEX_SHARE = 0.25
+
+    def __init__(self, parent=None, cache=None):
+        super().__init__(parent)
+        # ReportCache serving all_rows, if any
+        self.cache = cache
+        self._filters = OrderedDict()
+        self._state = None
+        self._key = None
+        self.sort_column = "date"
+        self.descending = True
+
+    def set_query(self, factory, sort_column=None, descending=True, key=None):
+        """Show the rows of ``factory()``, a function returning a filtered AttendanceQuery.
+
+        ``key`` (any hashable) identifies the filter; its count and pages are
+        reused when it is shown again. Without a key the rows are always counted.
+        """
+        self.beginResetModel()
+        self.sort_column = SORT_COLUMNS[sort_column] if sort_column is not None else "date"
+        self.descending = descending
+        self._key = key
+        state = self._filters.get(key) if key is not None else None
+        if state is None:
+            state = FilterState(factory)
+            if key is not None:
+                self._filters[key] = state
+                while len(self._filters) > self.MAX_FILTERS:
+                    self._filters.popitem(last=False)
+        else:
+            state.factory = factory
+            self._filters.move_to_end(key)
+        if state.sort != (self.sort_column, self.descending):
+            state.sort = (self.sort_column, self.descending)
+            state.pages.clear()
+        self._state = state
+        if state.count is None:
+            self._count(state)
+        self.endResetModel()
+
+    def refresh(self):
+        """Count the shown rows again and drop everything cached (after data changes)"""
+        self.beginResetModel()
+        self._filters = OrderedDict((key, state) for key, state in self._filters.items()
+                                    if state is self._state)
+        if self._state:
+            self._state.pages.clear()
+            self._state.members.clear()
+            self._count(self._state)
+        self.endResetModel()
+
+    def _count(self, state):
+        query = state.factory()
+        state.count = query.count()
+        state.walk_index = (state.count > self.WALK_INDEX_ROWS
+                            and state.count >= query.table_size() * self.WALK_INDEX_SHARE)
+
+    def apply_changes(self, changes):
+        """Bring the cached filters up to date with rows from ``Database.get_changes_since``.
+
+        Only the changed attendance ids are read, once per cached filter.
+        A count moves by the rows that entered or left its filter; cached
+        rows that kept their place are updated in place, otherwise the
+        filter's pages are dropped and read again when painted. A filter
+        that may have held a changed row it never saw is counted again
+        when shown. Edited workers (names, departments) reset everything.
+        """
+        operations = {}
+        for change in changes:
+            if change['table_name'] == 'attendance':
+                operations.setdefault(change['row_id'], []).append(change['operation'])
+            elif change['operation'] == 'UPDATE':
+                self.refresh()
+                return
+        if not operations:
+            return
+        if len(operations) > self.MAX_CHANGES:
+            self.refresh()
+            return
+        inserted = {row_id for row_id, ops in operations.items() if ops[0] == 'INSERT'}
+        deleted = {row_id for row_id, ops in operations.items() if ops[-1] == 'DELETE'}
+        live = list(operations.keys() - deleted)
+        states = list(self._filters.values())
+        if self._state is not None and self._state not in states:
+            states.append(self._state)
+        for state in states:
+            shown = state is self._state
+            patched = self._apply(state, operations.keys(), inserted, deleted, live)
+            if not shown:
+                continue
+            if state.count is None or patched is None:
+                self.beginResetModel()
+                if state.count is None:
+                    self._count(state)
+                self.endResetModel()
+            elif patched:
+                last = len(SORT_COLUMNS) - 1
+                for row in patched:
+                    self.dataChanged.emit(self.index(row, 0), self.index(row, last))
+
+    def _apply(self, state, changed, inserted, deleted, live):
+        """Apply changed ids to one filter; the rows patched in place, or None if its pages were dropped"""
+        fresh = {}
+        for i in range(0, len(live), 500):
+            query = state.factory().ids(live[i:i + 500]).sort(*state.sort)
+            fresh.update((record['id'], dict(record)) for record in query.fetch())
+        cached = state.cached_rows()
+        before, unknown = set(), False
+        for row_id in changed:
+            member = state.members.get(row_id)
+            if member is None:
+                if row_id in cached:
+                    member = True
+                elif row_id in inserted:
+                    member = False
+                else:
+                    unknown = True
+            if member:
+                before.add(row_id)
+        for row_id in changed:
+            if row_id in deleted:
+                state.members.pop(row_id, None)
+            else:
+                state.members[row_id] = row_id in fresh
+
+        if unknown:
+            state.count = None
+        elif not before and not fresh:
+            return []
+        elif state.count is not None:
+            state.count += len(fresh) - len(before)
+        # Rows that stayed in the filter with the same sort key keep their place
+        places = [cached.get(row_id) for row_id in fresh]
+        if (state.count is None or fresh.keys() != before or None in places
+                or any(state.pages[number][0][offset]['sort_key'] != record['sort_key']
+                       for (number, offset), record in zip(places, fresh.values()))):
+            state.pages.clear()
+            return None
+        patched = []
+        for (number, offset), record in zip(places, fresh.values()):
+            records, rows = state.pages[number]
+            records[offset] = record
+            rows[offset] = format_attendance_rows([record])[0]
+            patched.append(number * self.PAGE_SIZE + offset)
+        return patched
+
+    def _query(self):
+        return self._state.factory().sort(self.sort_column, self.descending,
+                                          walk_index=self._state.walk_index)
+
+    def _page(self, number):
+        pages = self._state.pages
+        page = pages.get(number)
+        if page is not None:
+            pages.move_to_end(number)
+            return page
+        query = self._query()
+        previous = pages.get(number - 1)
+        if previous and previous[0]:
+            last = previous[0][-1]
+            query.after(last['sort_key'], last['id']).limit(self.PAGE_SIZE)
+        else:
+            query.limit(self.PAGE_SIZE, number * self.PAGE_SIZE)
+        records = [dict(r) for r in query.fetch()]
+        page = (records, format_attendance_rows(records))
+        pages[number] = page
+        while len(pages) > self.MAX_PAGES:
+            pages.popitem(last=False)
+        return page
+
+    def record(self, row):
+        """The attendance record (dict) shown in ``row``, or None"""
+        if not 0 <= row < self.rowCount():
+            return None
+        records = self._page(row // self.PAGE_SIZE)[0]
+        offset = row % self.PAGE_SIZE
+        return records[offset] if offset < len(records) else None
+
+    def all_rows(self, batch_size=5000):
+        """Every formatted row in the current order, for export and printing.
+
+        With a cache, the rows are kept under the filter's key and the sort
+        (the cache adds the change-log watermark), so exporting and printing
+        an unchanged view reads it once.
+        """
+        if self.cache is None or self._key is None:
+            return self._read_all_rows(batch_size)
+        return self.cache.get_or_compute("attendance_table_rows", lambda *_: self._read_all_rows(batch_size),
+                                         self._key, self.sort_column, self.descending)
+
+    def _read_all_rows(self, batch_size):
+        rows, last = [], None
+        while True:
+            query = self._query().limit(batch_size)
+            if last is not None:
+                query.after(last['sort_key'], last['id'])
+            records = query.fetch()
+            if not records:
+                return rows
+            rows += format_attendance_rows(records)
+            last = records[-1]
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() or self._state is None else self._state.count
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(ATTENDANCE_COLUMNS)
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if role != Qt.ItemDataRole.DisplayRole or not index.isValid():
+            return None
+        records, rows = self._page(index.row() // self.PAGE_SIZE)
+        offset = index.row() % self.PAGE_SIZE
+        # Rows deleted since the count was taken show up empty until the next refresh
+        return rows[offset][index.column()] if offset < len(rows) else None
+
+    def headerData(self, section, orientation, role=Qt.ItemDataRole.DisplayRole):
+        if role != Qt.ItemDataRole.DisplayRole:
+            return None
+        if orientation == Qt.Orientation.Horizontal:
+            return ATTENDANCE_COLUMNS[section]
+        record = self.record(section)
+        return str(record['id']) if record else None
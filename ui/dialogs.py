@@ -125,8 +125,10 @@ class EditWorkerDialog(QDialog):
         
         self.accept()
 from PyQt6.QtWidgets import QDialog, QVBoxLayout, QHBoxLayout, QLabel, QLineEdit, QPushButton, QMessageBox, QTimeEdit
+from PyQt6.QtWidgets import QCheckBox, QSpinBox, QTableWidget, QTableWidgetItem, QHeaderView, QPlainTextEdit
 from PyQt6.QtCore import Qt, QTime
 from database import Database
+from utils.profiling_utils import read_json_log
 import datetime
 
 class EditAttendanceDialog(QDialog):
@@ -188,15 +190,257 @@ class EditAttendanceDialog(QDialog):
     def save(self):
         attendance_id = self.record_data['id']
         
-        # Update entry time
         entry_time = self.entry_time_edit.time().toString("HH:mm:ss")
         entry_datetime_str = f"{self.record_data['date']}T{entry_time}"
-        self.db.update_attendance_time(attendance_id, 'entry_time', entry_datetime_str)
-
-        # Update exit time
+        
+        # An open session stays open unless an exit time was actually entered
+        exit_datetime_str = None
         exit_time = self.exit_time_edit.time().toString("HH:mm:ss")
-        exit_datetime_str = f"{self.record_data['date']}T{exit_time}"
-        self.db.update_attendance_time(attendance_id, 'exit_time', exit_datetime_str)
+        if self.record_data['exit_time'] or exit_time != "00:00:00":
+            exit_datetime_str = f"{self.record_data['date']}T{exit_time}"
+        
+        _, success, message = self.db.update_attendance_times(
+            [(attendance_id, entry_datetime_str, exit_datetime_str)]
+        )[0]
+        if not success:
+            QMessageBox.critical(self, "خطا", message)
+            return
         
         QMessageBox.information(self, "موفق", "تغییرات با موفقیت ذخیره شد.")
-        self.accept()
\ No newline at end of file
+        self.accept()
+
+
+class BulkEditAttendanceDialog(QDialog):
+    """Correct the times of many attendance records in one transaction"""
+    
+    def __init__(self, records, parent=None):
+        super().__init__(parent)
+        self.records = list(records)
+        self.db = Database()
+        self.setWindowTitle("ویرایش گروهی حضور و غیاب")
+        self.resize(700, 500)
+        self.init_ui()
+        self.load_data()
+    
+    def init_ui(self):
+        layout = QVBoxLayout()
+        self.setLayout(layout)
+        
+        layout.addWidget(QLabel(f"تعداد رکوردهای انتخاب‌شده: {len(self.records)}"))
+        
+        entry_layout = QHBoxLayout()
+        self.set_entry_check = QCheckBox("تنظیم ساعت ورود:")
+        self.entry_time_edit = QTimeEdit()
+        self.entry_time_edit.setDisplayFormat("HH:mm:ss")
+        entry_layout.addWidget(self.set_entry_check)
+        entry_layout.addWidget(self.entry_time_edit)
+        entry_layout.addStretch()
+        layout.addLayout(entry_layout)
+        
+        exit_layout = QHBoxLayout()
+        self.set_exit_check = QCheckBox("تنظیم ساعت خروج:")
+        self.exit_time_edit = QTimeEdit()
+        self.exit_time_edit.setDisplayFormat("HH:mm:ss")
+        exit_layout.addWidget(self.set_exit_check)
+        exit_layout.addWidget(self.exit_time_edit)
+        exit_layout.addStretch()
+        layout.addLayout(exit_layout)
+        
+        shift_layout = QHBoxLayout()
+        shift_layout.addWidget(QLabel("جابجایی (دقیقه):"))
+        self.shift_spin = QSpinBox()
+        self.shift_spin.setRange(-24 * 60, 24 * 60)
+        shift_layout.addWidget(self.shift_spin)
+        shift_layout.addStretch()
+        layout.addLayout(shift_layout)
+        
+        self.table = QTableWidget()
+        self.table.setColumnCount(5)
+        self.table.setHorizontalHeaderLabels(["کارمند", "تاریخ", "ساعت ورود", "ساعت خروج", "نتیجه"])
+        self.table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Stretch)
+        self.table.setEditTriggers(QTableWidget.EditTrigger.NoEditTriggers)
+        layout.addWidget(self.table)
+        
+        button_layout = QHBoxLayout()
+        layout.addLayout(button_layout)
+        
+        save_button = QPushButton("اعمال تغییرات")
+        save_button.clicked.connect(self.save)
+        button_layout.addWidget(save_button)
+        
+        cancel_button = QPushButton("انصراف")
+        cancel_button.clicked.connect(self.reject)
+        button_layout.addWidget(cancel_button)
+    
+    def load_data(self):
+        self.table.setRowCount(len(self.records))
+        for row, record in enumerate(self.records):
+            self.table.setItem(row, 0, QTableWidgetItem(record['full_name']))
+            self.table.setItem(row, 1, QTableWidgetItem(record['jalali_date']))
+            self.table.setItem(row, 2, QTableWidgetItem(self._time_text(record['entry_time'])))
+            self.table.setItem(row, 3, QTableWidgetItem(self._time_text(record['exit_time'])))
+            self.table.setItem(row, 4, QTableWidgetItem(""))
+    
+    def _time_text(self, value):
+        return datetime.datetime.fromisoformat(str(value)).strftime("%H:%M:%S") if value else "-"
+    
+    def _new_time(self, record, column, check, edit):
+        """New value for one column, or None to leave it unchanged"""
+        shift = datetime.timedelta(minutes=self.shift_spin.value())
+        if check.isChecked():
+            value = datetime.datetime.fromisoformat(
+                f"{record['date']}T{edit.time().toString('HH:mm:ss')}"
+            )
+        elif record[column] and shift:
+            value = datetime.datetime.fromisoformat(str(record[column]))
+        else:
+            return None
+        return (value + shift).isoformat(timespec="seconds")
+    
+    def build_changes(self):
+        return [
+            (record['id'],
+             self._new_time(record, 'entry_time', self.set_entry_check, self.entry_time_edit),
+             self._new_time(record, 'exit_time', self.set_exit_check, self.exit_time_edit))
+            for record in self.records
+        ]
+    
+    def save(self):
+        changes = [c for c in self.build_changes() if c[1] is not None or c[2] is not None]
+        if not changes:
+            QMessageBox.warning(self, "خطا", "تغییری برای اعمال انتخاب نشده است")
+            return
+        
+        results = {attendance_id: (success, message)
+                   for attendance_id, success, message in self.db.update_attendance_times(changes)}
+        failed = 0
+        for row, record in enumerate(self.records):
+            if record['id'] not in results:
+                continue
+            success, message = results[record['id']]
+            failed += not success
+            self.table.setItem(row, 4, QTableWidgetItem("✓" if success else message))
+        
+        if failed:
+            # Successful rows are already saved; keep the dialog open to show the failures
+            QMessageBox.warning(self, "هشدار", f"{len(changes) - failed} رکورد ویرایش شد، "
+                                               f"{failed} رکورد ناموفق بود.")
+            return
+        
+        QMessageBox.information(self, "موفق", f"{len(changes)} رکورد با موفقیت ویرایش شد.")
+        self.accept()
+
+
+class DiagnosticsDialog(QDialog):
+    """Event-loop latency, stalls and view timings from the EventLoopWatchdog"""
+    
+    VIEW_COLUMNS = ["نما", "تعداد", "میانگین (ms)", "p95", "بیشینه"]
+    STALL_COLUMNS = ["زمان", "مدت (ms)", "نما", "نمونه‌ها"]
+    RELEASE_COLUMNS = ["نسخه", "نشست‌ها", "توقف‌ها", "بدترین p95 (ms)", "بیشینه (ms)"]
+    
+    def __init__(self, watchdog, parent=None):
+        super().__init__(parent)
+        self.watchdog = watchdog
+        self.stalls = []
+        self.setWindowTitle("عیب‌یابی رابط کاربری")
+        self.resize(900, 700)
+        self.init_ui()
+        self.load_data()
+    
+    def _table(self, columns):
+        table = QTableWidget()
+        table.setColumnCount(len(columns))
+        table.setHorizontalHeaderLabels(columns)
+        table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Stretch)
+        table.setEditTriggers(QTableWidget.EditTrigger.NoEditTriggers)
+        table.setSelectionBehavior(QTableWidget.SelectionBehavior.SelectRows)
+        return table
+    
+    def init_ui(self):
+        layout = QVBoxLayout()
+        self.setLayout(layout)
+        
+        self.summary_label = QLabel()
+        layout.addWidget(self.summary_label)
+        
+        layout.addWidget(QLabel("زمان پر کردن نماها:"))
+        self.view_table = self._table(self.VIEW_COLUMNS)
+        layout.addWidget(self.view_table)
+        
+        layout.addWidget(QLabel("توقف‌های حلقه رویداد (برای دیدن پشته، یک ردیف را انتخاب کنید):"))
+        self.stall_table = self._table(self.STALL_COLUMNS)
+        self.stall_table.itemSelectionChanged.connect(self.show_stacks)
+        layout.addWidget(self.stall_table)
+        
+        # Stacks are code, shown left to right
+        self.stack_text = QPlainTextEdit()
+        self.stack_text.setReadOnly(True)
+        self.stack_text.setLayoutDirection(Qt.LayoutDirection.LeftToRight)
+        layout.addWidget(self.stack_text)
+        
+        layout.addWidget(QLabel("مقایسه نسخه‌ها:"))
+        self.release_table = self._table(self.RELEASE_COLUMNS)
+        layout.addWidget(self.release_table)
+        
+        button_layout = QHBoxLayout()
+        layout.addLayout(button_layout)
+        
+        refresh_button = QPushButton("به‌روزرسانی")
+        refresh_button.clicked.connect(self.load_data)
+        button_layout.addWidget(refresh_button)
+        
+        close_button = QPushButton("بستن")
+        close_button.clicked.connect(self.accept)
+        button_layout.addWidget(close_button)
+    
+    def _fill(self, table, rows):
+        table.setRowCount(len(rows))
+        for row, values in enumerate(rows):
+            for column, value in enumerate(values):
+                table.setItem(row, column, QTableWidgetItem(str(value)))
+    
+    def load_data(self):
+        summary = self.watchdog.summary()
+        latency = summary['latency_ms']
+        self.summary_label.setText(
+            f"نسخه {summary['version']} — {summary['probes']} نمونه تاخیر حلقه رویداد: "
+            f"p50 {latency['p50']:g} / p95 {latency['p95']:g} / p99 {latency['p99']:g} / "
+            f"بیشینه {latency['max']:g} ms — {summary['stalls']} توقف بیش از {self.watchdog.stall_ms:g} ms")
+        
+        self._fill(self.view_table, [
+            [name, h.count, f"{h.mean:.1f}", f"{h.percentile(95):.1f}", f"{h.max:.1f}"]
+            for name, h in self.watchdog.view_stats()
+        ])
+        
+        self.stalls = list(reversed(self.watchdog.stalls))
+        self._fill(self.stall_table, [
+            [stall['time'].replace("T", " "), f"{stall['ms']:.0f}", stall['view'] or "-", stall['samples']]
+            for stall in self.stalls
+        ])
+        self.stack_text.clear()
+        
+        # Session summaries of earlier runs, grouped by application version
+        releases = {}
+        if self.watchdog.log_path:
+            for record in read_json_log(self.watchdog.log_path, 1000):
+                if record.get('type') != 'session':
+                    continue
+                release = releases.setdefault(record['version'] or "-", [0, 0, 0.0, 0.0])
+                release[0] += 1
+                release[1] += record['stalls']
+                release[2] = max(release[2], record['latency_ms']['p95'])
+                release[3] = max(release[3], record['latency_ms']['max'])
+        self._fill(self.release_table, [
+            [version, sessions, stalls, f"{p95:g}", f"{worst:.0f}"]
+            for version, (sessions, stalls, p95, worst) in sorted(releases.items(), reverse=True)
+        ])
+    
+    def show_stacks(self):
+        row = self.stall_table.currentRow()
+        if not 0 <= row < len(self.stalls):
+            return
+        text = []
+        for stack in self.stalls[row]['stacks']:
+            text.append(f"{stack['count']} / {self.stalls[row]['samples']}")
+            text += [f"    {frame}" for frame in stack['frames']]
+        self.stack_text.setPlainText("\n".join(text))
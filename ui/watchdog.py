@@ -0,0 +1,231 @@
+import inspect
+import json
+import logging
+import logging.handlers
+import os
+import sys
+import threading
+import time
+import traceback
+from collections import Counter, deque
+from datetime import datetime
+from functools import wraps
+
+from PyQt6.QtCore import Qt, QObject, QCoreApplication, pyqtSignal
+
+from utils.profiling_utils import LatencyHistogram
+
+DIAGNOSTICS_LOG_NAME = "attendance.diagnostics"
+
+# Innermost frames kept per stack sample, and distinct stacks kept per stall
+STACK_DEPTH = 25
+STALL_STACKS = 5
+
+# The watchdog started by EventLoopWatchdog.start()
+_active = None
+
+
+def diagnostics_log_path(db_path):
+    """GUI diagnostics log kept next to the database file"""
+    return os.path.splitext(os.path.abspath(db_path))[0] + "_diagnostics.log"
+
+
+def _stack(frame):
+    """The innermost STACK_DEPTH frames above ``frame`` as "file:line function: code", outermost first"""
+    return tuple(f"{os.path.basename(entry.filename)}:{entry.lineno} {entry.name}: {entry.line}"
+                 for entry in traceback.extract_stack(frame, STACK_DEPTH))
+
+
+def _positional_limit(function):
+    """How many positional arguments ``function`` accepts, or None for any number"""
+    parameters = inspect.signature(function).parameters.values()
+    if any(parameter.kind is parameter.VAR_POSITIONAL for parameter in parameters):
+        return None
+    return sum(parameter.kind in (parameter.POSITIONAL_ONLY, parameter.POSITIONAL_OR_KEYWORD)
+               for parameter in parameters)
+
+
+def active_watchdog():
+    """The running EventLoopWatchdog, or None"""
+    return _active
+
+
+class EventLoopWatchdog(QObject):
+    """Event-loop latency of the GUI thread, measured from a helper thread.
+
+    Every ``interval`` seconds the helper thread posts a probe to the GUI
+    thread through a queued signal and waits for it to be handled; the
+    delay is what a click or a repaint waits at that moment. While a probe
+    is unanswered for more than ``stall_ms``, the GUI thread's Python stack
+    is sampled every ``sample_interval`` seconds (``sys._current_frames``).
+    A stall is recorded with its duration, the timed view running at the
+    time and its most frequent stacks, and appended to a rotating
+    JSON-lines log tagged with the application version; ``stop()`` adds a
+    summary of the session, so releases can be compared.
+
+    ``time_views`` wraps view-population methods to time each call.
+    """
+
+    probe = pyqtSignal(int)
+
+    def __init__(self, log_path=None, interval=0.1, stall_ms=200, sample_interval=0.02,
+                 max_stalls=50, max_bytes=1024 * 1024, backup_count=3):
+        super().__init__()
+        self.log_path = log_path
+        self.interval = interval
+        self.stall_ms = stall_ms
+        self.sample_interval = sample_interval
+        self.latency = LatencyHistogram()
+        self.views = {}
+        self.stalls = deque(maxlen=max_stalls)
+        self.stall_count = 0
+        self.started = None
+        self._lock = threading.Lock()
+        self._sequence = 0
+        self._answered = threading.Event()
+        self._answered_at = 0.0
+        self._stop = threading.Event()
+        self._thread = None
+        self._gui_thread_id = threading.get_ident()
+        self._running_views = []
+        self._originals = []
+        # Queued: emitted from the helper thread, handled in the GUI thread
+        self.probe.connect(self._answer, Qt.ConnectionType.QueuedConnection)
+        self.log = logging.getLogger(DIAGNOSTICS_LOG_NAME)
+        self._handler = None
+        if log_path:
+            self._handler = logging.handlers.RotatingFileHandler(
+                log_path, maxBytes=max_bytes, backupCount=backup_count, encoding="utf-8", delay=True)
+            self._handler.setFormatter(logging.Formatter("%(message)s"))
+
+    def start(self):
+        """Start probing; call from the GUI thread"""
+        global _active
+        if self._handler:
+            self.log.addHandler(self._handler)
+            self.log.setLevel(logging.INFO)
+            self.log.propagate = False
+        self._gui_thread_id = threading.get_ident()
+        self.started = time.time()
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="event-loop-watchdog", daemon=True)
+        self._thread.start()
+        _active = self
+        return self
+
+    def stop(self):
+        """Stop probing, log the session summary and restore the timed views"""
+        global _active
+        if self._thread is None:
+            return
+        self._stop.set()
+        self._answered.set()
+        self._thread.join()
+        self._thread = None
+        self._write(dict(self.summary(), type="session"))
+        for cls, name, original in reversed(self._originals):
+            setattr(cls, name, original)
+        self._originals = []
+        if self._handler:
+            self.log.removeHandler(self._handler)
+            self._handler.close()
+        if _active is self:
+            _active = None
+
+    def time_views(self, cls, names):
+        """Time every call of the ``cls`` methods in ``names`` as a view"""
+        for name in names:
+            original = vars(cls)[name]
+            self._originals.append((cls, name, original))
+            setattr(cls, name, self._wrap_view(f"{cls.__name__}.{name}", original))
+
+    def _wrap_view(self, label, function):
+        # A signal connected to the view passes its own arguments (clicked's
+        # bool, an index, ...); drop those the view does not take, as PyQt
+        # does for the unwrapped slot
+        limit = _positional_limit(function)
+
+        @wraps(function)
+        def timed(*args, **kwargs):
+            if limit is not None:
+                args = args[:limit]
+            self._running_views.append(label)
+            started = time.perf_counter()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                elapsed = (time.perf_counter() - started) * 1000
+                self._running_views.pop()
+                with self._lock:
+                    histogram = self.views.get(label) or self.views.setdefault(label, LatencyHistogram())
+                    histogram.add(elapsed)
+        return timed
+
+    def _answer(self, sequence):
+        if sequence == self._sequence:
+            self._answered_at = time.perf_counter()
+            self._answered.set()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self._sequence += 1
+            self._answered.clear()
+            sent = time.perf_counter()
+            self.probe.emit(self._sequence)
+            samples, view = Counter(), None
+            if not self._answered.wait(self.stall_ms / 1000):
+                running = list(self._running_views)
+                view = running[-1] if running else None
+                while not self._answered.is_set():
+                    frame = sys._current_frames().get(self._gui_thread_id)
+                    if frame is not None:
+                        samples[_stack(frame)] += 1
+                    del frame
+                    self._answered.wait(self.sample_interval)
+            if self._stop.is_set():
+                return
+            elapsed = (self._answered_at - sent) * 1000
+            with self._lock:
+                self.latency.add(elapsed)
+            if samples:
+                self._record_stall(elapsed, view, samples)
+
+    def _record_stall(self, elapsed, view, samples):
+        stall = {
+            "type": "stall", "time": datetime.now().isoformat(timespec="seconds"),
+            "version": QCoreApplication.applicationVersion(), "ms": round(elapsed, 1),
+            "view": view, "samples": sum(samples.values()),
+            "stacks": [{"count": count, "frames": list(frames)}
+                       for frames, count in samples.most_common(STALL_STACKS)],
+        }
+        with self._lock:
+            self.stalls.append(stall)
+            self.stall_count += 1
+        self._write(stall)
+
+    def _write(self, record):
+        if self._handler:
+            self.log.info(json.dumps(record, ensure_ascii=False))
+
+    def view_stats(self):
+        """(view, histogram) pairs, most total time first"""
+        with self._lock:
+            items = list(self.views.items())
+        return sorted(items, key=lambda item: item[1].total, reverse=True)
+
+    def summary(self):
+        """Latency percentiles, stall count and view timings of this session"""
+        with self._lock:
+            latency = self.latency
+            return {
+                "time": datetime.now().isoformat(timespec="seconds"),
+                "version": QCoreApplication.applicationVersion(),
+                "seconds": round(time.time() - (self.started or time.time())),
+                "probes": latency.count, "stalls": self.stall_count,
+                "latency_ms": {"mean": round(latency.mean, 2), "p50": round(latency.percentile(50), 2),
+                               "p95": round(latency.percentile(95), 2), "p99": round(latency.percentile(99), 2),
+                               "max": round(latency.max, 1)},
+                "views": {name: {"calls": h.count, "mean_ms": round(h.mean, 2),
+                                 "p95_ms": round(h.percentile(95), 2), "max_ms": round(h.max, 1)}
+                          for name, h in self.views.items()},
+            }
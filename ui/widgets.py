@@ -1,5 +1,7 @@
-from PyQt6.QtWidgets import QWidget, QHBoxLayout, QSpinBox, QLabel, QPushButton, QCalendarWidget, QVBoxLayout, QDialog
-from PyQt6.QtCore import pyqtSignal, QDate
+from PyQt6.QtWidgets import (QWidget, QHBoxLayout, QSpinBox, QLabel, QPushButton, QCalendarWidget,
+                            QVBoxLayout, QDialog, QLineEdit, QCompleter)
+from PyQt6.QtCore import pyqtSignal, QDate, Qt, QTimer, QModelIndex
+from PyQt6.QtGui import QStandardItemModel, QStandardItem
 from persiantools.jdatetime import JalaliDate
 from utils.persian_utils import to_persian_number, to_english_number
 
@@ -54,4 +56,91 @@ class JalaliDatePicker(QWidget):
             date = self.get_date()
             self.dateChanged.emit(date)
         except:
-            pass
\ No newline at end of file
+            pass
+
+class WorkerPicker(QWidget):
+    """Type-ahead worker selector backed by Database.search_workers.
+    
+    Matches are queried incrementally as the user types instead of
+    loading every worker into a combo box.
+    """
+    workerChanged = pyqtSignal(object)
+    
+    SEARCH_DELAY_MS = 150
+    
+    def __init__(self, db, placeholder="جستجوی نام، شماره پرسنلی یا تلفن", parent=None):
+        super().__init__(parent)
+        self.db = db
+        self.worker_id = None
+        self.worker_name = ""
+        self.init_ui(placeholder)
+        
+    def init_ui(self, placeholder):
+        layout = QHBoxLayout()
+        layout.setContentsMargins(0, 0, 0, 0)
+        self.setLayout(layout)
+        
+        self.search_input = QLineEdit()
+        self.search_input.setPlaceholderText(placeholder)
+        self.search_input.setClearButtonEnabled(True)
+        self.search_input.textEdited.connect(self._on_text_edited)
+        layout.addWidget(self.search_input)
+        
+        # The model is already filtered by the database query
+        self.model = QStandardItemModel(self)
+        self.completer = QCompleter(self.model, self)
+        self.completer.setCompletionMode(QCompleter.CompletionMode.UnfilteredPopupCompletion)
+        self.completer.activated[QModelIndex].connect(self._on_activated)
+        self.search_input.setCompleter(self.completer)
+        
+        # Debounce queries while typing
+        self.search_timer = QTimer(self)
+        self.search_timer.setSingleShot(True)
+        self.search_timer.setInterval(self.SEARCH_DELAY_MS)
+        self.search_timer.timeout.connect(self._search)
+        
+    def _on_text_edited(self, text):
+        # Edited text no longer names the chosen worker until it resolves to one again
+        self._choose(None, "")
+        if not text.strip():
+            self.search_timer.stop()
+            self.model.clear()
+            return
+        self.search_timer.start()
+        
+    def _search(self):
+        text = to_english_number(self.search_input.text().strip())
+        self.model.clear()
+        match = None
+        for worker in self.db.search_workers(text):
+            label = f"{worker['full_name']} ({worker['personal_number']})"
+            item = QStandardItem(label)
+            item.setData(worker['id'], Qt.ItemDataRole.UserRole)
+            item.setData(worker['full_name'], Qt.ItemDataRole.UserRole + 1)
+            self.model.appendRow(item)
+            # A complete label or personal number picks the worker without the popup
+            if text in (label, worker['personal_number']):
+                match = worker
+        if match:
+            self._choose(match['id'], match['full_name'])
+        self.completer.complete()
+        
+    def _on_activated(self, index):
+        self._choose(index.data(Qt.ItemDataRole.UserRole), index.data(Qt.ItemDataRole.UserRole + 1))
+        
+    def _choose(self, worker_id, worker_name):
+        self.worker_name = worker_name
+        if worker_id != self.worker_id:
+            self.worker_id = worker_id
+            self.workerChanged.emit(worker_id)
+        
+    def set_worker(self, worker):
+        if worker:
+            self.search_input.setText(f"{worker['full_name']} ({worker['personal_number']})")
+        self._choose(worker['id'] if worker else None, worker['full_name'] if worker else "")
+        
+    def get_worker_id(self):
+        return self.worker_id
+    
+    def get_worker_name(self):
+        return self.worker_name
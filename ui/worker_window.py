@@ -5,9 +5,16 @@ from PyQt6.QtCore import Qt, QTimer, QDateTime
 from PyQt6.QtGui import QIcon
 from database import Database
 from .styles import MAIN_STYLE
-from utils.persian_utils import to_persian_number, format_jalali_datetime
+from utils.persian_utils import to_persian_number
+from utils.columnar_utils import (translate_column, to_epoch_seconds, format_times,
+                                  format_hours, STATUS_WORKING, STATUS_COMPLETED)
 from persiantools.jdatetime import JalaliDateTime
 
+HISTORY_PAGE_SIZE = 50
+
+# Methods that fill a view, timed by the EventLoopWatchdog
+TIMED_VIEWS = ("init_ui", "load_attendance_history", "load_more_history", "refresh_latest_record")
+
 class WorkerWindow(QMainWindow):
     def __init__(self, worker_info):
         super().__init__()
@@ -90,6 +97,12 @@ class WorkerWindow(QMainWindow):
         layout.addWidget(self.history_table)
         self.history_table.setEditTriggers(QTableWidget.EditTrigger.NoEditTriggers)
         
+        # Older records are fetched on demand
+        self.history_table.verticalScrollBar().valueChanged.connect(self._on_history_scrolled)
+        self.more_button = QPushButton("نمایش سوابق بیشتر")
+        self.more_button.clicked.connect(self.load_more_history)
+        layout.addWidget(self.more_button)
+        
     def update_datetime(self):
         now = JalaliDateTime.now()
         self.datetime_label.setText(to_persian_number(now.strftime('%Y/%m/%d - %H:%M:%S')))
@@ -98,7 +111,7 @@ class WorkerWindow(QMainWindow):
         success, message = self.db.record_entry(self.worker_info['id'])
         if success:
             QMessageBox.information(self, "موفق", message)
-            self.load_attendance_history()
+            self.refresh_latest_record()
         else:
             QMessageBox.warning(self, "خطا", message)
     
@@ -106,49 +119,78 @@ class WorkerWindow(QMainWindow):
         success, message = self.db.record_exit(self.worker_info['id'])
         if success:
             QMessageBox.information(self, "موفق", message)
-            self.load_attendance_history()
+            self.refresh_latest_record()
         else:
             QMessageBox.warning(self, "خطا", message)
     
     def load_attendance_history(self):
-        records = self.db.get_worker_attendance(self.worker_info['id'])
-        self.history_table.setRowCount(len(records))
-        
-        for row, record in enumerate(records):
-            # Date
-            self.history_table.setItem(row, 0, QTableWidgetItem(
-                to_persian_number(record['jalali_date'])
-            ))
-            
-            # Entry time
-            if record['entry_time']:
-                entry_time = format_jalali_datetime(record['entry_time'])
-                self.history_table.setItem(row, 1, QTableWidgetItem(
-                    to_persian_number(entry_time.strftime('%H:%M:%S'))
-                ))
-            
-            # Exit time
-            if record['exit_time']:
-                exit_time = format_jalali_datetime(record['exit_time'])
-                self.history_table.setItem(row, 2, QTableWidgetItem(
-                    to_persian_number(exit_time.strftime('%H:%M:%S'))
-                ))
-            else:
-                self.history_table.setItem(row, 2, QTableWidgetItem("-"))
-            
-            # Total hours
-            if record['total_hours'] > 0:
-                self.history_table.setItem(row, 3, QTableWidgetItem(
-                    to_persian_number(f"{record['total_hours']:.2f}")
-                ))
-            else:
-                self.history_table.setItem(row, 3, QTableWidgetItem("-"))
+        """Load the most recent page of the worker's history"""
+        self.history_records = []
+        self.history_table.setRowCount(0)
+        self.has_more_history = True
+        self.load_more_history()
+    
+    def load_more_history(self):
+        """Append the next (older) page of history records"""
+        if not self.has_more_history:
+            return
+        
+        before = None
+        if self.history_records:
+            last = self.history_records[-1]
+            before = (last['date'], last['id'])
+        
+        records = self.db.get_worker_attendance_page(
+            self.worker_info['id'], HISTORY_PAGE_SIZE, before
+        )
+        self.has_more_history = len(records) == HISTORY_PAGE_SIZE
+        self.more_button.setVisible(self.has_more_history)
+        
+        start_row = len(self.history_records)
+        self.history_records.extend(records)
+        self.history_table.setRowCount(len(self.history_records))
+        self._set_history_rows(start_row, records)
+    
+    def refresh_latest_record(self):
+        """Apply the row changed by a punch without reloading the history.
+        
+        A punch either inserts the newest record or closes the open one,
+        which is always the worker's newest record.
+        """
+        latest = self.db.get_worker_attendance_page(self.worker_info['id'], 1)
+        if not latest:
+            return
+        record = latest[0]
+        
+        row = next((i for i, r in enumerate(self.history_records) if r['id'] == record['id']), None)
+        if row is None:
+            row = 0
+            self.history_records.insert(0, record)
+            self.history_table.insertRow(0)
+        else:
+            self.history_records[row] = record
+        self._set_history_rows(row, [record])
+    
+    def _on_history_scrolled(self, value):
+        if value == self.history_table.verticalScrollBar().maximum():
+            self.load_more_history()
+    
+    def _set_history_rows(self, start_row, records):
+        # Format whole columns at once instead of once per cell
+        dates = translate_column([r['jalali_date'] for r in records])
+        entry_times = format_times(to_epoch_seconds([r['entry_time'] for r in records]))
+        exit_times = format_times(to_epoch_seconds([r['exit_time'] for r in records]), missing="-")
+        durations = format_hours([r['total_hours'] for r in records])
+        
+        for i, record in enumerate(records):
+            row = start_row + i
+            self.history_table.setItem(row, 0, QTableWidgetItem(dates[i]))
+            self.history_table.setItem(row, 1, QTableWidgetItem(entry_times[i]))
+            self.history_table.setItem(row, 2, QTableWidgetItem(exit_times[i]))
+            self.history_table.setItem(row, 3, QTableWidgetItem(durations[i]))
             
             # Status
-            if record['exit_time']:
-                status = "تکمیل شده"
-            else:
-                status = "در حال کار"
+            status = STATUS_COMPLETED if record['exit_time'] else STATUS_WORKING
             self.history_table.setItem(row, 4, QTableWidgetItem(status))
     
     def logout(self):
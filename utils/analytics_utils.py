@@ -0,0 +1,282 @@
+import glob
+import json
+import os
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.parquet as pq
+except ImportError:  # the mirror is optional
+    pa = None
+
+try:
+    import duckdb
+except ImportError:  # pandas is used instead
+    duckdb = None
+
+ATTENDANCE_FIELDS = ("id", "worker_id", "entry_time", "exit_time", "date",
+                     "jalali_date", "total_hours")
+WORKER_FIELDS = ("id", "personal_number", "full_name")
+
+# Length of the jalali_date prefix ('1403/05/12') that identifies a period
+PERIOD_PREFIX = {"year": 4, "month": 7, "day": 10}
+
+
+def is_available():
+    """True when pyarrow is installed, i.e. a mirror can be built"""
+    return pa is not None
+
+
+def default_root(db_path):
+    """Mirror directory kept next to the database file"""
+    return os.path.splitext(os.path.abspath(db_path))[0] + "_analytics"
+
+
+def _attendance_schema():
+    return pa.schema([
+        ("id", pa.int64()),
+        ("worker_id", pa.int64()),
+        ("entry_time", pa.string()),
+        ("exit_time", pa.string()),
+        ("date", pa.string()),
+        ("jalali_date", pa.string()),
+        ("total_hours", pa.float64()),
+    ])
+
+
+def _rows_to_table(rows, fields, schema):
+    columns = {field: [row[field] for row in rows] for field in fields}
+    for field in ("entry_time", "exit_time"):
+        if field in columns:
+            columns[field] = [None if v is None else str(v) for v in columns[field]]
+    return pa.table(columns, schema=schema)
+
+
+class AnalyticsMirror:
+    """Columnar copy of attendance for heavy, multi-year reports.
+
+    Attendance is stored as one Parquet file per Gregorian year
+    (``attendance/year=YYYY/data.parquet``) next to a small workers file.
+    ``refresh`` reads only the change log since the mirror's watermark and
+    rewrites just the year files holding changed rows, so kiosks never
+    wait on report queries. Aggregates run in DuckDB when it is installed
+    and in pandas otherwise.
+    """
+
+    def __init__(self, db, root=None):
+        if pa is None:
+            raise RuntimeError("pyarrow is required for the analytics mirror")
+        self.db = db
+        self.root = root or default_root(db.db_path)
+        self.state_path = os.path.join(self.root, "state.json")
+        self.workers_path = os.path.join(self.root, "workers.parquet")
+
+    def exists(self):
+        return os.path.exists(self.state_path)
+
+    def _partition_path(self, year):
+        return os.path.join(self.root, "attendance", f"year={year}", "data.parquet")
+
+    def _partition_years(self):
+        pattern = os.path.join(self.root, "attendance", "year=*", "data.parquet")
+        return sorted(int(os.path.basename(os.path.dirname(p))[5:]) for p in glob.glob(pattern))
+
+    def _write(self, table, path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        pq.write_table(table, path + ".partial", compression="zstd")
+        os.replace(path + ".partial", path)
+
+    def _read_state(self):
+        with open(self.state_path, encoding="utf-8") as f:
+            return json.load(f)
+
+    def _write_state(self, watermark):
+        os.makedirs(self.root, exist_ok=True)
+        with open(self.state_path + ".partial", "w", encoding="utf-8") as f:
+            json.dump({"watermark": watermark}, f)
+        os.replace(self.state_path + ".partial", self.state_path)
+
+    def _write_workers(self, conn):
+        rows = conn.execute("SELECT id, personal_number, full_name FROM workers").fetchall()
+        schema = pa.schema([("id", pa.int64()), ("personal_number", pa.string()),
+                            ("full_name", pa.string())])
+        self._write(_rows_to_table(rows, WORKER_FIELDS, schema), self.workers_path)
+
+    def watermark(self):
+        return self._read_state()["watermark"] if self.exists() else None
+
+    def is_fresh(self):
+        return self.exists() and self.watermark() == self.db.get_change_watermark()
+
+    def rebuild(self, batch_size=50000):
+        """Build the mirror from scratch, including archived years"""
+        watermark = self.db.get_change_watermark()
+        conn = self.db.connect()
+        cursor = conn.cursor()
+        try:
+            source = self.db._attendance_view(cursor)
+            cursor.execute(f"""
+                SELECT {', '.join(ATTENDANCE_FIELDS)} FROM {source}
+                ORDER BY date, id
+            """)
+            schema = _attendance_schema()
+            for year in self._partition_years():
+                os.remove(self._partition_path(year))
+            year, parts = None, []
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                for row in rows:
+                    row_year = int(row['date'][:4])
+                    if row_year != year:
+                        if parts:
+                            self._write(_rows_to_table(parts, ATTENDANCE_FIELDS, schema),
+                                        self._partition_path(year))
+                        year, parts = row_year, []
+                    parts.append(row)
+                if not rows:
+                    break
+            if parts:
+                self._write(_rows_to_table(parts, ATTENDANCE_FIELDS, schema),
+                            self._partition_path(year))
+            self._write_workers(conn)
+        finally:
+            conn.close()
+        self._write_state(watermark)
+        return watermark
+
+    def _read_attendance(self, cursor, attendance_ids):
+        # Through the archive view, like rebuild: a row changed and then
+        # archived since the last refresh still exists
+        source = self.db._attendance_view(cursor)
+        attendance_ids, rows = sorted(attendance_ids), []
+        for i in range(0, len(attendance_ids), 500):
+            chunk = attendance_ids[i:i + 500]
+            cursor.execute(f"""
+                SELECT {', '.join(ATTENDANCE_FIELDS)} FROM {source}
+                WHERE id IN ({', '.join('?' * len(chunk))})
+            """, chunk)
+            rows.extend(cursor.fetchall())
+        return rows
+
+    def refresh(self):
+        """Apply changes logged since the last refresh; returns the number applied"""
+        if not self.exists():
+            self.rebuild()
+            return None
+        since = self.watermark()
+        changes = self.db.get_changes_since(since)
+        if not changes:
+            return 0
+
+        changed_ids, deleted_workers, workers_changed = set(), set(), False
+        for change in changes:
+            if change['table_name'] == 'workers':
+                workers_changed = True
+                if change['operation'] == 'DELETE':
+                    deleted_workers.add(change['row_id'])
+            # Archived rows are still reported, just from another file
+            elif change['table_name'] == 'attendance' and change['operation'] != 'ARCHIVE':
+                changed_ids.add(change['row_id'])
+
+        conn = self.db.connect()
+        try:
+            current = self._read_attendance(conn.cursor(), changed_ids) if changed_ids else []
+            schema = _attendance_schema()
+            fresh = {}
+            for row in current:
+                fresh.setdefault(int(row['date'][:4]), []).append(row)
+
+            drop_ids = pa.array(sorted(changed_ids), pa.int64())
+            drop_workers = pa.array(sorted(deleted_workers), pa.int64())
+            for year in sorted(set(self._partition_years()) | set(fresh)):
+                path = self._partition_path(year)
+                if not os.path.exists(path):
+                    table = schema.empty_table()
+                else:
+                    # Probe the key columns first; untouched years are not rewritten
+                    keys = pq.read_table(path, columns=["id", "worker_id"])
+                    keep = pc.invert(pc.or_(pc.is_in(keys['id'], drop_ids),
+                                            pc.is_in(keys['worker_id'], drop_workers)))
+                    if year not in fresh and pc.all(keep).as_py():
+                        continue
+                    table = pq.read_table(path).filter(keep)
+                if year in fresh:
+                    table = pa.concat_tables([
+                        table, _rows_to_table(fresh[year], ATTENDANCE_FIELDS, schema)
+                    ]).sort_by([("date", "ascending"), ("id", "ascending")])
+                self._write(table, path)
+            if workers_changed:
+                self._write_workers(conn)
+        finally:
+            conn.close()
+        self._write_state(changes[-1]['seq'])
+        return len(changes)
+
+    def hours_summary(self, start_date=None, end_date=None, period="month", worker_id=None):
+        """Days worked and hours per worker and Jalali period"""
+        prefix = PERIOD_PREFIX[period]
+        years = self._partition_years()
+        if start_date:
+            years = [y for y in years if y >= int(start_date[:4])]
+        if end_date:
+            years = [y for y in years if y <= int(end_date[:4])]
+        if not years:
+            return []
+        if duckdb is not None:
+            return self._summary_duckdb(years, start_date, end_date, prefix, worker_id)
+        return self._summary_pandas(years, start_date, end_date, prefix, worker_id)
+
+    def _summary_duckdb(self, years, start_date, end_date, prefix, worker_id):
+        conditions, params = [], []
+        if start_date and end_date:
+            conditions.append("a.date BETWEEN ? AND ?")
+            params += [start_date, end_date]
+        if worker_id is not None:
+            conditions.append("a.worker_id = ?")
+            params.append(worker_id)
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        files = [self._partition_path(year) for year in years]
+        conn = duckdb.connect()
+        try:
+            cursor = conn.execute(f"""
+                SELECT a.worker_id, w.full_name, w.personal_number,
+                       substr(a.jalali_date, 1, {prefix}) AS period,
+                       COUNT(*) AS days_worked,
+                       COALESCE(SUM(a.total_hours), 0) AS total_hours
+                FROM read_parquet(?) a
+                JOIN read_parquet(?) w ON a.worker_id = w.id
+                {where}
+                GROUP BY a.worker_id, w.full_name, w.personal_number, period
+                ORDER BY period, w.full_name
+            """, [files, self.workers_path] + params)
+            names = [d[0] for d in cursor.description]
+            return [dict(zip(names, row)) for row in cursor.fetchall()]
+        finally:
+            conn.close()
+
+    def _summary_pandas(self, years, start_date, end_date, prefix, worker_id):
+        import pandas as pd
+
+        frame = pd.concat(
+            [pq.read_table(self._partition_path(year),
+                           columns=["worker_id", "date", "jalali_date", "total_hours"]).to_pandas()
+             for year in years],
+            ignore_index=True,
+        )
+        if start_date and end_date:
+            frame = frame[(frame["date"] >= start_date) & (frame["date"] <= end_date)]
+        if worker_id is not None:
+            frame = frame[frame["worker_id"] == worker_id]
+        workers = pq.read_table(self.workers_path).to_pandas()
+        frame = frame.assign(period=frame["jalali_date"].str[:prefix])
+        summary = (frame.groupby(["worker_id", "period"])
+                   .agg(days_worked=("date", "size"), total_hours=("total_hours", "sum"))
+                   .reset_index()
+                   .merge(workers, left_on="worker_id", right_on="id")
+                   .sort_values(["period", "full_name"]))
+        return [
+            {"worker_id": int(r.worker_id), "full_name": r.full_name,
+             "personal_number": r.personal_number, "period": r.period,
+             "days_worked": int(r.days_worked), "total_hours": float(r.total_hours)}
+            for r in summary.itertuples(index=False)
+        ]
@@ -0,0 +1,232 @@
+import glob
+import gzip
+import os
+import shutil
+import sqlite3
+import tempfile
+import time
+import uuid
+from datetime import datetime
+
+
+class BackupRestarted(Exception):
+    """The source changed too often for the stepped backup to finish"""
+
+
+class BackupResult:
+    """Outcome of one backup run"""
+
+    def __init__(self, path, duration, size, restarts=0, verified=None, detail="",
+                 archives=(), missing_archives=()):
+        self.path = path
+        self.duration = duration
+        self.size = size
+        self.restarts = restarts
+        self.verified = verified
+        self.detail = detail
+        # Archive files copied by this run, and archives listed but not found
+        self.archives = list(archives)
+        self.missing_archives = list(missing_archives)
+
+    def __str__(self):
+        text = f"{self.path}: {self.size / 1024 / 1024:.1f} MiB in {self.duration:.1f} s"
+        if self.restarts:
+            text += f", {self.restarts} restarts"
+        if self.archives:
+            text += f", {len(self.archives)} archives copied"
+        if self.missing_archives:
+            text += f", ARCHIVES MISSING: {', '.join(self.missing_archives)}"
+        if self.verified is not None:
+            text += ", verified" if self.verified else f", VERIFY FAILED ({self.detail})"
+        return text
+
+
+class BackupManager:
+    """Online backups through the SQLite backup API.
+
+    The database is copied a few pages at a time with a sleep between
+    steps, so kiosks keep punching while a backup runs. In WAL mode the
+    source snapshot is pinned by a read transaction; in rollback-journal
+    mode SQLite restarts the backup whenever another connection writes,
+    and after ``max_restarts`` the rest is copied in a single step.
+
+    The yearly archive files listed in the database's ``archives`` table
+    are copied into ``<backup_dir>/archives`` alongside; they rarely
+    change, so each is copied again only when it is newer than its copy.
+    """
+
+    def __init__(self, db_path, backup_dir="backups", keep=7, pages=256, sleep=0.05,
+                 max_restarts=5):
+        self.db_path = db_path
+        self.backup_dir = backup_dir
+        self.keep = keep
+        self.pages = pages
+        self.sleep = sleep
+        self.max_restarts = max_restarts
+
+    def _copy(self, source_path, target_path, pages, progress=None):
+        restarts = 0
+        last_remaining = None
+
+        def on_progress(status, remaining, total):
+            nonlocal restarts, last_remaining
+            if last_remaining is not None and remaining > last_remaining:
+                restarts += 1
+                if restarts > self.max_restarts:
+                    raise BackupRestarted()
+            last_remaining = remaining
+            if progress:
+                progress(total - remaining, total)
+            # Connection.backup only sleeps on SQLITE_BUSY; throttle every step
+            if remaining and self.sleep:
+                time.sleep(self.sleep)
+
+        source = sqlite3.connect(source_path, isolation_level=None)
+        target = sqlite3.connect(target_path)
+        try:
+            # In WAL mode a read transaction pins one snapshot for every
+            # step, so concurrent commits no longer restart the backup
+            source.execute("BEGIN")
+            source.execute("SELECT COUNT(*) FROM sqlite_master").fetchone()
+            try:
+                source.backup(target, pages=pages, progress=on_progress, sleep=self.sleep)
+            except BackupRestarted:
+                source.backup(target, pages=-1)
+        finally:
+            target.close()
+            source.close()
+        return restarts
+
+    def create_backup(self, compress=False, verify=True, progress=None):
+        """Back up the database and its archives; returns a BackupResult"""
+        os.makedirs(self.backup_dir, exist_ok=True)
+        name = f"attendance_{datetime.now().strftime('%Y%m%d_%H%M%S')}.db"
+        path = os.path.join(self.backup_dir, name)
+        partial = path + ".partial"
+
+        started = time.monotonic()
+        restarts = self._copy(self.db_path, partial, self.pages, progress)
+        os.replace(partial, path)
+        if compress:
+            path = self._compress(path)
+        archives, missing = self.backup_archives(compress)
+
+        result = BackupResult(path, time.monotonic() - started, os.path.getsize(path), restarts,
+                              archives=archives, missing_archives=missing)
+        if verify:
+            result.verified, result.detail = self.verify_backup(path)
+            for archive in archives:
+                if result.verified:
+                    result.verified, detail = self.verify_backup(archive, tables=("attendance",))
+                    if not result.verified:
+                        result.detail = f"{archive}: {detail}"
+        self.rotate()
+        return result
+
+    def _compress(self, path):
+        with open(path, "rb") as source, gzip.open(path + ".gz", "wb") as target:
+            shutil.copyfileobj(source, target)
+        os.remove(path)
+        return path + ".gz"
+
+    def archive_paths(self, db_path=None):
+        """Archive files listed in the ``archives`` table of ``db_path`` (default: the database)"""
+        conn = sqlite3.connect(db_path or self.db_path)
+        try:
+            return [row[0] for row in conn.execute("SELECT path FROM archives ORDER BY year")]
+        except sqlite3.OperationalError:
+            # A database from before yearly archiving
+            return []
+        finally:
+            conn.close()
+
+    def _archive_copy(self, archive_path, compress):
+        name = os.path.basename(archive_path) + (".gz" if compress else "")
+        return os.path.join(self.backup_dir, "archives", name)
+
+    def backup_archives(self, compress=False):
+        """Copy archives that are new or changed since their last copy; returns (copied, missing)"""
+        copied, missing = [], []
+        for source in self.archive_paths():
+            if not os.path.exists(source):
+                missing.append(source)
+                continue
+            target = self._archive_copy(source, compress)
+            if os.path.exists(target) and os.path.getmtime(target) >= os.path.getmtime(source):
+                continue
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            plain = self._archive_copy(source, False)
+            self._copy(source, plain + ".partial", self.pages)
+            os.replace(plain + ".partial", plain)
+            copied.append(self._compress(plain) if compress else plain)
+        return copied, missing
+
+    def verify_backup(self, path, tables=("workers", "attendance")):
+        """Restore a backup into a scratch file and check it; returns (ok, detail)"""
+        with tempfile.TemporaryDirectory() as scratch:
+            restored = os.path.join(scratch, "restore.db")
+            self.restore_backup(path, restored)
+            conn = sqlite3.connect(restored)
+            try:
+                result = conn.execute("PRAGMA integrity_check").fetchone()[0]
+                if result != "ok":
+                    return False, result
+                counts = {table: conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+                          for table in tables}
+            except sqlite3.DatabaseError as e:
+                return False, str(e)
+            finally:
+                conn.close()
+        return True, ", ".join(f"{count} {table}" for table, count in counts.items()) + " rows"
+
+    def restore_backup(self, path, target_path):
+        """Copy a (possibly gzip-compressed) backup into ``target_path`` and renew its data generation"""
+        if path.endswith(".gz"):
+            with tempfile.TemporaryDirectory() as scratch:
+                plain = os.path.join(scratch, "backup.db")
+                with gzip.open(path, "rb") as source, open(plain, "wb") as target:
+                    shutil.copyfileobj(source, target)
+                self._copy(plain, target_path, -1)
+        else:
+            self._copy(path, target_path, -1)
+        self._renew_generation(target_path)
+
+    def _renew_generation(self, db_path):
+        # The restored data reuses change-log numbers the replaced database
+        # had passed; a new generation keeps ReportCache keys from matching
+        conn = sqlite3.connect(db_path)
+        try:
+            if conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'settings'").fetchone():
+                conn.execute("""
+                    INSERT INTO settings (key, value) VALUES ('data_generation', ?)
+                    ON CONFLICT(key) DO UPDATE SET value = excluded.value
+                """, (uuid.uuid4().hex,))
+                conn.commit()
+        finally:
+            conn.close()
+
+    def restore_archives(self, db_path):
+        """Restore the archives ``db_path`` lists that are missing on disk; returns their paths"""
+        restored = []
+        for path in self.archive_paths(db_path):
+            if os.path.exists(path):
+                continue
+            for copy in (self._archive_copy(path, False), self._archive_copy(path, True)):
+                if os.path.exists(copy):
+                    self.restore_backup(copy, path)
+                    restored.append(path)
+                    break
+        return restored
+
+    def list_backups(self):
+        """Backups in the backup directory, newest first"""
+        # attendance_YYYYMMDD_HHMMSS.db[.gz]; the yearly archives (attendance_1402.db)
+        # may live in the same directory and must never be rotated away
+        pattern = os.path.join(self.backup_dir, "attendance_" + "[0-9]" * 8 + "_" + "[0-9]" * 6 + ".db")
+        paths = glob.glob(pattern) + glob.glob(pattern + ".gz")
+        return sorted(paths, reverse=True)
+
+    def rotate(self):
+        """Delete all but the newest ``keep`` backups"""
+        for path in self.list_backups()[self.keep:]:
+            os.remove(path)
@@ -0,0 +1,138 @@
+import os
+import re
+import shutil
+import tempfile
+import time
+import zipfile
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+from datetime import timedelta
+
+from persiantools.jdatetime import JalaliDate
+
+from utils.columnar_utils import ATTENDANCE_COLUMNS, format_attendance_rows, persian_digits
+
+REPORT_FORMATS = {"pdf": ".pdf", "excel": ".xlsx"}
+
+# ExportManager of the current report process, created once by _init_process
+_manager = None
+
+
+def _init_process():
+    """Pool initializer: register the Persian fonts once per process"""
+    global _manager
+    from utils.export_utils import ExportManager
+    _manager = ExportManager()
+
+
+def _render(task):
+    """Write one worker's report; runs inside a pool process"""
+    path, fmt, title, rows = task
+    if fmt == "pdf":
+        ok = _manager.export_to_pdf(rows, ATTENDANCE_COLUMNS, path, title)
+    else:
+        ok = _manager.export_to_excel(rows, ATTENDANCE_COLUMNS, path)
+    return path, ok
+
+
+class BulkReportResult:
+    """Outcome of one bulk report run"""
+
+    def __init__(self, path, generated, failed, cancelled, duration):
+        self.path = path
+        self.generated = generated
+        self.failed = failed
+        self.cancelled = cancelled
+        self.duration = duration
+
+    def __str__(self):
+        if self.cancelled:
+            return f"cancelled after {self.generated} reports ({self.duration:.1f} s)"
+        text = f"{self.path}: {self.generated} reports in {self.duration:.1f} s"
+        if self.failed:
+            text += f", {len(self.failed)} failed"
+        return text
+
+
+class BulkReportJob:
+    """Monthly per-worker reports rendered in parallel and bundled in a zip.
+
+    The whole month is fetched and formatted in the parent with a single
+    query; each pool process registers the PDF fonts once and then only
+    renders. ``cancel`` is any object with ``is_set()`` (e.g.
+    ``threading.Event``); pending reports are dropped as soon as it is set.
+    """
+
+    def __init__(self, db, year, month, fmt="pdf", max_workers=None):
+        if fmt not in REPORT_FORMATS:
+            raise ValueError(f"Unknown report format: {fmt}")
+        self.db = db
+        self.year = year
+        self.month = month
+        self.fmt = fmt
+        self.max_workers = max_workers or os.cpu_count()
+
+    def _date_range(self):
+        start = JalaliDate(self.year, self.month, 1)
+        if self.month == 12:
+            next_start = JalaliDate(self.year + 1, 1, 1)
+        else:
+            next_start = JalaliDate(self.year, self.month + 1, 1)
+        return str(start.to_gregorian()), str(next_start.to_gregorian() - timedelta(days=1))
+
+    def build_tasks(self, out_dir):
+        """Fetch the month once and return one render task per worker"""
+        start_date, end_date = self._date_range()
+        by_worker = {}
+        for rows in self.db.iter_attendance_batches(start_date, end_date):
+            for row in rows:
+                by_worker.setdefault(row['worker_id'], []).append(row)
+
+        month_label = persian_digits(f"{self.year}/{self.month:02d}")
+        tasks = []
+        for records in by_worker.values():
+            worker = records[0]
+            total_hours = sum(r['total_hours'] or 0 for r in records)
+            rows = format_attendance_rows(records)
+            rows.append(["مجموع", "", "", "", "", persian_digits(f"{total_hours:.2f}") + " ساعت",
+                         persian_digits(str(len(records))) + " روز"])
+            name = re.sub(r'[\\/:*?"<>|]', "_", worker['personal_number'])
+            path = os.path.join(out_dir, f"{name}_{self.year}_{self.month:02d}{REPORT_FORMATS[self.fmt]}")
+            title = f"گزارش ماهانه {worker['full_name']} - {month_label}"
+            tasks.append((path, self.fmt, title, rows))
+        return tasks
+
+    def run(self, out_path, progress=None, cancel=None):
+        """Render all reports into the zip file ``out_path``; returns a BulkReportResult"""
+        started = time.monotonic()
+        scratch = tempfile.mkdtemp(prefix="reports_")
+        generated, failed, cancelled = [], [], False
+        try:
+            tasks = self.build_tasks(scratch)
+            if progress:
+                progress(0, len(tasks))
+            with ProcessPoolExecutor(self.max_workers, initializer=_init_process) as pool:
+                pending = {pool.submit(_render, task) for task in tasks}
+                while pending:
+                    done, pending = wait(pending, timeout=0.2, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        path, ok = future.result()
+                        (generated if ok else failed).append(path)
+                    if progress and done:
+                        progress(len(generated) + len(failed), len(tasks))
+                    if cancel is not None and cancel.is_set():
+                        cancelled = True
+                        for future in pending:
+                            future.cancel()
+                        break
+
+            if not cancelled:
+                partial = out_path + ".partial"
+                with zipfile.ZipFile(partial, "w", zipfile.ZIP_DEFLATED) as bundle:
+                    for path in sorted(generated):
+                        bundle.write(path, os.path.basename(path))
+                os.replace(partial, out_path)
+        finally:
+            shutil.rmtree(scratch, ignore_errors=True)
+        return BulkReportResult(None if cancelled else out_path, len(generated),
+                                [os.path.basename(p) for p in failed], cancelled,
+                                time.monotonic() - started)
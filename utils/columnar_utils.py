@@ -0,0 +1,123 @@
+import numpy as np
+
+# Digit table shared by every formatter; one str.translate call per column
+PERSIAN_DIGITS = str.maketrans("0123456789", "۰۱۲۳۴۵۶۷۸۹")
+SECONDS_PER_DAY = 86400
+
+# Pre-rendered Persian "00".."99" so time/date parts are a table lookup
+_TWO_DIGITS = np.array([f"{i:02d}".translate(PERSIAN_DIGITS) for i in range(100)])
+
+ATTENDANCE_COLUMNS = ["تاریخ", "کارمند", "شماره پرسنلی", "ساعت ورود",
+                      "ساعت خروج", "مدت حضور", "وضعیت"]
+
+STATUS_WORKING = "در حال کار"
+STATUS_COMPLETED = "تکمیل شده"
+STATUS_REVIEW = "بسته‌شده خودکار"
+
+
+def persian_digits(text):
+    """Convert English digits of a single value to Persian digits"""
+    return str(text).translate(PERSIAN_DIGITS)
+
+
+def translate_column(values):
+    """Convert the digits of a whole column with a single str.translate call"""
+    values = [str(v) for v in values]
+    if not values:
+        return []
+    return "\n".join(values).translate(PERSIAN_DIGITS).split("\n")
+
+
+def to_epoch_seconds(values):
+    """Convert ISO timestamp strings to float epoch seconds (NaN when missing)"""
+    stamps = np.array([v if v else "NaT" for v in values], dtype="datetime64[s]")
+    epoch = stamps.astype(np.int64).astype(float)
+    epoch[np.isnat(stamps)] = np.nan
+    return epoch
+
+
+def _join(*parts):
+    result = parts[0]
+    for part in parts[1:]:
+        result = np.char.add(result, part)
+    return result
+
+
+def format_times(epoch, missing=""):
+    """Format epoch seconds as Persian HH:MM:SS strings"""
+    epoch = np.asarray(epoch, dtype=float)
+    valid = ~np.isnan(epoch)
+    seconds = np.where(valid, epoch, 0).astype(np.int64) % SECONDS_PER_DAY
+    hours, rest = np.divmod(seconds, 3600)
+    minutes, seconds = np.divmod(rest, 60)
+    text = _join(_TWO_DIGITS[hours], ":", _TWO_DIGITS[minutes], ":", _TWO_DIGITS[seconds])
+    return np.where(valid, text, missing).tolist()
+
+
+def format_hours(hours, suffix="", missing="-"):
+    """Format durations in hours as Persian strings with two decimals"""
+    hours = np.nan_to_num(np.asarray(hours, dtype=float))
+    valid = hours > 0
+    cents = np.rint(np.where(valid, hours, 0) * 100).astype(np.int64)
+    whole = np.array(translate_column((cents // 100).tolist()), dtype=str)
+    text = _join(whole, ".", _TWO_DIGITS[cents % 100], suffix)
+    return np.where(valid, text, missing).tolist()
+
+
+def jalali_date_parts(epoch):
+    """Vectorized Gregorian -> Jalali conversion of epoch seconds"""
+    days = np.floor(np.asarray(epoch, dtype=float) / SECONDS_PER_DAY).astype(np.int64)
+    dates = days.astype("datetime64[D]")
+    gy = dates.astype("datetime64[Y]").astype(np.int64) + 1970
+    gm = dates.astype("datetime64[M]").astype(np.int64) % 12 + 1
+    gd = (dates - dates.astype("datetime64[M]")).astype(np.int64) + 1
+
+    month_offsets = np.array([0, 31, 59, 90, 120, 151, 181, 212, 243, 273, 304, 334])
+    gy2 = np.where(gm > 2, gy + 1, gy)
+    day_number = (355666 + 365 * gy + (gy2 + 3) // 4 - (gy2 + 99) // 100
+                  + (gy2 + 399) // 400 + gd + month_offsets[gm - 1])
+    jy = -1595 + 33 * (day_number // 12053)
+    day_number %= 12053
+    jy += 4 * (day_number // 1461)
+    day_number %= 1461
+    extra = day_number > 365
+    jy += np.where(extra, (day_number - 1) // 365, 0)
+    day_number = np.where(extra, (day_number - 1) % 365, day_number)
+    first_half = day_number < 186
+    jm = np.where(first_half, 1 + day_number // 31, 7 + (day_number - 186) // 30)
+    jd = np.where(first_half, 1 + day_number % 31, 1 + (day_number - 186) % 30)
+    return jy, jm, jd
+
+
+def format_jalali_dates(epoch, missing=""):
+    """Format epoch seconds as Persian Jalali YYYY/MM/DD strings"""
+    epoch = np.asarray(epoch, dtype=float)
+    valid = ~np.isnan(epoch)
+    jy, jm, jd = jalali_date_parts(np.where(valid, epoch, 0))
+    text = _join(_TWO_DIGITS[jy // 100], _TWO_DIGITS[jy % 100], "/",
+                 _TWO_DIGITS[jm], "/", _TWO_DIGITS[jd])
+    return np.where(valid, text, missing).tolist()
+
+
+def format_attendance_rows(records):
+    """Build the display/export rows of the attendance table in bulk"""
+    if not records:
+        return []
+    entry = to_epoch_seconds([r['entry_time'] for r in records])
+    exit_ = to_epoch_seconds([r['exit_time'] for r in records])
+    hours = np.array([r['total_hours'] or 0 for r in records], dtype=float)
+
+    dates = translate_column([r['jalali_date'] for r in records])
+    entry_times = format_times(entry)
+    exit_times = format_times(exit_)
+    durations = format_hours(hours, suffix=" ساعت")
+    review = np.array([bool(r['needs_review']) if 'needs_review' in r.keys() else False
+                       for r in records])
+    statuses = np.where(np.isnan(exit_), STATUS_WORKING,
+                        np.where(review, STATUS_REVIEW, STATUS_COMPLETED)).tolist()
+
+    return [
+        [dates[i], r['full_name'], r['personal_number'], entry_times[i],
+         exit_times[i], durations[i], statuses[i]]
+        for i, r in enumerate(records)
+    ]
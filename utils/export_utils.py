@@ -8,15 +8,74 @@ from reportlab.pdfbase.ttfonts import TTFont
 from reportlab.pdfbase.pdfmetrics import stringWidth
 from reportlab.lib.units import inch
 import csv
+import logging
 import os
-from PyQt6.QtPrintSupport import QPrinter, QPrintDialog
-from PyQt6.QtGui import QTextDocument
-from utils.persian_utils import to_persian_number
+from datetime import datetime
+from utils.columnar_utils import persian_digits
 from persiantools.jdatetime import JalaliDateTime
 from bidi.algorithm import get_display
 import arabic_reshaper
 import platform
 
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # Parquet/Feather export is optional
+    pa = None
+
+logger = logging.getLogger(__name__)
+
+# Column names of columnar exports (raw values, not display strings)
+COLUMNAR_FIELDS = ("id", "worker_id", "personal_number", "full_name", "date",
+                   "jalali_date", "entry_time", "exit_time", "total_hours")
+
+
+def _columnar_schema():
+    return pa.schema([
+        ("id", pa.int64()),
+        ("worker_id", pa.int64()),
+        ("personal_number", pa.string()),
+        ("full_name", pa.string()),
+        ("date", pa.date32()),
+        ("jalali_date", pa.string()),
+        ("entry_time", pa.timestamp("us")),
+        ("exit_time", pa.timestamp("us")),
+        ("total_hours", pa.float64()),
+    ])
+
+
+def _timestamp_column(values):
+    column = pa.array(values, pa.string())
+    try:
+        return column.cast(pa.timestamp("us"))
+    except pa.ArrowInvalid:
+        # Odd legacy values: parse one by one, unparseable ones become null
+        parsed = []
+        for value in column.to_pylist():
+            try:
+                parsed.append(datetime.fromisoformat(value) if value else None)
+            except ValueError:
+                parsed.append(None)
+        return pa.array(parsed, pa.timestamp("us"))
+
+
+def _record_batch(rows, schema):
+    # Rows come from Database.iter_attendance_batches and are read by column name
+    columns = {field: [row[field] for row in rows] for field in COLUMNAR_FIELDS}
+    arrays = [
+        pa.array(columns["id"], pa.int64()),
+        pa.array(columns["worker_id"], pa.int64()),
+        pa.array(columns["personal_number"], pa.string()),
+        pa.array(columns["full_name"], pa.string()),
+        pa.array(columns["date"], pa.string()).cast(pa.date32()),
+        pa.array(columns["jalali_date"], pa.string()),
+        _timestamp_column(columns["entry_time"]),
+        _timestamp_column(columns["exit_time"]),
+        pa.array(columns["total_hours"], pa.float64()),
+    ]
+    return pa.RecordBatch.from_arrays(arrays, schema=schema)
+
+
 class ExportManager:
     def __init__(self):
         self.persian_font_registered = False
@@ -90,8 +149,30 @@ class ExportManager:
                     worksheet.column_dimensions[column_letter].width = adjusted_width
             
             return True
-        except Exception as e:
-            print(f"Export to Excel error: {e}")
+        except Exception:
+            logger.exception("Export to Excel failed: %s", file_path)
+            return False
+    
+    def export_heatmap_to_excel(self, row_labels, column_labels, matrix, file_path, corner=""):
+        """Export a numeric matrix to Excel, shaded with a colour scale"""
+        try:
+            from openpyxl.formatting.rule import ColorScaleRule
+            from openpyxl.utils import get_column_letter
+            
+            df = pd.DataFrame(matrix, index=row_labels, columns=column_labels)
+            df.index.name = corner
+            with pd.ExcelWriter(file_path, engine='openpyxl') as writer:
+                df.to_excel(writer, sheet_name='گزارش')
+                worksheet = writer.sheets['گزارش']
+                worksheet.sheet_view.rightToLeft = True
+                worksheet.column_dimensions['A'].width = 14
+                last = f"{get_column_letter(len(column_labels) + 1)}{len(row_labels) + 1}"
+                worksheet.conditional_formatting.add(f"B2:{last}", ColorScaleRule(
+                    start_type='min', start_color='FFFFFF',
+                    end_type='max', end_color='1976D2'))
+            return True
+        except Exception:
+            logger.exception("Export to Excel failed: %s", file_path)
             return False
     
     def _prepare_text_for_pdf(self, text):
@@ -131,7 +212,7 @@ class ExportManager:
             
             # Add timestamp
             now = JalaliDateTime.now()
-            timestamp = f"تاریخ گزارش: {to_persian_number(now.strftime('%Y/%m/%d - %H:%M'))}"
+            timestamp = f"تاریخ گزارش: {persian_digits(now.strftime('%Y/%m/%d - %H:%M'))}"
             timestamp_style = ParagraphStyle(
                 'Timestamp',
                 parent=styles['Normal'],
@@ -182,8 +263,8 @@ class ExportManager:
             # Build PDF
             doc.build(elements)
             return True
-        except Exception as e:
-            print(f"Export to PDF error: {e}")
+        except Exception:
+            logger.exception("Export to PDF failed: %s", file_path)
             return False
     
     def export_to_csv(self, data, columns, file_path):
@@ -194,10 +275,44 @@ class ExportManager:
                 writer.writerow(columns)
                 writer.writerows(data)
             return True
-        except Exception as e:
-            print(f"Export to CSV error: {e}")
+        except Exception:
+            logger.exception("Export to CSV failed: %s", file_path)
             return False
     
+    def _export_columnar(self, db, file_path, start_date, end_date, batch_size, open_writer):
+        if pa is None:
+            logger.error("Columnar export failed: pyarrow is not installed")
+            return False
+        schema = _columnar_schema()
+        partial = file_path + ".partial"
+        try:
+            with open_writer(partial, schema) as writer:
+                for rows in db.iter_attendance_batches(start_date, end_date, batch_size):
+                    writer.write_batch(_record_batch(rows, schema))
+            os.replace(partial, file_path)
+            return True
+        except Exception:
+            logger.exception("Columnar export failed: %s", file_path)
+            if os.path.exists(partial):
+                os.remove(partial)
+            return False
+    
+    def export_to_parquet(self, db, file_path, start_date=None, end_date=None, batch_size=50000):
+        """Stream attendance from the database into a Parquet file with typed columns"""
+        return self._export_columnar(
+            db, file_path, start_date, end_date, batch_size,
+            lambda path, schema: pq.ParquetWriter(path, schema, compression="zstd")
+        )
+    
+    def export_to_feather(self, db, file_path, start_date=None, end_date=None, batch_size=50000):
+        """Stream attendance into an Arrow IPC (Feather v2) file with typed columns"""
+        return self._export_columnar(
+            db, file_path, start_date, end_date, batch_size,
+            lambda path, schema: pa.ipc.new_file(
+                path, schema, options=pa.ipc.IpcWriteOptions(compression="zstd")
+            )
+        )
+    
     def print_data(self, data, columns, title, parent_widget):
         """Print data using system print dialog"""
         try:
@@ -246,7 +361,7 @@ class ExportManager:
             </head>
             <body>
                 <h1>{title}</h1>
-                <p class="timestamp">تاریخ: {to_persian_number(JalaliDateTime.now().strftime('%Y/%m/%d - %H:%M'))}</p>
+                <p class="timestamp">تاریخ: {persian_digits(JalaliDateTime.now().strftime('%Y/%m/%d - %H:%M'))}</p>
                 <table>
                     <thead>
                         <tr>
@@ -276,6 +391,10 @@ class ExportManager:
             </html>
             """
             
+            # Imported here so report worker processes never load Qt
+            from PyQt6.QtPrintSupport import QPrinter, QPrintDialog
+            from PyQt6.QtGui import QTextDocument
+            
             # Create printer and document
             printer = QPrinter(QPrinter.PrinterMode.HighResolution)
             dialog = QPrintDialog(printer, parent_widget)
@@ -287,6 +406,6 @@ class ExportManager:
                 return True
             
             return False
-        except Exception as e:
-            print(f"Print error: {e}")
+        except Exception:
+            logger.exception("Printing failed")
             return False
\ No newline at end of file
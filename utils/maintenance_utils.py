@@ -0,0 +1,155 @@
+import sqlite3
+import time
+
+# Minimum seconds between two runs of a job by run_due()
+JOB_INTERVALS = {
+    'optimize': 0,
+    'analyze': 7 * 24 * 3600,
+    'incremental_vacuum': 24 * 3600,
+    'integrity_check': 7 * 24 * 3600,
+}
+
+# Pages released per PRAGMA incremental_vacuum step
+VACUUM_STEP_PAGES = 256
+
+
+class MaintenanceResult:
+    """Outcome of one maintenance job"""
+
+    def __init__(self, job, status, duration, reclaimed_bytes=0, detail=""):
+        self.job = job
+        self.status = status
+        self.duration = duration
+        self.reclaimed_bytes = reclaimed_bytes
+        self.detail = detail
+
+    def __str__(self):
+        text = f"{self.job}: {self.status} in {self.duration * 1000:.0f} ms"
+        if self.reclaimed_bytes:
+            text += f", reclaimed {self.reclaimed_bytes / 1024:.0f} KiB"
+        if self.detail:
+            text += f" ({self.detail})"
+        return text
+
+
+class MaintenanceScheduler:
+    """Runs time-boxed SQLite maintenance jobs and logs them.
+
+    Every job gets a time budget enforced with a progress handler, so a
+    long ANALYZE or integrity check is interrupted instead of stalling a
+    kiosk; the job is simply retried on a later run.
+    """
+
+    def __init__(self, db, time_budget=1.0):
+        self.db = db
+        self.time_budget = time_budget
+
+    def _size(self, cursor):
+        cursor.execute("PRAGMA page_count")
+        page_count = cursor.fetchone()[0]
+        cursor.execute("PRAGMA page_size")
+        return page_count * cursor.fetchone()[0]
+
+    def run_job(self, job, time_budget=None):
+        """Run one job within its time budget and record the result"""
+        handler = getattr(self, f"_job_{job}", None)
+        if handler is None:
+            raise ValueError(f"Unknown maintenance job: {job}")
+
+        budget = self.time_budget if time_budget is None else time_budget
+        conn = self.db.connect()
+        error = None
+        try:
+            cursor = conn.cursor()
+            started = time.monotonic()
+            deadline = started + budget
+            conn.set_progress_handler(lambda: 1 if time.monotonic() > deadline else 0, 1000)
+            size_before = self._size(cursor)
+            try:
+                status, detail = handler(cursor, deadline)
+            except Exception as e:
+                if isinstance(e, sqlite3.OperationalError) and "interrupted" in str(e):
+                    status, detail = "interrupted", "time budget exceeded"
+                else:
+                    error, status, detail = e, "failed", str(e)
+            finally:
+                conn.set_progress_handler(None, 0)
+            duration = time.monotonic() - started
+            reclaimed = max(size_before - self._size(cursor), 0)
+
+            # A failed job is logged too (after dropping anything it left open), then re-raised
+            conn.rollback()
+            cursor.execute("""
+                INSERT INTO maintenance_log (job, duration, reclaimed_bytes, status, detail)
+                VALUES (?, ?, ?, ?, ?)
+            """, (job, duration, reclaimed, status, detail))
+            conn.commit()
+        finally:
+            conn.close()
+        if error is not None:
+            raise error
+        return MaintenanceResult(job, status, duration, reclaimed, detail)
+
+    def due_jobs(self):
+        """Jobs whose interval elapsed since their last completed run"""
+        conn = self.db.connect()
+        cursor = conn.cursor()
+        cursor.execute("""
+            SELECT job, strftime('%s', 'now') - strftime('%s', MAX(started_at)) AS age
+            FROM maintenance_log
+            WHERE status = 'ok'
+            GROUP BY job
+        """)
+        ages = {row['job']: row['age'] for row in cursor.fetchall()}
+        conn.close()
+        return [job for job, interval in JOB_INTERVALS.items()
+                if job not in ages or ages[job] >= interval]
+
+    def run_due(self):
+        return [self.run_job(job) for job in self.due_jobs()]
+
+    def _job_optimize(self, cursor, deadline):
+        cursor.execute("PRAGMA optimize")
+        return "ok", ""
+
+    def _job_analyze(self, cursor, deadline):
+        # Sample large indexes instead of reading them completely
+        cursor.execute("PRAGMA analysis_limit = 1000")
+        cursor.execute("ANALYZE")
+        return "ok", ""
+
+    def _job_incremental_vacuum(self, cursor, deadline):
+        cursor.execute("PRAGMA auto_vacuum")
+        if cursor.fetchone()[0] != 2:
+            return "skipped", "auto_vacuum is not INCREMENTAL"
+        while time.monotonic() < deadline:
+            cursor.execute("PRAGMA freelist_count")
+            free_pages = cursor.fetchone()[0]
+            if not free_pages:
+                return "ok", ""
+            cursor.execute(f"PRAGMA incremental_vacuum({VACUUM_STEP_PAGES})")
+            cursor.fetchall()
+        return "interrupted", "time budget exceeded"
+
+    def _job_integrity_check(self, cursor, deadline):
+        cursor.execute("PRAGMA integrity_check")
+        problems = [row[0] for row in cursor.fetchall() if row[0] != "ok"]
+        if problems:
+            return "failed", "; ".join(problems[:5])
+        return "ok", ""
+
+    def enable_incremental_vacuum(self):
+        """Switch an existing database to auto_vacuum=INCREMENTAL.
+
+        Requires a full VACUUM, so it is not time-boxed and should only be
+        run from the command line while kiosks are idle.
+        """
+        conn = self.db.connect()
+        started = time.monotonic()
+        size_before = self._size(conn.cursor())
+        conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+        conn.execute("VACUUM")
+        reclaimed = max(size_before - self._size(conn.cursor()), 0)
+        conn.close()
+        return MaintenanceResult("enable_incremental_vacuum", "ok",
+                                 time.monotonic() - started, reclaimed)
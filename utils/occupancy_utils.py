@@ -0,0 +1,139 @@
+from collections import Counter
+from datetime import datetime
+
+import numpy as np
+
+from utils.columnar_utils import SECONDS_PER_DAY, to_epoch_seconds
+
+# Column labels of the hourly heatmap
+HOUR_LABELS = [f"{hour:02d}" for hour in range(24)]
+
+
+class OccupancyTracker:
+    """In-memory view of the currently open sessions.
+
+    The open sessions are loaded once through the open-sessions index;
+    after that only punches reported by the change feed are applied, so a
+    refresh never reads historical rows.
+    """
+
+    def __init__(self, db):
+        self.db = db
+        self.sessions = {}
+        self.worker_counts = Counter()
+        self.data_version = None
+        self.watermark = 0
+
+    def load(self):
+        self.data_version = self.db.get_data_version()
+        self.watermark = self.db.get_change_watermark()
+        self.sessions = {}
+        self.worker_counts = Counter()
+        for record in self.db.get_open_sessions():
+            self._add(record)
+
+    def _add(self, record):
+        if record['id'] not in self.sessions:
+            self.worker_counts[record['worker_id']] += 1
+        self.sessions[record['id']] = record
+
+    def _remove(self, attendance_id):
+        record = self.sessions.pop(attendance_id, None)
+        if record is not None:
+            self.worker_counts[record['worker_id']] -= 1
+            if not self.worker_counts[record['worker_id']]:
+                del self.worker_counts[record['worker_id']]
+
+    def refresh(self):
+        """Apply punches made since the last refresh; return True if anything changed"""
+        data_version = self.db.get_data_version()
+        if data_version == self.data_version:
+            return False
+        self.data_version = data_version
+
+        changes = self.db.get_changes_since(self.watermark)
+        if not changes:
+            return False
+        self.watermark = changes[-1]['seq']
+
+        changed_ids = {c['row_id'] for c in changes if c['table_name'] == 'attendance'}
+        # Renamed workers: re-read their open sessions for the new name
+        worker_ids = {c['row_id'] for c in changes if c['table_name'] == 'workers'}
+        changed_ids.update(r['id'] for r in self.sessions.values() if r['worker_id'] in worker_ids)
+        if not changed_ids:
+            return False
+
+        current = {r['id']: r for r in self.db.get_attendance_by_ids(changed_ids)}
+        for attendance_id in changed_ids:
+            record = current.get(attendance_id)
+            if record is not None and record['exit_time'] is None:
+                self._add(record)
+            else:
+                self._remove(attendance_id)
+        return True
+
+    @property
+    def headcount(self):
+        """Number of distinct workers currently clocked in"""
+        return len(self.worker_counts)
+
+    def snapshot(self):
+        """Open sessions ordered by entry time"""
+        return sorted(self.sessions.values(), key=lambda r: r['entry_time'] or '')
+
+
+def hourly_occupancy(sessions, start_date, end_date, bucket_minutes=60, now=None):
+    """Peak concurrent headcount per day and time bucket.
+
+    ``sessions`` are (entry_time, exit_time) pairs; open sessions count
+    until ``now`` (epoch seconds, default: the current time). Sessions
+    become +1/-1 events that are sorted once, and a cumulative sum gives
+    the headcount after every event (a sweep line). Each bucket's peak is
+    the headcount at its start combined with the maxima of the events
+    falling inside it, so the cost is O(events log events) whatever the
+    number of buckets. Returns (days, matrix) with days as 'YYYY-MM-DD'
+    strings and one row of ``24 * 60 // bucket_minutes`` counts per day.
+    """
+    first = np.datetime64(start_date, "D")
+    days = np.arange(first, np.datetime64(end_date, "D") + 1)
+    width = bucket_minutes * 60
+    per_day = SECONDS_PER_DAY // width
+    t0 = float(first.astype("datetime64[s]").astype(np.int64))
+    t1 = t0 + len(days) * SECONDS_PER_DAY
+    buckets = len(days) * per_day
+    empty = np.zeros((len(days), per_day), dtype=np.int64)
+    if not sessions or not buckets:
+        return days.astype(str).tolist(), empty
+
+    if now is None:
+        # Stored timestamps are local time
+        now = float(np.datetime64(datetime.now(), "s").astype(np.int64))
+    entry = to_epoch_seconds([s[0] for s in sessions])
+    exit_ = to_epoch_seconds([s[1] for s in sessions])
+    exit_ = np.where(np.isnan(exit_), max(now, t0), exit_)
+    keep = ~np.isnan(entry) & (exit_ > entry) & (exit_ > t0) & (entry < t1)
+    if not keep.any():
+        return days.astype(str).tolist(), empty
+    entry, exit_ = np.clip(entry[keep], t0, t1), np.clip(exit_[keep], t0, t1)
+
+    # Exits sort before entries at the same instant (back-to-back sessions)
+    times = np.concatenate([exit_, entry])
+    deltas = np.concatenate([np.full(len(exit_), -1), np.full(len(entry), 1)])
+    order = np.lexsort((deltas, times))
+    times, level = times[order], np.cumsum(deltas[order])
+
+    edges = t0 + np.arange(buckets) * float(width)
+    before = np.searchsorted(times, edges, side="right")
+    peak = np.where(before > 0, level[np.maximum(before - 1, 0)], 0)
+    inside = times < t1
+    np.maximum.at(peak, ((times[inside] - t0) // width).astype(np.int64), level[inside])
+    return days.astype(str).tolist(), peak.reshape(len(days), per_day)
+
+
+def weekday_profile(days, matrix):
+    """Highest headcount per weekday (Saturday first) and bucket"""
+    # 1970-01-01 was a Thursday; shift so that Saturday is 0
+    weekday = (np.array(days, dtype="datetime64[D]").astype(np.int64) + 5) % 7
+    profile = np.zeros((7, matrix.shape[1]), dtype=matrix.dtype)
+    np.maximum.at(profile, weekday, matrix)
+    return profile
@@ -44,6 +44,15 @@ def get_persian_weekday_name(weekday_number):
     weekdays = ["شنبه", "یکشنبه", "دوشنبه", "سه‌شنبه", "چهارشنبه", "پنج‌شنبه", "جمعه"]
     return weekdays[weekday_number] if 0 <= weekday_number <= 6 else ""
 
+def jalali_period_range(year, month=None):
+    """First and last Gregorian dates ('YYYY-MM-DD') of a Jalali month, or of the whole year"""
+    start = JalaliDate(year, month or 1, 1)
+    if month and month < 12:
+        next_start = JalaliDate(year, month + 1, 1)
+    else:
+        next_start = JalaliDate(year + 1, 1, 1)
+    return str(start.to_gregorian()), str(next_start.to_gregorian() - datetime.timedelta(days=1))
+
 def validate_jalali_date(year, month, day):
     """Validate if a Jalali date is valid"""
     try:
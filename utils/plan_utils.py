@@ -0,0 +1,74 @@
+"""Sample attendance data and the expected query plan of every admin view.
+
+Shared by benchmarks/bench_query_plans.py, which prints and times the
+plans, and tests/test_query_plans.py, which asserts them.
+"""
+import datetime
+
+# (label, index(es) the plan must use, filters applied to a query and the last week)
+VIEWS = [
+    ("last week, newest first", "idx_attendance_date",
+     lambda q, week: q.between(*week).order_by("date", True).order_by("full_name")),
+    ("one worker, whole history", "idx_attendance_worker_date",
+     lambda q, week: q.worker(7).order_by("date", True)),
+    ("one worker, last week", "idx_attendance_worker_date",
+     lambda q, week: q.worker(7).between(*week).order_by("date", True)),
+    ("open sessions", "idx_attendance_open",
+     lambda q, week: q.status("open")),
+    ("last week, 9+ hours", ("idx_attendance_date", "idx_attendance_worker_date"),
+     lambda q, week: q.between(*week).min_hours(9).order_by("total_hours", True)),
+    ("name search, last week", "workers_fts",
+     lambda q, week: q.name("رضایی").between(*week).order_by("date", True)),
+    ("one department, last week", ("idx_attendance_date", "idx_workers_department"),
+     lambda q, week: q.department(3).between(*week).order_by("date", True)),
+    ("latest 50 sessions", "idx_attendance_date",
+     lambda q, week: q.order_by("date", True).limit(50)),
+]
+
+
+def seed_attendance(db, workers, days):
+    """Fill an empty database with ``workers`` in ten departments and ``days`` of sessions.
+
+    Runs ANALYZE afterwards and returns the first day.
+    """
+    conn = db.connect()
+    conn.executemany("INSERT INTO workers (personal_number, full_name) VALUES (?, ?)",
+                     [(str(1000 + i), f"کارمند {i} رضایی" if i % 50 == 0 else f"کارمند {i}")
+                      for i in range(workers)])
+    conn.commit()
+    # Ten departments of a tree, each with a tenth of the workers
+    db.add_department("کارخانه")
+    for i in range(9):
+        db.add_department(f"واحد {i}", 1)
+    conn.execute("UPDATE workers SET department_id = id % 10 + 1")
+    first = datetime.datetime(2024, 3, 20, 8)
+    data = []
+    for offset in range(days):
+        entry = first + datetime.timedelta(days=offset)
+        for worker in range(1, workers + 1):
+            # The last day is still in progress for a few workers
+            open_ = offset == days - 1 and worker % 20 == 0
+            exit_ = None if open_ else entry + datetime.timedelta(hours=6 + worker % 5)
+            data.append((worker, entry, exit_, entry.strftime('%Y-%m-%d'), '1403/01/01',
+                         0 if open_ else 6 + worker % 5))
+    conn.executemany("""
+        INSERT INTO attendance (worker_id, entry_time, exit_time, date, jalali_date, total_hours)
+        VALUES (?, ?, ?, ?, ?, ?)
+    """, data)
+    conn.execute("ANALYZE")
+    conn.commit()
+    conn.close()
+    return first.date()
+
+
+def last_week(first, days):
+    """(start, end) dates of the last seven of ``days`` days starting at ``first``"""
+    return str(first + datetime.timedelta(days=days - 7)), str(first + datetime.timedelta(days=days - 1))
+
+
+def plan_ok(plan, indexes):
+    """Whether an EXPLAIN QUERY PLAN uses one of ``indexes`` and never reads all attendance rows"""
+    indexes = (indexes,) if isinstance(indexes, str) else indexes
+    # "SCAN a USING INDEX ..." walks an index in order; a bare "SCAN a" reads every row
+    full_scan = any(step.startswith("SCAN a") and "USING" not in step for step in plan)
+    return not full_scan and any(index in step for step in plan for index in indexes)
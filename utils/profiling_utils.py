@@ -0,0 +1,383 @@
+import glob
+import inspect
+import json
+import logging
+import logging.handlers
+import os
+import re
+import sqlite3
+import threading
+import time
+import weakref
+from bisect import bisect_left
+from collections import deque
+from datetime import datetime
+from functools import wraps
+
+# Upper bounds (ms) of the latency histogram buckets; one more bucket holds the rest
+LATENCY_BUCKETS_MS = (0.1, 0.25, 0.5, 1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+# AttendanceQuery methods that run SQL, profiled along with the Database methods
+QUERY_METHODS = ("fetch", "count", "table_size", "explain")
+
+# Statements an EXPLAIN QUERY PLAN says something about
+EXPLAINABLE = ("SELECT", "WITH", "INSERT", "UPDATE", "DELETE", "REPLACE")
+
+SLOW_LOG_NAME = "attendance.slow_queries"
+
+# Literals of the expanded SQL passed to the trace callback: blobs, strings, numbers
+_LITERALS = re.compile(r"\b[xX]'[0-9a-fA-F]*'|'(?:[^']|'')*'|(?<![\w.])\d+(?:\.\d+)?(?:[eE][-+]?\d+)?\b")
+_PLACEHOLDER_LISTS = re.compile(r"\(\?(?:\s*,\s*\?)+\)")
+_WHITESPACE = re.compile(r"\s+")
+
+# The profiler ProfiledConnection reports to, set by QueryProfiler.install()
+_installed = None
+
+
+def default_log_path(db_path):
+    """Slow-query log kept next to the database file"""
+    return os.path.splitext(os.path.abspath(db_path))[0] + "_slow_queries.log"
+
+
+def active_profiler():
+    """The installed QueryProfiler, or None when profiling is off"""
+    return _installed
+
+
+def normalize_sql(sql):
+    """``sql`` with its literal values replaced by ?, so executions of one statement group together"""
+    sql = _LITERALS.sub("?", sql)
+    sql = _PLACEHOLDER_LISTS.sub("(?, ...)", sql)
+    return _WHITESPACE.sub(" ", sql).strip()
+
+
+def read_json_log(path, limit=50):
+    """The last ``limit`` entries of a rotating JSON-lines log (slow queries, GUI stalls), oldest first"""
+    entries = deque(maxlen=limit)
+    backups = [name for name in glob.glob(glob.escape(path) + ".*") if name.rsplit(".", 1)[1].isdigit()]
+    # path.3, path.2, path.1, path: oldest to newest
+    backups.sort(key=lambda name: int(name.rsplit(".", 1)[1]), reverse=True)
+    for name in backups + [path]:
+        try:
+            with open(name, encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        entries.append(json.loads(line))
+                    except ValueError:
+                        continue
+        except OSError:
+            continue
+    return list(entries)
+
+
+class LatencyHistogram:
+    """Count, total and maximum of a latency, with counts per LATENCY_BUCKETS_MS bucket"""
+
+    __slots__ = ("buckets", "count", "total", "max")
+
+    def __init__(self):
+        self.buckets = [0] * (len(LATENCY_BUCKETS_MS) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, ms):
+        self.buckets[bisect_left(LATENCY_BUCKETS_MS, ms)] += 1
+        self.count += 1
+        self.total += ms
+        self.max = max(self.max, ms)
+
+    @property
+    def mean(self):
+        return self.total / self.count if self.count else 0.0
+
+    def percentile(self, p):
+        """Upper bound of the bucket holding the ``p``-th percentile, at most the maximum"""
+        rank = max(1, -(-self.count * p // 100))
+        seen = 0
+        for i, n in enumerate(self.buckets):
+            seen += n
+            if seen >= rank:
+                return min(LATENCY_BUCKETS_MS[i], self.max) if i < len(LATENCY_BUCKETS_MS) else self.max
+        return self.max
+
+
+class OperationStats:
+    """Latency, rows, errors and lock waits of one method or statement"""
+
+    __slots__ = ("latency", "rows", "errors", "lock_waits", "lock_wait_ms")
+
+    def __init__(self):
+        self.latency = LatencyHistogram()
+        self.rows = 0
+        self.errors = 0
+        self.lock_waits = 0
+        self.lock_wait_ms = 0.0
+
+    def as_dict(self):
+        latency = self.latency
+        return {
+            "calls": latency.count, "total_ms": latency.total, "mean_ms": latency.mean,
+            "p50_ms": latency.percentile(50), "p95_ms": latency.percentile(95),
+            "p99_ms": latency.percentile(99), "max_ms": latency.max, "rows": self.rows,
+            "errors": self.errors, "lock_waits": self.lock_waits, "lock_wait_ms": self.lock_wait_ms,
+        }
+
+
+class ProfiledConnection(sqlite3.Connection):
+    """Connection that reports every statement it starts to the installed profiler"""
+
+    def __init__(self, database, *args, **kwargs):
+        super().__init__(database, *args, **kwargs)
+        profiler = _installed
+        if profiler is not None:
+            # Weak, so the callback does not keep the connection alive
+            ref = weakref.ref(self)
+            self.set_trace_callback(lambda sql: profiler._trace(ref, database, sql))
+
+
+class QueryProfiler:
+    """Latency statistics of Database calls and the SQL they run, with a slow-query log.
+
+    ``install()`` wraps every public Database method and the SQL-running
+    AttendanceQuery methods in a timer and makes Database.connect return
+    connections with a trace callback. SQLite's trace hook only reports
+    when a statement starts, so a statement is timed until the next one
+    starts on the same thread or the outermost profiled call returns,
+    which includes stepping through its rows. Statements run outside a
+    profiled call (maintenance jobs, sync, analytics) are not timed.
+
+    Calls report the rows they return, statements the rows they change.
+    A call failing with "database is locked" counts as a lock wait: it
+    waited out the whole busy timeout. Waits that end in success show up
+    as a slow write or COMMIT.
+
+    Statements (or calls, when no single statement explains them) slower
+    than ``slow_ms`` are appended to a rotating JSON-lines log together
+    with the statement's EXPLAIN QUERY PLAN.
+    """
+
+    def __init__(self, log_path=None, slow_ms=100, max_bytes=1024 * 1024, backup_count=3,
+                 max_statements=500):
+        self.log_path = log_path
+        self.slow_ms = slow_ms
+        self.max_statements = max_statements
+        self.methods = {}
+        self.statements = {}
+        self.started = time.time()
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._plans = {}
+        # Normalized form of statements seen verbatim before (BEGIN, COMMIT, constant SQL)
+        self._keys = {}
+        self._originals = []
+        self._handler = None
+        self.log = logging.getLogger(SLOW_LOG_NAME)
+        if log_path:
+            self._handler = logging.handlers.RotatingFileHandler(
+                log_path, maxBytes=max_bytes, backupCount=backup_count, encoding="utf-8", delay=True)
+            self._handler.setFormatter(logging.Formatter("%(message)s"))
+
+    def install(self):
+        """Profile every Database (and AttendanceQuery) instance until ``uninstall``"""
+        global _installed
+        from database import Database
+        from utils.query_utils import AttendanceQuery
+
+        if _installed is not None:
+            _installed.uninstall()
+        targets = [(Database, [name for name, value in vars(Database).items()
+                               if inspect.isfunction(value) and not name.startswith("_")
+                               and name != "connect"]),
+                   (AttendanceQuery, QUERY_METHODS)]
+        for cls, names in targets:
+            for name in names:
+                original = vars(cls)[name]
+                self._originals.append((cls, name, original))
+                label = name if cls is Database else f"{cls.__name__}.{name}"
+                setattr(cls, name, self._wrap(label, original))
+        self._originals.append((Database, "connection_factory", Database.connection_factory))
+        Database.connection_factory = ProfiledConnection
+        if self._handler:
+            self.log.addHandler(self._handler)
+            self.log.setLevel(logging.INFO)
+            self.log.propagate = False
+        _installed = self
+        return self
+
+    def uninstall(self):
+        global _installed
+        for cls, name, original in reversed(self._originals):
+            setattr(cls, name, original)
+        self._originals = []
+        if self._handler:
+            self.log.removeHandler(self._handler)
+            self._handler.close()
+        if _installed is self:
+            _installed = None
+
+    def _wrap(self, label, function):
+        @wraps(function)
+        def profiled(*args, **kwargs):
+            return self._call(label, function, args, kwargs)
+        return profiled
+
+    def _state(self):
+        state = self._local
+        if not hasattr(state, "labels"):
+            state.labels, state.pending, state.slow = [], None, []
+        return state
+
+    def _call(self, label, function, args, kwargs):
+        state = self._state()
+        state.labels.append(label)
+        result, error = None, None
+        started = time.perf_counter()
+        try:
+            result = function(*args, **kwargs)
+            return result
+        except Exception as e:
+            error = e
+            raise
+        finally:
+            ended = time.perf_counter()
+            elapsed = (ended - started) * 1000
+            state.labels.pop()
+            outermost = not state.labels
+            if outermost:
+                self._finish_statement(state, ended)
+            with self._lock:
+                stats = self.methods.get(label) or self.methods.setdefault(label, OperationStats())
+                stats.latency.add(elapsed)
+                if isinstance(result, list):
+                    stats.rows += len(result)
+                if error is not None:
+                    stats.errors += 1
+                    if isinstance(error, sqlite3.OperationalError) and _is_lock_error(error):
+                        stats.lock_waits += 1
+                        stats.lock_wait_ms += elapsed
+            if outermost:
+                if elapsed >= self.slow_ms and not state.slow:
+                    # Time spent between statements, e.g. in Python
+                    state.slow.append(self._entry(label, elapsed, None, None, None))
+                if state.slow:
+                    self._log_slow(state)
+
+    def _trace(self, ref, path, sql):
+        # "-- ..." are trigger and virtual table (R*Tree) programs run by the
+        # current statement, which also reports itself again after each one
+        if sql.startswith("--"):
+            return
+        state = self._state()
+        if not state.labels:
+            return
+        pending = state.pending
+        if pending is not None and pending[1] == sql and pending[3] is ref:
+            return
+        conn = ref()
+        now = time.perf_counter()
+        self._finish_statement(state, now)
+        state.pending = (state.labels[-1], sql, now, ref, conn.total_changes, path)
+
+    def _finish_statement(self, state, now):
+        pending = state.pending
+        if pending is None:
+            return
+        state.pending = None
+        label, sql, started, ref, changes, path = pending
+        elapsed = (now - started) * 1000
+        rows = None
+        conn = ref()
+        if conn is not None:
+            try:
+                rows = conn.total_changes - changes
+            except sqlite3.ProgrammingError:  # closed by now
+                pass
+        key = self._keys.get(sql)
+        if key is None:
+            key = normalize_sql(sql)
+            if len(self._keys) < 4 * self.max_statements:
+                self._keys[sql] = key
+        with self._lock:
+            stats = self.statements.get(key)
+            if stats is None:
+                if len(self.statements) >= self.max_statements:
+                    key = "(other statements)"
+                stats = self.statements.setdefault(key, OperationStats())
+            stats.latency.add(elapsed)
+            stats.rows += rows or 0
+        if elapsed >= self.slow_ms:
+            state.slow.append(self._entry(label, elapsed, sql, rows, path))
+
+    def _entry(self, label, elapsed, sql, rows, path):
+        return {"time": datetime.now().isoformat(timespec="seconds"), "ms": round(elapsed, 1),
+                "method": label, "sql": sql, "rows": rows, "db": path}
+
+    def _plan(self, path, sql):
+        """EXPLAIN QUERY PLAN of ``sql`` on a separate connection, cached per statement shape"""
+        key = normalize_sql(sql)
+        if key in self._plans:
+            return self._plans[key]
+        try:
+            conn = sqlite3.connect(path, timeout=0.5)
+            try:
+                plan = [row[3] for row in conn.execute("EXPLAIN QUERY PLAN " + sql)]
+            finally:
+                conn.close()
+        except sqlite3.Error as e:
+            # e.g. tables of an archive attached only to the original connection
+            plan = [f"(plan unavailable: {e})"]
+        if len(self._plans) < self.max_statements:
+            self._plans[key] = plan
+        return plan
+
+    def _log_slow(self, state):
+        entries, state.slow = state.slow, []
+        for entry in entries:
+            sql = entry["sql"]
+            if sql and sql.lstrip().upper().startswith(EXPLAINABLE):
+                entry["plan"] = self._plan(entry["db"], sql)
+            del entry["db"]
+            self.log.info(json.dumps(entry, ensure_ascii=False))
+
+    def method_stats(self):
+        """(method, OperationStats dict) pairs, most total time first"""
+        return self._sorted(self.methods)
+
+    def statement_stats(self, limit=None):
+        """(normalized statement, OperationStats dict) pairs, most total time first"""
+        return self._sorted(self.statements)[:limit]
+
+    def _sorted(self, table):
+        with self._lock:
+            items = [(name, stats.as_dict()) for name, stats in table.items()]
+        return sorted(items, key=lambda item: item[1]["total_ms"], reverse=True)
+
+    def reset(self):
+        with self._lock:
+            self.methods.clear()
+            self.statements.clear()
+            self.started = time.time()
+
+    def report(self, limit=15):
+        """Plain-text tables of the busiest methods and statements"""
+        header = f"{'calls':>7} {'mean':>8} {'p50':>8} {'p95':>8} {'p99':>8} {'max':>8} {'rows':>8} {'err':>4} {'lock':>4}  "
+        lines = ["methods (ms)", header + "method"]
+        for name, s in self.method_stats()[:limit]:
+            lines.append(_report_line(s) + name)
+        lines += ["", "statements (ms, rows changed)", header + "statement"]
+        for sql, s in self.statement_stats(limit):
+            lines.append(_report_line(s) + (sql if len(sql) <= 120 else sql[:117] + "..."))
+        if self.log_path:
+            lines += ["", f"slow-query log (> {self.slow_ms} ms): {self.log_path}"]
+        return "\n".join(lines)
+
+
+def _is_lock_error(error):
+    message = str(error)
+    return "locked" in message or "busy" in message
+
+
+def _report_line(s):
+    return (f"{s['calls']:>7} {s['mean_ms']:>8.2f} {s['p50_ms']:>8.2f} {s['p95_ms']:>8.2f} "
+            f"{s['p99_ms']:>8.2f} {s['max_ms']:>8.2f} {s['rows']:>8} {s['errors']:>4} {s['lock_waits']:>4}  ")
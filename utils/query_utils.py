@@ -0,0 +1,270 @@
+import re
+
+from persiantools import digits
+
+STATUS_OPEN = 'open'
+STATUS_CLOSED = 'closed'
+
+# Columns a query may filter or sort on, and the SQL they stand for
+COLUMNS = {
+    "id": "a.id",
+    "worker_id": "a.worker_id",
+    "date": "a.date",
+    "jalali_date": "a.jalali_date",
+    "entry_time": "a.entry_time",
+    "exit_time": "a.exit_time",
+    "total_hours": "a.total_hours",
+    "needs_review": "a.needs_review",
+    "full_name": "w.full_name",
+    "personal_number": "w.personal_number",
+    "department_id": "w.department_id",
+}
+
+OPERATORS = ("=", "!=", "<", "<=", ">", ">=", "LIKE")
+
+# Sort keys for keyset paging; never NULL so they always compare, and each
+# one written exactly as the index that serves it (idx_attendance_hours, ...).
+# Open sessions have an empty exit key, so status sorts them ahead of (or
+# after) the closed ones, which follow in exit-time order.
+SORT_EXPRESSIONS = {
+    "date": "a.date",
+    "full_name": "w.full_name",
+    "personal_number": "w.personal_number",
+    "entry_time": "COALESCE(a.entry_time, '')",
+    "exit_time": "COALESCE(a.exit_time, '')",
+    "total_hours": "COALESCE(a.total_hours, 0)",
+    "status": "COALESCE(a.exit_time, '')",
+}
+
+# Sorts with their own attendance index, which can be walked in order
+# instead of reading the date range through idx_attendance_date
+INDEXED_SORTS = ("entry_time", "exit_time", "total_hours", "status")
+
+DATE_RANGE = "a.date BETWEEN ? AND ?"
+
+
+class AttendanceQuery:
+    """Attendance filters composed into one parameterized SELECT.
+
+    Every method adds a clause and returns the query, so filters chain::
+
+        db.attendance_query().between(start, end).status("open").order_by("date", True).fetch()
+
+    Column names are looked up in COLUMNS and values are always bound as
+    parameters, so nothing from the caller is pasted into the SQL. The
+    clauses are chosen to match the indexes: a date range uses
+    idx_attendance_date, a worker idx_attendance_worker_date, open sessions
+    idx_attendance_open and a name the workers_fts index.
+    """
+
+    def __init__(self, db):
+        self.db = db
+        self.start_date = None
+        self.end_date = None
+        self._conditions = []
+        self._params = []
+        self._name = None
+        self._order = []
+        self._limit = None
+        self._offset = None
+        self._sort = None
+        self._walk_index = False
+
+    def _column(self, name):
+        if name not in COLUMNS:
+            raise ValueError(f"Unknown attendance column: {name}")
+        return COLUMNS[name]
+
+    def where(self, column, operator, value):
+        """Generic ``column <operator> value`` filter on a whitelisted column"""
+        if operator not in OPERATORS:
+            raise ValueError(f"Unsupported operator: {operator}")
+        self._conditions.append(f"{self._column(column)} {operator} ?")
+        self._params.append(value)
+        return self
+
+    def between(self, start_date, end_date):
+        """Sessions whose date is within ``start_date``..``end_date`` (Gregorian)"""
+        self.start_date, self.end_date = str(start_date), str(end_date)
+        self._conditions.append(DATE_RANGE)
+        self._params += [self.start_date, self.end_date]
+        return self
+
+    def worker(self, worker_id):
+        return self.where("worker_id", "=", worker_id)
+
+    def ids(self, attendance_ids):
+        """Only the sessions with these ids (keep the list within SQLite's parameter limit)"""
+        attendance_ids = list(attendance_ids)
+        self._conditions.append(f"a.id IN ({', '.join('?' * len(attendance_ids))})")
+        self._params += attendance_ids
+        return self
+
+    def department(self, department_id):
+        """Sessions of workers in a department or any of its sub-departments"""
+        self._conditions.append("""w.department_id IN (
+            SELECT c.id FROM departments c
+            WHERE c.path GLOB (SELECT path FROM departments WHERE id = ?) || '*')""")
+        self._params.append(department_id)
+        return self
+
+    def status(self, status):
+        if status == STATUS_OPEN:
+            # Same predicate as the partial index idx_attendance_open
+            self._conditions.append("a.exit_time IS NULL")
+        elif status == STATUS_CLOSED:
+            self._conditions.append("a.exit_time IS NOT NULL")
+        elif status is not None:
+            raise ValueError(f"Unknown status: {status}")
+        return self
+
+    def min_hours(self, hours):
+        return self.where("total_hours", ">=", hours)
+
+    def needs_review(self):
+        return self.where("needs_review", "=", 1)
+
+    def name(self, text):
+        """Workers whose name, personal number or phone start with every word of ``text``"""
+        tokens = re.findall(r"\w+", digits.fa_to_en(text or ""))
+        self._name = tokens or None
+        return self
+
+    def order_by(self, column, descending=False):
+        self._order.append(f"{self._column(column)} {'DESC' if descending else 'ASC'}")
+        return self
+
+    def sort(self, column, descending=False, walk_index=False):
+        """Order by a SORT_EXPRESSIONS key with the id as tie-breaker, for keyset paging.
+
+        Rows then carry their key as ``sort_key``; pass the last row's
+        ``sort_key`` and ``id`` to ``after`` to continue from it.
+
+        SQLite has no statistics on how many rows a date range holds, so it
+        always reads the range through idx_attendance_date and sorts all of
+        it. For wide ranges pass ``walk_index``: the attendance table then
+        drives the join and the sort column's index is walked in order,
+        filtering on the date, so a page reads about as many rows as it holds.
+        """
+        if column not in SORT_EXPRESSIONS:
+            raise ValueError(f"Unknown sort column: {column}")
+        self._sort = (SORT_EXPRESSIONS[column], descending)
+        self._walk_index = walk_index and column in INDEXED_SORTS
+        direction = "DESC" if descending else "ASC"
+        self._order = [f"{SORT_EXPRESSIONS[column]} {direction}", f"a.id {direction}"]
+        return self
+
+    def after(self, sort_key, attendance_id):
+        """Rows that come after (sort_key, id) in the order set by ``sort``"""
+        expression, descending = self._sort
+        op = "<" if descending else ">"
+        # Spelled out rather than as a (key, id) row value, which SQLite
+        # cannot turn into a seek on an expression index
+        self._conditions.append(f"{expression} {op}= ? AND ({expression} {op} ? OR a.id {op} ?)")
+        self._params += [sort_key, sort_key, attendance_id]
+        return self
+
+    def limit(self, limit, offset=None):
+        self._limit, self._offset = limit, offset
+        return self
+
+    def _name_condition(self, cursor):
+        cursor.execute("SELECT 1 FROM sqlite_master WHERE name = 'workers_fts'")
+        if cursor.fetchone() is not None:
+            match = " ".join(f'"{token}"*' for token in self._name)
+            return "a.worker_id IN (SELECT rowid FROM workers_fts WHERE workers_fts MATCH ?)", [match]
+        # SQLite built without FTS5
+        conditions, params = [], []
+        for token in self._name:
+            conditions.append("(w.full_name LIKE ? OR w.personal_number LIKE ? OR w.phone LIKE ?)")
+            params += [f"%{token}%"] * 3
+        return " AND ".join(conditions), params
+
+    def _from_where(self, cursor):
+        source = self.db._attendance_view(cursor, self.start_date, self.end_date)
+        conditions, params = list(self._conditions), list(self._params)
+        if self._walk_index:
+            # Unary + keeps the date range from being answered by its index
+            conditions = ["+" + c if c == DATE_RANGE else c for c in conditions]
+        if self._name:
+            condition, name_params = self._name_condition(cursor)
+            conditions.append(condition)
+            params += name_params
+        # CROSS JOIN fixes attendance as the outer loop
+        sql = f"""
+            FROM {source} a
+            {"CROSS JOIN" if self._walk_index else "JOIN"} workers w ON a.worker_id = w.id
+        """
+        if conditions:
+            sql += " WHERE " + " AND ".join(conditions)
+        return sql, params
+
+    def compile(self, cursor):
+        """Return (sql, params); attaches the archives the date range needs to ``cursor``"""
+        from_where, params = self._from_where(cursor)
+        columns = "a.*, w.full_name, w.personal_number"
+        if self._sort:
+            columns += f", {self._sort[0]} AS sort_key"
+        sql = f"SELECT {columns} {from_where}"
+        if self._order:
+            sql += " ORDER BY " + ", ".join(self._order)
+        if self._limit is not None:
+            sql += " LIMIT ?"
+            params.append(self._limit)
+            if self._offset:
+                sql += " OFFSET ?"
+                params.append(self._offset)
+        return sql, params
+
+    def fetch(self):
+        conn = self.db.connect()
+        cursor = conn.cursor()
+        try:
+            cursor.execute(*self.compile(cursor))
+            return cursor.fetchall()
+        finally:
+            conn.close()
+
+    def iter_batches(self, batch_size=50000):
+        """Yield the matching rows ``batch_size`` at a time from one cursor"""
+        conn = self.db.connect()
+        cursor = conn.cursor()
+        try:
+            cursor.execute(*self.compile(cursor))
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                if not rows:
+                    break
+                yield rows
+        finally:
+            conn.close()
+
+    def count(self):
+        """Number of matching rows (ordering and limit are ignored)"""
+        conn = self.db.connect()
+        cursor = conn.cursor()
+        try:
+            from_where, params = self._from_where(cursor)
+            cursor.execute(f"SELECT COUNT(*) {from_where}", params)
+            return cursor.fetchone()[0]
+        finally:
+            conn.close()
+
+    def table_size(self):
+        """Largest attendance id: an upper bound on the live table's rows, read in O(log n)"""
+        conn = self.db.connect()
+        try:
+            return conn.execute("SELECT COALESCE(MAX(id), 0) FROM attendance").fetchone()[0]
+        finally:
+            conn.close()
+
+    def explain(self):
+        """The EXPLAIN QUERY PLAN details of the compiled query, one string per step"""
+        conn = self.db.connect()
+        cursor = conn.cursor()
+        try:
+            sql, params = self.compile(cursor)
+            cursor.execute("EXPLAIN QUERY PLAN " + sql, params)
+            return [row['detail'] for row in cursor.fetchall()]
+        finally:
+            conn.close()
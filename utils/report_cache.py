@@ -0,0 +1,189 @@
+import hashlib
+import os
+import pickle
+import sqlite3
+import sys
+from collections import OrderedDict
+
+# Database methods served through the cache by ReportCache.install()
+CACHED_METHODS = ("get_all_attendance", "get_worker_attendance", "get_monthly_report",
+                  "get_hours_summary")
+
+
+class CachedRow:
+    """Immutable, picklable stand-in for sqlite3.Row (index and key access)"""
+
+    __slots__ = ("_index", "_values")
+
+    def __init__(self, index, values):
+        self._index = index
+        self._values = values
+
+    def __getitem__(self, key):
+        if isinstance(key, str):
+            return self._values[self._index[key]]
+        return self._values[key]
+
+    def __iter__(self):
+        return iter(self._values)
+
+    def __len__(self):
+        return len(self._values)
+
+    def keys(self):
+        return list(self._index)
+
+    def __reduce__(self):
+        return CachedRow, (self._index, self._values)
+
+
+def _freeze(value):
+    """Turn sqlite3.Row results into CachedRows that outlive the connection"""
+    if isinstance(value, sqlite3.Row):
+        return CachedRow({k: i for i, k in enumerate(value.keys())}, tuple(value))
+    if isinstance(value, list) and value and isinstance(value[0], sqlite3.Row):
+        # One shared key index for the whole result
+        index = {k: i for i, k in enumerate(value[0].keys())}
+        return [CachedRow(index, tuple(row)) for row in value]
+    return value
+
+
+def _estimate_size(value, sample=100):
+    """Approximate memory footprint in bytes, extrapolated from a sample of rows"""
+    if isinstance(value, list):
+        if not value:
+            return sys.getsizeof(value)
+        head = value[:sample]
+        return sys.getsizeof(value) + sum(_estimate_size(v) for v in head) * len(value) // len(head)
+    if isinstance(value, CachedRow):
+        return 64 + sum(sys.getsizeof(v) for v in value._values)
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(sys.getsizeof(v) for v in value.values())
+    return sys.getsizeof(value)
+
+
+def _normalize(value):
+    if isinstance(value, (list, tuple)):
+        return tuple(_normalize(v) for v in value)
+    if isinstance(value, dict):
+        return tuple(sorted((k, _normalize(v)) for k, v in value.items()))
+    if value is None or isinstance(value, (int, float, str)):
+        return value
+    # Dates, JalaliDates, ... compare by their ISO text
+    return str(value)
+
+
+class ReportCache:
+    """Results of report queries keyed by parameters and change-log watermark.
+
+    Every write to workers or attendance advances the change-log watermark,
+    which is part of each key along with the database path and its data
+    generation (renewed on restore), so a cached result can never be
+    stale; old entries simply stop being hit and age out. The memory tier is an LRU
+    bounded by ``max_bytes``; with ``disk_dir`` set, results are also
+    pickled to disk (bounded by ``max_disk_bytes``) and survive restarts.
+    """
+
+    def __init__(self, db, max_bytes=64 * 1024 * 1024, disk_dir=None,
+                 max_disk_bytes=256 * 1024 * 1024):
+        self.db = db
+        self.max_bytes = max_bytes
+        self.disk_dir = disk_dir
+        self.max_disk_bytes = max_disk_bytes
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+        if disk_dir:
+            os.makedirs(disk_dir, exist_ok=True)
+
+    @property
+    def size(self):
+        return self._bytes
+
+    def key(self, name, args=(), kwargs=None):
+        # The watermark only orders changes within one database and one generation
+        return (os.path.abspath(self.db.db_path), self.db.get_data_generation(),
+                name, _normalize(args), _normalize(kwargs or {}), self.db.get_change_watermark())
+
+    def _disk_path(self, key):
+        digest = hashlib.sha1(repr(key).encode("utf-8")).hexdigest()
+        return os.path.join(self.disk_dir, f"{digest}.pkl")
+
+    def _remember(self, key, value, size):
+        if size > self.max_bytes:
+            return
+        if key in self._entries:
+            self._bytes -= self._entries.pop(key)[1]
+        self._entries[key] = (value, size)
+        self._bytes += size
+        while self._bytes > self.max_bytes:
+            _, (_, evicted) = self._entries.popitem(last=False)
+            self._bytes -= evicted
+
+    def _load(self, key):
+        path = self._disk_path(key)
+        try:
+            with open(path, "rb") as f:
+                stored_key, value = pickle.load(f)
+        except (OSError, pickle.UnpicklingError, EOFError):
+            return None
+        if stored_key != key:
+            return None
+        os.utime(path)
+        return value
+
+    def _store(self, key, value):
+        path = self._disk_path(key)
+        with open(path + ".partial", "wb") as f:
+            pickle.dump((key, value), f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(path + ".partial", path)
+        self._trim_disk()
+
+    def _trim_disk(self):
+        files = [os.path.join(self.disk_dir, name) for name in os.listdir(self.disk_dir)
+                 if name.endswith(".pkl")]
+        stats = sorted(((os.stat(p), p) for p in files), key=lambda item: item[0].st_mtime)
+        total = sum(stat.st_size for stat, _ in stats)
+        for stat, path in stats:
+            if total <= self.max_disk_bytes:
+                break
+            os.remove(path)
+            total -= stat.st_size
+
+    def get_or_compute(self, name, compute, *args, **kwargs):
+        """Return the cached result of ``compute(*args, **kwargs)`` for the current data"""
+        key = self.key(name, args, kwargs)
+        entry = self._entries.get(key)
+        if entry is None and self.disk_dir:
+            value = self._load(key)
+            if value is not None:
+                entry = (value, _estimate_size(value))
+                self._remember(key, *entry)
+        if entry is not None:
+            self._entries.move_to_end(key)
+            self.hits += 1
+            value = entry[0]
+        else:
+            self.misses += 1
+            value = _freeze(compute(*args, **kwargs))
+            self._remember(key, value, _estimate_size(value))
+            if self.disk_dir:
+                self._store(key, value)
+        # Callers may modify the list they get back; the cached one stays intact
+        return list(value) if isinstance(value, list) else value
+
+    def install(self, methods=CACHED_METHODS):
+        """Route the given report methods of ``db`` through this cache"""
+        for name in methods:
+            original = getattr(type(self.db), name).__get__(self.db)
+
+            def cached(*args, _name=name, _original=original, **kwargs):
+                return self.get_or_compute(_name, _original, *args, **kwargs)
+
+            setattr(self.db, name, cached)
+        return self.db
+
+    def clear(self):
+        self._entries.clear()
+        self._bytes = 0
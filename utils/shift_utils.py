@@ -0,0 +1,146 @@
+import numpy as np
+
+from utils.columnar_utils import SECONDS_PER_DAY, to_epoch_seconds, translate_column
+
+# Columns written to attendance_summary, in evaluate_days output order
+SUMMARY_FIELDS = ("worker_id", "date", "shift_id", "first_entry", "last_exit", "sessions",
+                  "worked_minutes", "late_minutes", "early_minutes", "overtime_minutes")
+
+
+def time_to_seconds(text):
+    """'HH:MM' or 'HH:MM:SS' to seconds after midnight"""
+    parts = [int(p) for p in str(text).split(":")]
+    return parts[0] * 3600 + parts[1] * 60 + (parts[2] if len(parts) > 2 else 0)
+
+
+def _day_numbers(dates):
+    return np.array(dates, dtype="datetime64[D]").astype(np.int64)
+
+
+def evaluate_days(sessions, assignments, shifts):
+    """Lateness, early departure, overtime and net hours per worker and day.
+
+    ``sessions`` are attendance rows (worker_id, date, entry_time, exit_time),
+    ``assignments`` are worker_shifts rows (worker_id, shift_id, valid_from)
+    and ``shifts`` maps shift id to its row. All sessions are evaluated at
+    once: the shift of every session is found with one searchsorted over the
+    assignments, days are grouped with np.unique and the per-day first
+    entry, last exit and worked time come from ufunc reductions.
+
+    Lateness counts from the shift start once it exceeds the grace period;
+    the shift's break is deducted from worked time once; overtime is net
+    time beyond the scheduled shift. Days without a shift only get worked
+    minutes. Open sessions count for the first entry but not worked time.
+    Returns a dict of arrays keyed by SUMMARY_FIELDS.
+    """
+    if not sessions:
+        return {field: np.array([]) for field in SUMMARY_FIELDS}
+
+    worker = np.array([s['worker_id'] for s in sessions], dtype=np.int64)
+    day = _day_numbers([s['date'] for s in sessions])
+    entry = to_epoch_seconds([s['entry_time'] for s in sessions])
+    exit_ = to_epoch_seconds([s['exit_time'] for s in sessions])
+
+    # One group per (worker, day)
+    keys, group = np.unique(worker * 1_000_000 + day, return_inverse=True)
+    n = len(keys)
+    group_worker = keys // 1_000_000
+    group_day = keys % 1_000_000
+
+    first_entry = np.full(n, np.inf)
+    np.minimum.at(first_entry, group, np.where(np.isnan(entry), np.inf, entry))
+    last_exit = np.full(n, -np.inf)
+    np.maximum.at(last_exit, group, np.where(np.isnan(exit_), -np.inf, exit_))
+    first_entry[np.isinf(first_entry)] = np.nan
+    last_exit[np.isinf(last_exit)] = np.nan
+    durations = np.where(np.isnan(exit_) | np.isnan(entry), 0.0, np.maximum(exit_ - entry, 0.0))
+    worked = np.bincount(group, weights=durations, minlength=n)
+    session_count = np.bincount(group, minlength=n)
+
+    # Shift in force on each day: last assignment with valid_from <= day
+    shift_id = np.zeros(n, dtype=np.int64)
+    if assignments:
+        a_worker = np.array([a['worker_id'] for a in assignments], dtype=np.int64)
+        a_day = _day_numbers([a['valid_from'] for a in assignments])
+        a_keys = a_worker * 1_000_000 + a_day
+        order = np.argsort(a_keys, kind="stable")
+        a_keys, a_worker = a_keys[order], a_worker[order]
+        a_shift = np.array([a['shift_id'] for a in assignments], dtype=np.int64)[order]
+        pos = np.searchsorted(a_keys, keys, side="right") - 1
+        found = (pos >= 0) & (a_worker[np.maximum(pos, 0)] == group_worker)
+        shift_id = np.where(found, a_shift[np.maximum(pos, 0)], 0)
+
+    # Shift parameters gathered per group through a small lookup table
+    ids = np.array(sorted(shifts), dtype=np.int64)
+    table = np.zeros((len(ids) + 1, 4))
+    for i, sid in enumerate(ids, 1):
+        s = shifts[sid]
+        start, end = time_to_seconds(s['start_time']), time_to_seconds(s['end_time'])
+        if end <= start:  # overnight shift
+            end += SECONDS_PER_DAY
+        table[i] = (start, end, s['break_minutes'] * 60, s['grace_minutes'] * 60)
+    row = np.zeros(n, dtype=np.int64)
+    if len(ids):
+        pos = np.minimum(np.searchsorted(ids, shift_id), len(ids) - 1)
+        row = np.where(ids[pos] == shift_id, pos + 1, 0)
+    has_shift = row > 0
+    start, end, break_, grace = table[row].T
+
+    day_start = group_day.astype(float) * SECONDS_PER_DAY
+    shift_start = day_start + start
+    shift_end = day_start + end
+    late = np.where(has_shift & (first_entry - shift_start > grace), first_entry - shift_start, 0.0)
+    early = np.where(has_shift & ~np.isnan(last_exit) & (last_exit < shift_end),
+                     shift_end - last_exit, 0.0)
+    net = np.maximum(worked - np.where(worked > 0, break_, 0.0), 0.0)
+    overtime = np.where(has_shift, np.maximum(net - (end - start - break_), 0.0), 0.0)
+
+    return {
+        "worker_id": group_worker,
+        "date": group_day.astype("datetime64[D]").astype(str),
+        "shift_id": np.where(has_shift, shift_id, 0),
+        "first_entry": first_entry,
+        "last_exit": last_exit,
+        "sessions": session_count,
+        "worked_minutes": net / 60,
+        "late_minutes": late / 60,
+        "early_minutes": early / 60,
+        "overtime_minutes": overtime / 60,
+    }
+
+
+def summary_rows(result):
+    """Rows for executemany; epoch seconds back to ISO text, 0 shift to NULL"""
+    def iso(values):
+        missing = np.isnan(values)
+        stamps = np.where(missing, 0, values).astype("datetime64[s]").astype(str).astype(object)
+        stamps[missing] = None
+        return stamps.tolist()
+
+    shift_id = result["shift_id"].astype(object)
+    shift_id[shift_id == 0] = None
+    columns = [result["worker_id"].tolist(), result["date"].tolist(), shift_id.tolist(),
+               iso(result["first_entry"]), iso(result["last_exit"]), result["sessions"].tolist()]
+    columns += [result[field].astype(float).tolist() for field in SUMMARY_FIELDS[6:]]
+    return list(zip(*columns))
+
+
+SHIFT_REPORT_COLUMNS = ["کارمند", "شماره پرسنلی", "روزهای حضور", "روزهای تاخیر",
+                        "تاخیر (دقیقه)", "تعجیل خروج (دقیقه)", "اضافه‌کار (دقیقه)", "ساعات خالص"]
+
+
+def format_shift_report(rows):
+    """Display rows (Persian digits) for Database.get_shift_summary results"""
+    if not rows:
+        return []
+    columns = [
+        [r['full_name'] for r in rows],
+        translate_column([r['personal_number'] for r in rows]),
+        translate_column([r['days_worked'] for r in rows]),
+        translate_column([r['late_days'] for r in rows]),
+        translate_column([f"{r['late_minutes']:.0f}" for r in rows]),
+        translate_column([f"{r['early_minutes']:.0f}" for r in rows]),
+        translate_column([f"{r['overtime_minutes']:.0f}" for r in rows]),
+        translate_column([f"{r['worked_minutes'] / 60:.2f}" for r in rows]),
+    ]
+    return [list(row) for row in zip(*columns)]
@@ -0,0 +1,196 @@
+import gzip
+import json
+import os
+import sqlite3
+from datetime import datetime
+
+# Columns shipped to the central database
+WORKER_COLUMNS = ("id", "personal_number", "full_name", "phone", "created_at")
+ATTENDANCE_COLUMNS = ("id", "worker_id", "entry_time", "exit_time", "date",
+                      "jalali_date", "total_hours")
+SYNC_TABLES = {"workers": WORKER_COLUMNS, "attendance": ATTENDANCE_COLUMNS}
+
+
+def _fetch_rows(conn, table, columns, ids):
+    ids = list(ids)
+    rows = {}
+    for i in range(0, len(ids), 500):
+        chunk = ids[i:i + 500]
+        placeholders = ", ".join("?" * len(chunk))
+        cursor = conn.execute(
+            f"SELECT {', '.join(columns)} FROM {table} WHERE id IN ({placeholders})", chunk
+        )
+        for row in cursor.fetchall():
+            rows[row['id']] = {column: row[column] for column in columns}
+    return rows
+
+
+def export_batch(db, site_id, out_dir):
+    """Write the rows changed since the last export as one batch file.
+
+    Only change-log entries newer than the stored watermark are read, so
+    the cost follows the size of the delta. Returns the batch path, or
+    None when nothing changed.
+    """
+    since = int(db.get_setting("sync_exported_seq", 0))
+    snapshot = since == 0
+    conn = db.connect()
+    # Archived attendance is still history: read it through the archive view
+    relations = {table: table for table in SYNC_TABLES}
+    relations["attendance"] = db._attendance_view(conn.cursor())
+    latest = {}
+    if snapshot:
+        # First export: snapshot everything, including rows older than the change log.
+        # On a database upgraded from before the change log the watermark is
+        # still 0; the header marks the batch so central applies it anyway.
+        to_seq = db.get_change_watermark()
+        for table, relation in relations.items():
+            for row in conn.execute(f"SELECT id FROM {relation}"):
+                latest[(table, row['id'])] = 'INSERT'
+    else:
+        changes = db.get_changes_since(since)
+        if not changes:
+            conn.close()
+            return None
+        to_seq = changes[-1]['seq']
+        # Last operation per row wins; archiving changes nothing central sees,
+        # and a row changed before it was archived is read from its archive
+        for change in changes:
+            if change['table_name'] in SYNC_TABLES and change['operation'] != 'ARCHIVE':
+                latest[(change['table_name'], change['row_id'])] = change['operation']
+
+    os.makedirs(out_dir, exist_ok=True)
+    path = os.path.join(out_dir, f"{site_id}_{since + 1:010d}_{to_seq:010d}.jsonl.gz")
+    try:
+        with gzip.open(path + ".partial", "wt", encoding="utf-8") as batch:
+            header = {"site": site_id, "from_seq": since + 1, "to_seq": to_seq, "snapshot": snapshot,
+                      "created_at": datetime.now().isoformat(timespec="seconds")}
+            batch.write(json.dumps(header, ensure_ascii=False) + "\n")
+            for table, columns in SYNC_TABLES.items():
+                ids = {row_id for (t, row_id), op in latest.items() if t == table}
+                rows = _fetch_rows(conn, relations[table], columns, ids)
+                for row_id in sorted(ids):
+                    if row_id in rows:
+                        record = {"t": table, "op": "upsert", "row": rows[row_id]}
+                    else:
+                        record = {"t": table, "op": "delete", "id": row_id}
+                    batch.write(json.dumps(record, ensure_ascii=False, default=str) + "\n")
+    finally:
+        conn.close()
+    os.replace(path + ".partial", path)
+    db.set_setting("sync_exported_seq", to_seq)
+    return path
+
+
+def init_central(conn):
+    """Create the central reporting schema (site-qualified ids)"""
+    conn.executescript('''
+        CREATE TABLE IF NOT EXISTS sites (
+            site_id TEXT PRIMARY KEY,
+            last_seq INTEGER NOT NULL DEFAULT 0,
+            last_applied_at TIMESTAMP
+        );
+        CREATE TABLE IF NOT EXISTS workers (
+            uid TEXT PRIMARY KEY,
+            site_id TEXT NOT NULL,
+            worker_id INTEGER NOT NULL,
+            personal_number TEXT,
+            full_name TEXT,
+            phone TEXT,
+            created_at TIMESTAMP
+        );
+        CREATE TABLE IF NOT EXISTS attendance (
+            uid TEXT PRIMARY KEY,
+            site_id TEXT NOT NULL,
+            attendance_id INTEGER NOT NULL,
+            worker_uid TEXT NOT NULL,
+            entry_time TIMESTAMP,
+            exit_time TIMESTAMP,
+            date TEXT NOT NULL,
+            jalali_date TEXT,
+            total_hours REAL DEFAULT 0
+        );
+        CREATE INDEX IF NOT EXISTS idx_central_attendance_date ON attendance (date, site_id);
+        CREATE INDEX IF NOT EXISTS idx_central_attendance_worker ON attendance (worker_uid, date);
+    ''')
+
+
+def apply_batch(central_path, batch_path, force=False):
+    """Apply a batch file to the central database in one transaction.
+
+    Batches at or below the site's applied watermark are skipped (except
+    a site's first snapshot, which may end at 0) and every write is an
+    upsert or delete by site-qualified id, so re-applying a batch is
+    harmless. A batch that would leave a gap is refused unless
+    ``force`` is set. Returns (applied, message).
+    """
+    with gzip.open(batch_path, "rt", encoding="utf-8") as batch:
+        header = json.loads(batch.readline())
+        records = [json.loads(line) for line in batch if line.strip()]
+    site = header["site"]
+
+    conn = sqlite3.connect(central_path)
+    conn.row_factory = sqlite3.Row
+    try:
+        init_central(conn)
+        row = conn.execute("SELECT last_seq FROM sites WHERE site_id = ?", (site,)).fetchone()
+        last_seq = row['last_seq'] if row else 0
+        # A first snapshot of a site may end at seq 0 (no change logged yet)
+        first_snapshot = header.get("snapshot") and last_seq == 0
+        if header["to_seq"] <= last_seq and not first_snapshot:
+            return False, f"{os.path.basename(batch_path)}: already applied"
+        if header["from_seq"] > last_seq + 1 and not force:
+            return False, (f"{os.path.basename(batch_path)}: missing changes "
+                           f"{last_seq + 1}..{header['from_seq'] - 1} for site {site}")
+
+        worker_upserts, attendance_upserts = [], []
+        worker_deletes, attendance_deletes = [], []
+        for record in records:
+            if record["op"] == "delete":
+                target = worker_deletes if record["t"] == "workers" else attendance_deletes
+                target.append((f"{site}:{record['id']}",))
+            elif record["t"] == "workers":
+                w = record["row"]
+                worker_upserts.append((f"{site}:{w['id']}", site, w['id'], w['personal_number'],
+                                       w['full_name'], w['phone'], w['created_at']))
+            else:
+                a = record["row"]
+                attendance_upserts.append((f"{site}:{a['id']}", site, a['id'], f"{site}:{a['worker_id']}",
+                                           a['entry_time'], a['exit_time'], a['date'],
+                                           a['jalali_date'], a['total_hours']))
+
+        conn.executemany('''
+            INSERT INTO workers (uid, site_id, worker_id, personal_number, full_name, phone, created_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT(uid) DO UPDATE SET
+                personal_number = excluded.personal_number,
+                full_name = excluded.full_name,
+                phone = excluded.phone
+        ''', worker_upserts)
+        conn.executemany('''
+            INSERT INTO attendance (uid, site_id, attendance_id, worker_uid, entry_time,
+                                    exit_time, date, jalali_date, total_hours)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT(uid) DO UPDATE SET
+                entry_time = excluded.entry_time,
+                exit_time = excluded.exit_time,
+                date = excluded.date,
+                jalali_date = excluded.jalali_date,
+                total_hours = excluded.total_hours
+        ''', attendance_upserts)
+        conn.executemany("DELETE FROM attendance WHERE uid = ?", attendance_deletes)
+        conn.executemany("DELETE FROM workers WHERE uid = ?", worker_deletes)
+        conn.execute('''
+            INSERT INTO sites (site_id, last_seq, last_applied_at) VALUES (?, ?, CURRENT_TIMESTAMP)
+            ON CONFLICT(site_id) DO UPDATE SET
+                last_seq = excluded.last_seq,
+                last_applied_at = excluded.last_applied_at
+        ''', (site, header["to_seq"]))
+        conn.commit()
+        return True, (f"{os.path.basename(batch_path)}: {len(worker_upserts) + len(attendance_upserts)} "
+                      f"upserts, {len(worker_deletes) + len(attendance_deletes)} deletes")
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()